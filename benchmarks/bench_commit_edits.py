@@ -0,0 +1,90 @@
+"""
+Benchmark for repeated small commits on a large TextDocument, once without any Clients and
+once with a Client that uses incremental document synchronization. The Client is not backed
+by a language server; only the notifications it would send are computed.
+
+Usage: python benchmarks/bench_commit_edits.py [--size-mb SIZE] [--commits COMMITS]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from typing import Any
+
+from change_ls import DroppedChangesWarning, StdIOConnectionParams, Workspace
+from change_ls.types import PositionEncodingKind, TextDocumentSyncKind
+
+_SYNC_METHODS = ["textDocument/didOpen", "textDocument/didChange", "textDocument/didClose"]
+
+
+def _generate_file(path: Path, size: int) -> None:
+    line = "value_{:08} = compute(value_{:08}, 'generated')\n"
+    line_length = len(line.format(0, 0))
+    with path.open("w", encoding="utf-8") as file:
+        for i in range(size // line_length):
+            file.write(line.format(i, i - 1))
+
+
+def _connect_incremental_client(workspace: Workspace) -> None:
+    client = workspace.create_client(StdIOConnectionParams(launch_command="server"))
+
+    def check_feature(method: str, **kwargs: Any) -> bool:
+        sync_kind = kwargs.get("sync_kind", TextDocumentSyncKind.Incremental)
+        return method in _SYNC_METHODS and sync_kind == TextDocumentSyncKind.Incremental
+
+    setattr(client, "check_feature", check_feature)
+    setattr(client, "get_position_encoding_kind", lambda: PositionEncodingKind.UTF16)
+    for method in ["open", "change", "close"]:
+        setattr(client, f"send_text_document_did_{method}", lambda params: None)
+
+
+async def _run(size: int, commits: int, incremental_client: bool) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "generated.py"
+        _generate_file(path, size)
+
+        async with Workspace(Path(temp_dir)) as workspace:
+            if incremental_client:
+                _connect_incremental_client(workspace)
+                print("With an incremental Client:")
+            else:
+                print("Without Clients:")
+
+            doc = workspace.open_text_document(path)
+            length = len(doc.text)
+            step = length // commits
+
+            start = time.perf_counter()
+            for i in range(commits):
+                offset = i * step
+                doc.edit("edited", offset, offset + 5)
+                doc.commit_edits()
+            elapsed = time.perf_counter() - start
+            print(f"{commits} commits on {length / 1e6:.1f}M characters: {elapsed:.3f}s")
+            if incremental_client:
+                events = workspace.metrics.get("did_change.incremental_events")
+                print(f"Incremental change events: {events}")
+
+            start = time.perf_counter()
+            text_length = len(doc.text)
+            elapsed = time.perf_counter() - start
+            print(f"Materializing {text_length / 1e6:.1f}M characters: {elapsed:.3f}s")
+
+            # The edits are not supposed to be saved.
+            warnings.simplefilter("ignore", DroppedChangesWarning)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=15.0)
+    parser.add_argument("--commits", type=int, default=5000)
+    args = parser.parse_args()
+    for incremental_client in [False, True]:
+        asyncio.run(_run(int(args.size_mb * 1_000_000), args.commits, incremental_client))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark for the memory used by a large number of open TextDocuments.
+
+Usage: python benchmarks/bench_open_documents.py [--documents DOCUMENTS] [--lazy]
+"""
+
+import argparse
+import asyncio
+import gc
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from change_ls import Workspace
+
+
+def _generate_files(root: Path, documents: int) -> int:
+    text = "def function_{0}(value):\n    return value + {0}\n"
+    size = 0
+    for i in range(documents):
+        content = text.format(i)
+        (root / f"module_{i}.py").write_text(content, encoding="utf-8")
+        size += len(content)
+    return size
+
+
+async def _run(documents: int, lazy: bool) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        text_size = _generate_files(root, documents)
+        paths = [root / f"module_{i}.py" for i in range(documents)]
+
+        async with Workspace(root) as workspace:
+            gc.collect()
+            tracemalloc.start()
+            for path in paths:
+                workspace.open_text_document(path, lazy=lazy)
+            gc.collect()
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(
+                f"{documents} open documents: {memory / 1e6:.1f}MB total, "
+                f"{memory / documents:.0f} bytes per document, "
+                f"{text_size / documents:.0f} characters of text per document"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--lazy", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(_run(args.documents, args.lazy))
+
+
+if __name__ == "__main__":
+    main()
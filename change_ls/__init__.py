@@ -7,7 +7,10 @@ from ._client import (
     StdIOConnectionParams,
     WorkspaceRequestHandler,
 )
+from ._diagnostics import DiagnosticStore, DocumentDiagnostics
 from ._location_list import LocationList
+from ._metrics import DurationStats, Metrics
+from ._snapshot import TextDocumentSnapshot
 from ._symbol import (
     CustomSymbol,
     DocumentSymbol,
@@ -15,12 +18,14 @@ from ._symbol import (
     UnresolvedWorkspaceSymbol,
     WorkspaceSymbol,
 )
+from ._symbol_index import SymbolIndex
 from ._text_document import DroppedChangesWarning, TextDocument
 from ._util import (
     TextDocumentInfo,
     guess_language_id,
     install_language,
     matches_file_operation_filter,
+    matches_file_system_watcher,
     matches_text_document_filter,
 )
 from ._workspace import Workspace
@@ -35,16 +40,23 @@ __all__ = [
     "Workspace",
     "DroppedChangesWarning",
     "TextDocument",
+    "TextDocumentSnapshot",
     "LocationList",
+    "Metrics",
+    "DurationStats",
     "ChangeLSError",
+    "DiagnosticStore",
+    "DocumentDiagnostics",
     "CustomSymbol",
     "DocumentSymbol",
     "Symbol",
+    "SymbolIndex",
     "UnresolvedWorkspaceSymbol",
     "WorkspaceSymbol",
     "TextDocumentInfo",
     "guess_language_id",
     "install_language",
     "matches_file_operation_filter",
+    "matches_file_system_watcher",
     "matches_text_document_filter",
 ]
@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional
 from change_ls._util import (
     TextDocumentInfo,
     matches_file_operation_filter,
+    matches_file_system_watcher,
     matches_text_document_filter,
 )
 from change_ls.logging import OperationLoggerAdapter, operation
@@ -14,8 +15,10 @@ from change_ls.types import (
     CodeLensOptions,
     CompletionOptions,
     DiagnosticOptions,
+    DidChangeWatchedFilesRegistrationOptions,
     DocumentLinkOptions,
     ExecuteCommandOptions,
+    FileEvent,
     FileOperationRegistrationOptions,
     InlayHintOptions,
     NotebookCellTextDocumentFilter,
@@ -93,6 +96,15 @@ def _registration_fulfils_feature_request(
             if not uri_matched:
                 return False
 
+    if "file_changes" in request_params and isinstance(
+        registration.options, DidChangeWatchedFilesRegistrationOptions
+    ):
+        file_events: List[FileEvent] = request_params["file_changes"]
+
+        for e in file_events:
+            if not any(matches_file_system_watcher(e, w) for w in registration.options.watchers):
+                return False
+
     if "semantic_tokens" in request_params and isinstance(
         registration.options, SemanticTokensOptions
     ):
@@ -309,6 +321,10 @@ class CapabilitiesMixin(ABC):
             *workspace/willDeleteFiles*, *workspace/didDeleteFiles*
         :type file_operations: List[str]
 
+        :param file_changes: :class:`FileEvents <change_ls.types.FileEvent>` which should be sent in a
+            *workspace/didChangeWatchedFiles* notification. Each event has to match one of the registered watchers.
+        :type file_changes: List[FileEvent]
+
         :param semantic_tokens: Which of *textDocument/semanticTokens/full*, *textDocument/semanticTokens/range* and
             *textDocument/semanticTokens/delta* is required. Note the the registration ``method`` for these requests is
             *textDocument/semanticTokens*.
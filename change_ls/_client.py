@@ -4,14 +4,31 @@ import subprocess
 import sys
 import uuid
 from abc import ABC, abstractmethod
-from asyncio import AbstractEventLoop, get_running_loop, wait_for
+from asyncio import AbstractEventLoop, Event, Queue, ensure_future, get_running_loop, wait_for
+from contextlib import contextmanager
 from dataclasses import dataclass
+from inspect import isawaitable, iscoroutine
 from os import getpid
 from pathlib import Path
 from socket import AF_INET
 from sys import argv
 from types import TracebackType
-from typing import Any, Callable, Dict, List, Literal, Mapping, Optional, Sequence, Type, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Type,
+    Union,
+)
 
 from change_ls._capabilities_mixin import CapabilitiesMixin
 from change_ls._protocol import (
@@ -31,6 +48,9 @@ from change_ls.types import (
     ConfigurationParams,
     DeclarationClientCapabilities,
     DefinitionClientCapabilities,
+    DiagnosticClientCapabilities,
+    DiagnosticWorkspaceClientCapabilities,
+    DidChangeWatchedFilesClientCapabilities,
     DocumentSymbolClientCapabilities,
     FailureHandlingKind,
     FileOperationClientCapabilities,
@@ -46,6 +66,8 @@ from change_ls.types import (
     MessageType,
     PositionEncodingKind,
     ProgressParams,
+    ProgressToken,
+    PublishDiagnosticsClientCapabilities,
     PublishDiagnosticsParams,
     ReferenceClientCapabilities,
     RegistrationParams,
@@ -61,6 +83,7 @@ from change_ls.types import (
     TokenFormat,
     TypeDefinitionClientCapabilities,
     UnregistrationParams,
+    WindowClientCapabilities,
     WorkDoneProgressCreateParams,
     WorkspaceClientCapabilities,
     WorkspaceEditClientCapabilities,
@@ -68,6 +91,7 @@ from change_ls.types import (
     WorkspaceSymbolClientCapabilities,
 )
 from change_ls.types._client_requests import ClientRequestsMixin, ServerRequestsMixin
+from change_ls.types._util import json_assert_type_object
 
 if sys.platform == "win32":
     from asyncio import ProactorEventLoop
@@ -157,7 +181,9 @@ class StdIOConnectionParams(ServerLaunchParams):
                 "Launching language server %s with arguments %s.", self.server_path, str(self.args)
             )
             _, protocol = await loop.subprocess_exec(
-                lambda: LSSubprocessProtocol(client.dispatch_request, client.dispatch_notification),
+                lambda: LSSubprocessProtocol(
+                    client._dispatch_request, client.dispatch_notification
+                ),
                 self.server_path,
                 *self.args,
                 cwd=self.cwd,
@@ -166,7 +192,9 @@ class StdIOConnectionParams(ServerLaunchParams):
         elif self.launch_command:
             client.logger.info("Launching language server using '%s'.", self.launch_command)
             _, protocol = await loop.subprocess_shell(
-                lambda: LSSubprocessProtocol(client.dispatch_request, client.dispatch_notification),
+                lambda: LSSubprocessProtocol(
+                    client._dispatch_request, client.dispatch_notification
+                ),
                 self.launch_command,
                 cwd=self.cwd,
             )
@@ -207,7 +235,7 @@ class SocketConnectionParams(ServerLaunchParams):
         client.logger.info("Using TCP socket connection.")
 
         loop = get_running_loop()
-        protocol = LSStreamingProtocol(client.dispatch_request, client.dispatch_notification)
+        protocol = LSStreamingProtocol(client._dispatch_request, client.dispatch_notification)
         server = await loop.create_server(
             lambda: protocol, host="127.0.0.1", port=self.port, family=AF_INET
         )
@@ -254,7 +282,7 @@ class PipeConnectionParams(ServerLaunchParams):
                 raise LSPClientException("Pipe connections on Windows require a ProactorEventLoop")
 
             # typeshed expects this to be a StreamReaderProtocol, but that does not make sense.
-            protocol = LSStreamingProtocol(client.dispatch_request, client.dispatch_notification)
+            protocol = LSStreamingProtocol(client._dispatch_request, client.dispatch_notification)
             [server] = await loop.start_serving_pipe(
                 lambda: protocol, self.pipe_name  # type: ignore
             )
@@ -268,7 +296,7 @@ class PipeConnectionParams(ServerLaunchParams):
             client.logger.info(f"Using UNIX Domain Socket connection with name '{self.pipe_name}'")
 
             loop = get_running_loop()
-            protocol = LSStreamingProtocol(client.dispatch_request, client.dispatch_notification)
+            protocol = LSStreamingProtocol(client._dispatch_request, client.dispatch_notification)
             server = await loop.create_unix_server(lambda: protocol, self.pipe_name)
             protocol.set_server(server)
 
@@ -311,13 +339,33 @@ class WorkspaceRequestHandler(ABC):
         pass
 
     @abstractmethod
-    def on_apply_edit(self, params: ApplyWorkspaceEditParams) -> ApplyWorkspaceEditResult:
+    def on_apply_edit(
+        self, params: ApplyWorkspaceEditParams
+    ) -> Union[ApplyWorkspaceEditResult, Awaitable[ApplyWorkspaceEditResult]]:
         return NotImplemented
 
     @abstractmethod
     def on_publish_diagnostics(self, params: PublishDiagnosticsParams) -> None:
         pass
 
+    def on_client_diagnostic_refresh(  # pylint: disable=unused-argument
+        self, client: "Client"
+    ) -> None:
+        """
+        Called with the ``Client`` which received the *workspace/diagnostic/refresh* request.
+        By default, this calls :meth:`on_diagnostic_refresh()`.
+        """
+        self.on_diagnostic_refresh()
+
+    def on_client_publish_diagnostics(  # pylint: disable=unused-argument
+        self, client: "Client", params: PublishDiagnosticsParams
+    ) -> None:
+        """
+        Called with the ``Client`` which received the *textDocument/publishDiagnostics* notification.
+        By default, this calls :meth:`on_publish_diagnostics()`.
+        """
+        self.on_publish_diagnostics(params)
+
 
 def get_default_client_capabilities() -> ClientCapabilities:
     """
@@ -363,6 +411,7 @@ def get_default_client_capabilities() -> ClientCapabilities:
             ]
         ),
         workspace=WorkspaceClientCapabilities(
+            applyEdit=True,
             workspaceEdit=WorkspaceEditClientCapabilities(
                 documentChanges=True,
                 resourceOperations=[
@@ -370,7 +419,7 @@ def get_default_client_capabilities() -> ClientCapabilities:
                     ResourceOperationKind.Rename,
                     ResourceOperationKind.Delete,
                 ],
-                failureHandling=FailureHandlingKind.Abort,
+                failureHandling=FailureHandlingKind.Transactional,
             ),
             fileOperations=FileOperationClientCapabilities(
                 willCreate=True,
@@ -380,6 +429,10 @@ def get_default_client_capabilities() -> ClientCapabilities:
                 willDelete=True,
                 didDelete=True,
             ),
+            didChangeWatchedFiles=DidChangeWatchedFilesClientCapabilities(
+                dynamicRegistration=True, relativePatternSupport=True
+            ),
+            diagnostics=DiagnosticWorkspaceClientCapabilities(refreshSupport=True),
             symbol=WorkspaceSymbolClientCapabilities(
                 symbolKind={"valueSet": all_symbols_kinds},
                 tagSupport={"valueSet": all_symbol_tags},
@@ -387,6 +440,8 @@ def get_default_client_capabilities() -> ClientCapabilities:
             ),
         ),
         textDocument=TextDocumentClientCapabilities(
+            publishDiagnostics=PublishDiagnosticsClientCapabilities(versionSupport=True),
+            diagnostic=DiagnosticClientCapabilities(relatedDocumentSupport=True),
             references=ReferenceClientCapabilities(),
             declaration=DeclarationClientCapabilities(linkSupport=True),
             definition=DefinitionClientCapabilities(linkSupport=True),
@@ -439,6 +494,7 @@ def get_default_client_capabilities() -> ClientCapabilities:
                 formats=[TokenFormat.Relative],
             ),
         ),
+        window=WindowClientCapabilities(workDoneProgress=True),
     )
 
 
@@ -530,6 +586,13 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
     _workspace_request_handler: Optional[WorkspaceRequestHandler]
     _state_callbacks: Dict[ClientState, List[Callable[[], None]]]
 
+    # Tokens of the work done progress which the server has begun, but not yet ended.
+    _work_done_progress: Set[ProgressToken]
+    _work_done_progress_ended: Event
+
+    # Partial results received through $/progress, by the partialResultToken of the request. See send_request_iter().
+    _partial_results: Dict[ProgressToken, "Queue[Any]"]
+
     def __init__(
         self,
         launch_params: ServerLaunchParams,
@@ -561,6 +624,10 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
             "running": [],
             "shutdown": [],
         }
+        self._work_done_progress = set()
+        self._work_done_progress_ended = Event()
+        self._work_done_progress_ended.set()
+        self._partial_results = {}
 
     def __eq__(self, other: Any) -> bool:
         return other is self
@@ -609,6 +676,10 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
 
     def _set_state(self, state: ClientState) -> None:
         self._state = state
+        if state != "running":
+            # Progress is not going to end once the server has stopped.
+            self._work_done_progress.clear()
+            self._work_done_progress_ended.set()
         for callback in self._state_callbacks[state]:
             callback()
         self._logger_client.info(f"Client is now in state {self._state}.")
@@ -677,10 +748,68 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
             raise LSPClientException("Invalid state, expected 'running'.")
         return await self._send_request_internal(method, params, **kwargs)
 
-    async def send_request_iter(self, method: str, params: JSON_VALUE) -> JSON_VALUE:
-        # Version of send_request which returns an async iterator.
-        # This method is used when partial results are requested.
-        pass
+    async def send_request_iter(
+        self, method: str, params: Mapping[str, JSON_VALUE], **kwargs: Any
+    ) -> AsyncIterator[JSON_VALUE]:
+        """
+        Sends a request to the server and yields the parts of its result as they arrive. A *partialResultToken*
+        is added to ``params``, so the server can send parts of the result with *$/progress* notifications
+        before the response. The result of the response is yielded last, unless it is empty, which is the
+        case when the server sent the whole result as partial results.
+
+        Servers which do not support partial results for the request just send the whole result with the response.
+
+        :param timeout: See :meth:`send_request()`.
+        """
+        if self._state != "running":
+            raise LSPClientException("Invalid state, expected 'running'.")
+
+        token = str(uuid.uuid4())
+        end = object()
+        queue: "Queue[Any]" = Queue()
+        self._partial_results[token] = queue
+        self._logger_client.info("Sending request %s with partial results.", method)
+        response = ensure_future(
+            self._send_request_internal(method, {**params, "partialResultToken": token}, **kwargs)
+        )
+        # All partial results are sent before the response, so the end marker is queued last.
+        response.add_done_callback(lambda _: queue.put_nowait(end))
+        try:
+            while (value := await queue.get()) is not end:
+                yield value
+            result = response.result()
+            if result is not None and result != []:
+                yield result
+        finally:
+            del self._partial_results[token]
+            response.cancel()
+
+    @contextmanager
+    def batch_messages(self) -> Iterator[None]:
+        """
+        Returns a context manager which collects all messages sent to the server inside of
+        the ``with`` block and writes them at once when the block is left. This reduces the overhead
+        of sending a large number of small messages, e.g. *textDocument/didOpen* notifications.
+        """
+        if self._protocol is None:
+            yield
+            return
+        with self._protocol.batch_writes():
+            yield
+
+    @property
+    def has_work_done_progress(self) -> bool:
+        """
+        Whether the server has reported work done progress, which has not ended yet.
+        """
+        return len(self._work_done_progress) > 0
+
+    async def wait_for_work_done_progress(self) -> None:
+        """
+        Waits until all work done progress reported by the server has ended, e.g. because
+        the server has finished indexing. Returns immediately if there is no such progress.
+        """
+        await self._work_done_progress_ended.wait()
 
     def _send_notification_internal(self, method: str, params: JSON_VALUE) -> None:
         assert self._protocol
@@ -838,23 +967,50 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
 
     def on_workspace_diagnostic_refresh(self) -> None:
         if self._workspace_request_handler:
-            self._workspace_request_handler.on_diagnostic_refresh()
+            self._workspace_request_handler.on_client_diagnostic_refresh(self)
 
     def on_workspace_code_lens_refresh(self) -> None:
         if self._workspace_request_handler:
             self._workspace_request_handler.on_code_lens_refresh()
 
+    def _dispatch_request(
+        self, method: str, params: JSON_VALUE
+    ) -> Union[JSON_VALUE, Awaitable[JSON_VALUE]]:
+        if method == "workspace/applyEdit":
+            # Applying an edit can involve further requests to the server (e.g. willSaveWaitUntil),
+            # so the response is sent once the edit is done, while other messages are still processed.
+            return self._apply_edit(
+                ApplyWorkspaceEditParams.from_json(json_assert_type_object(params))
+            )
+        return self.dispatch_request(method, params)
+
+    async def _apply_edit(self, params: ApplyWorkspaceEditParams) -> JSON_VALUE:
+        if not self._workspace_request_handler:
+            return self.on_workspace_apply_edit(params).to_json()
+        result = self._workspace_request_handler.on_apply_edit(params)
+        if isawaitable(result):
+            result = await result
+        return result.to_json()
+
     def on_workspace_apply_edit(self, params: ApplyWorkspaceEditParams) -> ApplyWorkspaceEditResult:
-        if self._workspace_request_handler:
-            return self._workspace_request_handler.on_apply_edit(params)
-        else:
+        # Requests from the server are dispatched to _apply_edit() instead, see _dispatch_request().
+        # This only supports WorkspaceRequestHandlers which apply edits synchronously.
+        if not self._workspace_request_handler:
             return ApplyWorkspaceEditResult(
                 applied=False, failureReason="Client is not registered with a Workspace."
             )
+        result = self._workspace_request_handler.on_apply_edit(params)
+        if not isawaitable(result):
+            return result
+        if iscoroutine(result):
+            result.close()
+        return ApplyWorkspaceEditResult(
+            applied=False, failureReason="The edit can only be applied asynchronously."
+        )
 
     def on_text_document_publish_diagnostics(self, params: PublishDiagnosticsParams) -> None:
         if self._workspace_request_handler:
-            self._workspace_request_handler.on_publish_diagnostics(params)
+            self._workspace_request_handler.on_client_publish_diagnostics(self, params)
 
     def on_client_register_capability(self, params: RegistrationParams) -> None:
         for r in params.registrations:
@@ -906,7 +1062,19 @@ class Client(ClientRequestsMixin, ServerRequestsMixin, CapabilitiesMixin):
         pass
 
     def on_s_progress(self, params: ProgressParams) -> None:
-        pass
+        if (queue := self._partial_results.get(params.token)) is not None:
+            queue.put_nowait(params.value)
+            return
+        if not isinstance(params.value, Mapping):
+            return
+        kind = params.value.get("kind")
+        if kind == "begin":
+            self._work_done_progress.add(params.token)
+            self._work_done_progress_ended.clear()
+        elif kind == "end":
+            self._work_done_progress.discard(params.token)
+            if not self._work_done_progress:
+                self._work_done_progress_ended.set()
 
     def __str__(self) -> str:
         return "client:" + str(self._id)
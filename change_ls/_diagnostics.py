@@ -0,0 +1,179 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar, Union
+
+from change_ls._client import Client
+from change_ls.types import Diagnostic, DiagnosticSeverity
+
+_Key = Tuple[str, Client]
+_Code = Union[int, str, None]
+_T = TypeVar("_T")
+
+
+def _update_index(index: Dict[_T, Set[_Key]], values: Set[_T], key: _Key, add: bool) -> None:
+    for value in values:
+        if add:
+            index.setdefault(value, set()).add(key)
+        elif (keys := index.get(value)) is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+
+@dataclass(frozen=True)
+class DocumentDiagnostics:
+    """
+    The diagnostics which a language server reported for a single document.
+    """
+
+    client: Client
+    uri: str
+
+    # The version of the document which the diagnostics belong to, if the language server specified it.
+    # For pulled diagnostics, this is the version at the time of the request.
+    version: Optional[int]
+    diagnostics: Sequence[Diagnostic]
+
+    # The result id of a pulled diagnostic report. It is sent with the next pull request,
+    # so that the language server can answer with an 'unchanged' report.
+    result_id: Optional[str] = None
+
+
+class DiagnosticStore:
+    """
+    Stores the latest diagnostics for each document and :class:`Client`. The diagnostics for a document
+    are replaced as a whole whenever a language server publishes new ones or a pull request returns a new report.
+
+    In addition to the lookup by URI, the documents are indexed by the severity, code and source of their diagnostics,
+    so queries over the whole workspace (e.g. "all errors reported by mypy") only look at the documents which actually
+    contain matching diagnostics. Replacing the diagnostics of one document only touches the index entries of that document.
+    """
+
+    __slots__ = ("_documents", "_by_severity", "_by_code", "_by_source")
+
+    _documents: Dict[str, Dict[Client, DocumentDiagnostics]]
+    _by_severity: Dict[Optional[DiagnosticSeverity], Set[_Key]]
+    _by_code: Dict[_Code, Set[_Key]]
+    _by_source: Dict[Optional[str], Set[_Key]]
+
+    def __init__(self) -> None:
+        self._documents = {}
+        self._by_severity = {}
+        self._by_code = {}
+        self._by_source = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._documents.values())
+
+    def __iter__(self) -> Iterator[DocumentDiagnostics]:
+        for entries in self._documents.values():
+            yield from entries.values()
+
+    def _update_indexes(self, entry: DocumentDiagnostics, add: bool) -> None:
+        key = (entry.uri, entry.client)
+        _update_index(self._by_severity, {d.severity for d in entry.diagnostics}, key, add)
+        _update_index(self._by_code, {d.code for d in entry.diagnostics}, key, add)
+        _update_index(self._by_source, {d.source for d in entry.diagnostics}, key, add)
+
+    def replace(self, entry: DocumentDiagnostics) -> None:
+        """
+        Replaces the diagnostics which ``entry.client`` reported for ``entry.uri``.
+        """
+        entries = self._documents.setdefault(entry.uri, {})
+        if (old_entry := entries.get(entry.client)) is not None:
+            self._update_indexes(old_entry, False)
+        entries[entry.client] = entry
+        self._update_indexes(entry, True)
+
+    def update_version(
+        self, uri: str, client: Client, version: Optional[int], result_id: Optional[str]
+    ) -> Optional[DocumentDiagnostics]:
+        """
+        Marks the diagnostics for ``uri`` as still valid for ``version``, e.g. after a pull request
+        returned an 'unchanged' report. Returns the updated entry, or ``None`` if there is no entry.
+        """
+        entries = self._documents.get(uri)
+        if entries is None or (old_entry := entries.get(client)) is None:
+            return None
+        entries[client] = replace(old_entry, version=version, result_id=result_id)
+        return entries[client]
+
+    def remove(self, uri: str, client: Optional[Client] = None) -> None:
+        """
+        Removes the diagnostics for ``uri``, either only those reported by ``client`` or all of them.
+        """
+        entries = self._documents.get(uri)
+        if entries is None:
+            return
+        for entry_client in [client] if client is not None else list(entries):
+            if (entry := entries.pop(entry_client, None)) is not None:
+                self._update_indexes(entry, False)
+        if not entries:
+            del self._documents[uri]
+
+    def remove_client(self, client: Client) -> None:
+        """
+        Removes all diagnostics reported by ``client``.
+        """
+        for uri in [uri for uri, entries in self._documents.items() if client in entries]:
+            self.remove(uri, client)
+
+    def get(self, uri: str, client: Optional[Client] = None) -> List[DocumentDiagnostics]:
+        """
+        Returns the diagnostics for ``uri`` from each :class:`Client`, or only from ``client``.
+        """
+        entries = self._documents.get(uri)
+        if entries is None:
+            return []
+        if client is not None:
+            entry = entries.get(client)
+            return [entry] if entry is not None else []
+        return list(entries.values())
+
+    def query(
+        self,
+        *,
+        client: Optional[Client] = None,
+        severity: Optional[DiagnosticSeverity] = None,
+        code: _Code = None,
+        source: Optional[str] = None,
+    ) -> List[DocumentDiagnostics]:
+        """
+        Returns the diagnostics in the whole workspace which match all of the given criteria, grouped by document.
+        Each returned :class:`DocumentDiagnostics` only contains the matching diagnostics, and documents without
+        any matching diagnostics are left out.
+
+        :param client: Only return diagnostics reported by this :class:`Client`.
+        :param severity: Only return diagnostics with this severity.
+        :param code: Only return diagnostics with this code.
+        :param source: Only return diagnostics from this source, e.g. ``"mypy"``.
+        """
+        candidates: List[Set[_Key]] = []
+        if severity is not None:
+            candidates.append(self._by_severity.get(severity, set()))
+        if code is not None:
+            candidates.append(self._by_code.get(code, set()))
+        if source is not None:
+            candidates.append(self._by_source.get(source, set()))
+
+        keys: Iterator[_Key]
+        if candidates:
+            candidates.sort(key=len)
+            keys = iter(candidates[0].intersection(*candidates[1:]))
+        else:
+            keys = ((uri, c) for uri, entries in self._documents.items() for c in entries)
+
+        out: List[DocumentDiagnostics] = []
+        for uri, entry_client in keys:
+            if client is not None and entry_client != client:
+                continue
+            entry = self._documents[uri][entry_client]
+            diagnostics = [
+                d
+                for d in entry.diagnostics
+                if (severity is None or d.severity == severity)
+                and (code is None or d.code == code)
+                and (source is None or d.source == source)
+            ]
+            if diagnostics:
+                out.append(replace(entry, diagnostics=diagnostics))
+        return out
@@ -0,0 +1,92 @@
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+
+@dataclass
+class _FileBackup:
+    path: Path
+
+    # None if the file did not exist.
+    data: Optional[bytes]
+
+
+@dataclass
+class _DirectoryBackup:
+    path: Path
+
+    # Whether the directory existed. Directories which did not exist are removed on rollback if they are empty.
+    existed: bool
+
+
+@dataclass
+class _Rename:
+    source: Path
+    destination: Path
+
+
+_JournalEntry = Union[_FileBackup, _DirectoryBackup, _Rename]
+
+
+class _EditJournal:
+    """
+    Records the original state of every file and directory before a :class:`WorkspaceEdit` modifies it,
+    so that a failed edit can be rolled back. See ``Workspace.perform_edit_and_save(transactional=True)``.
+
+    The journal which is currently recording is stored in a context variable, so edits which are
+    performed as a consequence of the ``WorkspaceEdit``, e.g. in response to *workspace/willRenameFiles*,
+    are recorded in the same journal.
+    """
+
+    __slots__ = ("_entries",)
+
+    _entries: List[_JournalEntry]
+
+    def __init__(self) -> None:
+        self._entries = []
+
+    @property
+    def entries(self) -> List[_JournalEntry]:
+        return self._entries
+
+    def backup_file(self, path: Path) -> None:
+        """
+        Records the contents of the file at ``path``, or that it does not exist.
+        """
+        try:
+            data: Optional[bytes] = path.read_bytes()
+        except FileNotFoundError:
+            data = None
+        self._entries.append(_FileBackup(path, data))
+
+    def backup_missing_directories(self, path: Path) -> None:
+        """
+        Records which of the directories leading up to and including ``path`` do not exist yet.
+        """
+        missing: List[Path] = []
+        while not path.exists() and path.parent != path:
+            missing.append(path)
+            path = path.parent
+        # Appended from the outside in, so the innermost directory is removed first on rollback.
+        for directory in reversed(missing):
+            self._entries.append(_DirectoryBackup(directory, False))
+
+    def backup_tree(self, path: Path) -> None:
+        """
+        Records the contents of all files below ``path`` and the directories themselves.
+        """
+        if not path.is_dir() or path.is_symlink():
+            self.backup_file(path)
+            return
+        for directory, _, files in os.walk(path):
+            self._entries.append(_DirectoryBackup(Path(directory), True))
+            for name in files:
+                self.backup_file(Path(directory, name))
+
+    def record_rename(self, source: Path, destination: Path) -> None:
+        self._entries.append(_Rename(source, destination))
+
+
+_active_journal: ContextVar[Optional[_EditJournal]] = ContextVar("_active_journal", default=None)
@@ -0,0 +1,154 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import accumulate, islice
+from typing import Deque, List, Optional, Sequence, Tuple
+
+# The edit log keeps the edits of at most this many versions and at most this many edits in total.
+# Older versions can no longer be mapped, see _EditLog.append().
+_MAX_VERSIONS = 1024
+_MAX_EDITS = 1 << 16
+
+
+class _EditLogEntry:
+    """
+    The edits committed for a single version of a document, stored as three parallel arrays.
+
+    ``from_offsets`` and ``to_offsets`` contain the replaced ranges in ascending order,
+    ``shifts[i]`` contains the total change in length caused by the edits up to and including the i-th edit.
+    """
+
+    __slots__ = ("from_offsets", "to_offsets", "shifts")
+
+    from_offsets: "array[int]"
+    to_offsets: "array[int]"
+    shifts: "array[int]"
+
+    def __init__(self, edits: Sequence[Tuple[int, int, int]]) -> None:
+        self.from_offsets = array("i", (from_offset for from_offset, _, _ in edits))
+        self.to_offsets = array("i", (to_offset for _, to_offset, _ in edits))
+        self.shifts = array(
+            "i",
+            accumulate(
+                new_length - (to_offset - from_offset)
+                for from_offset, to_offset, new_length in edits
+            ),
+        )
+
+    def _shift_before(self, index: int) -> int:
+        return self.shifts[index - 1] if index > 0 else 0
+
+    def map_offset(self, offset: int, right_bias: bool) -> int:
+        # Offsets inside a replaced range are moved to the start or end of the new text.
+        # At the position of an insertion, the bias decides whether the offset ends up before or after it.
+        if right_bias:
+            index = bisect_right(self.from_offsets, offset)
+            if index > 0 and self.to_offsets[index - 1] > offset:
+                return self.to_offsets[index - 1] + self.shifts[index - 1]
+            return offset + self._shift_before(index)
+        else:
+            index = bisect_left(self.from_offsets, offset)
+            if index > 0 and self.to_offsets[index - 1] > offset:
+                return self.from_offsets[index - 1] + self._shift_before(index - 1)
+            return offset + self._shift_before(index)
+
+    def __len__(self) -> int:
+        return len(self.from_offsets)
+
+    def touches(self, start: int, end: int) -> bool:
+        """
+        Checks whether any edit changes the text in the range [start:end). Insertions at the
+        boundaries of the range do not count as changes, so an empty range is only touched by
+        edits which replace text around it.
+        """
+        index = bisect_left(self.from_offsets, end)
+        if index == 0:
+            return False
+        return self.to_offsets[index - 1] > start or self.from_offsets[index - 1] > start
+
+
+class _EditLog:
+    """
+    Records the edits committed to a document for each version, so that offsets
+    can be carried over from older versions to newer ones.
+
+    Only the most recent versions are kept, so that long-lived documents don't accumulate
+    the edits of their whole lifetime.
+    """
+
+    __slots__ = ("_first_version", "_entries", "_edit_count")
+
+    # The version from which _entries[0] transforms.
+    _first_version: int
+
+    # None for versions without any edits.
+    _entries: Deque[Optional[_EditLogEntry]]
+
+    # The total number of edits in _entries.
+    _edit_count: int
+
+    def __init__(self, version: int) -> None:
+        self._first_version = version
+        self._entries = deque()
+        self._edit_count = 0
+
+    @property
+    def version(self) -> int:
+        """
+        The version after the last recorded entry.
+        """
+        return self._first_version + len(self._entries)
+
+    def append(self, edits: Sequence[Tuple[int, int, int]]) -> None:
+        """
+        Records the edits which turn the current :attr:`version` into the next one. ``edits`` contains
+        (from_offset, to_offset, length of the new text) for each edit, sorted by their offsets.
+
+        The oldest entries are dropped once the log exceeds its limits. The latest entry is always kept.
+        """
+        self._entries.append(_EditLogEntry(edits) if edits else None)
+        self._edit_count += len(edits)
+        while len(self._entries) > 1 and (
+            len(self._entries) > _MAX_VERSIONS or self._edit_count > _MAX_EDITS
+        ):
+            entry = self._entries.popleft()
+            self._first_version += 1
+            if entry is not None:
+                self._edit_count -= len(entry)
+
+    def _get_entries(self, old_version: int, new_version: int) -> List[Optional[_EditLogEntry]]:
+        if old_version > new_version:
+            raise ValueError(
+                f"Cannot map from version {old_version} to older version {new_version}."
+            )
+        if old_version < self._first_version or new_version > self.version:
+            raise ValueError(
+                f"Edits are only available from version {self._first_version} to {self.version}."
+            )
+        return list(
+            islice(
+                self._entries, old_version - self._first_version, new_version - self._first_version
+            )
+        )
+
+    def map_offset(self, old_version: int, offset: int, new_version: int, right_bias: bool) -> int:
+        for entry in self._get_entries(old_version, new_version):
+            if entry is not None:
+                offset = entry.map_offset(offset, right_bias)
+        return offset
+
+    def map_range(
+        self, old_version: int, start: int, end: int, new_version: int
+    ) -> Optional[Tuple[int, int]]:
+        # Insertions at the start of the range are placed before the range and insertions at the end after it,
+        # so the range keeps covering the same text. Empty ranges stay empty.
+        for entry in self._get_entries(old_version, new_version):
+            if entry is None:
+                continue
+            if entry.touches(start, end):
+                return None
+            if start == end:
+                start = end = entry.map_offset(start, False)
+            else:
+                start, end = entry.map_offset(start, True), entry.map_offset(end, False)
+        return start, end
@@ -0,0 +1,335 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from change_ls.types import FileChangeType
+
+# Modification time and size of a file. A file is considered changed when either of them changes.
+_FileStamp = Tuple[int, int]
+
+
+def _translate_ignore_pattern(pattern: str) -> str:
+    """
+    Translates a single gitignore pattern (without negation and trailing '/') into a regular expression,
+    which matches paths relative to the directory containing the ignore file.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        elif c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            out.append(re.escape(pattern[i]))
+        elif c == "[" and (end := pattern.find("]", i + 2)) != -1:
+            selection = pattern[i + 1 : end]
+            if selection[0] == "!":
+                selection = "^" + selection[1:]
+            out.append("[" + selection.replace("\\", "\\\\") + "]")
+            i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return prefix + "".join(out)
+
+
+class _IgnoreRules:
+    """
+    The patterns from a single ignore file, e.g. a ``.gitignore``.
+    """
+
+    __slots__ = ("_patterns",)
+
+    # (regex, negated, only matches directories) in the order they appear in the file.
+    _patterns: List[Tuple["re.Pattern[str]", bool, bool]]
+
+    def __init__(self, lines: Sequence[str]) -> None:
+        self._patterns = []
+        for line in lines:
+            line = line.rstrip("\n\r")
+            # Trailing spaces are ignored unless they are escaped.
+            stripped = line.rstrip(" ")
+            if stripped.endswith("\\") and len(stripped) < len(line):
+                stripped += " "
+            line = stripped
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            regex = re.compile(_translate_ignore_pattern(line), re.DOTALL)
+            self._patterns.append((regex, negated, directory_only))
+
+    def match(self, relative_path: str, is_directory: bool) -> Optional[bool]:
+        """
+        Returns whether ``relative_path`` is ignored by these rules, or None if none of the patterns match.
+        ``relative_path`` must use '/' as separator and be relative to the directory of the ignore file.
+        """
+        result: Optional[bool] = None
+        for regex, negated, directory_only in self._patterns:
+            if directory_only and not is_directory:
+                continue
+            if regex.fullmatch(relative_path):
+                result = not negated
+        return result
+
+
+class _Directory:
+    __slots__ = ("mtime", "files", "directories", "ignore_stamp", "rules")
+
+    mtime: int
+
+    # Names of the files and subdirectories which are not ignored.
+    files: List[str]
+    directories: List[str]
+
+    # The stamp and parsed contents of the ignore file in this directory, if any.
+    ignore_stamp: Optional[_FileStamp]
+    rules: Optional[_IgnoreRules]
+
+    def __init__(
+        self,
+        mtime: int,
+        files: List[str],
+        directories: List[str],
+        ignore_stamp: Optional[_FileStamp],
+        rules: Optional[_IgnoreRules],
+    ) -> None:
+        self.mtime = mtime
+        self.files = files
+        self.directories = directories
+        self.ignore_stamp = ignore_stamp
+        self.rules = rules
+
+
+def _stat_file(path: str) -> Optional[_FileStamp]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _join(directory: str, name: str) -> str:
+    return f"{directory}/{name}" if directory else name
+
+
+class _FileIndex:
+    """
+    A cached listing of the files below a single workspace root. Files and directories
+    matched by the ignore files (``.gitignore`` by default) are not part of the index,
+    and neither are ``.git`` directories.
+
+    The index is kept up to date by calling :meth:`refresh()`, which polls the file system.
+    Directories whose modification time did not change are not listed again, only the files
+    in them are checked for changes.
+    """
+
+    __slots__ = ("_root", "_ignore_file_names", "_directories", "_files")
+
+    _root: Path
+    _ignore_file_names: Tuple[str, ...]
+
+    # Keys are paths relative to the root, using '/' as separator. The root itself is "".
+    _directories: Dict[str, _Directory]
+    _files: Dict[str, _FileStamp]
+
+    def __init__(self, root: Path, ignore_file_names: Sequence[str] = (".gitignore",)) -> None:
+        self._root = root
+        self._ignore_file_names = tuple(ignore_file_names)
+        self._directories = {}
+        self._files = {}
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __iter__(self) -> Iterator[Path]:
+        return (self._root / relative_path for relative_path in self._files)
+
+    def contains(self, relative_path: str) -> bool:
+        """
+        Checks whether the index contains the file at ``relative_path``. This does not access the file system.
+        """
+        return relative_path in self._files
+
+    def is_ignored(self, relative_path: str, is_directory: bool = False) -> bool:
+        """
+        Checks whether ``relative_path`` is excluded from the index by an ignore file.
+        Only ignore files from directories which are part of the index are considered.
+        """
+        parts = relative_path.split("/")
+        rules_stack: List[Tuple[str, _IgnoreRules]] = []
+        directory = ""
+        for index, name in enumerate(parts):
+            if (entry := self._directories.get(directory)) is None:
+                return False
+            if entry.rules is not None:
+                rules_stack.append((directory, entry.rules))
+            is_last = index == len(parts) - 1
+            if self._is_ignored(_join(directory, name), is_directory or not is_last, rules_stack):
+                return True
+            directory = _join(directory, name)
+        return False
+
+    def _is_ignored(
+        self, relative_path: str, is_directory: bool, rules_stack: List[Tuple[str, _IgnoreRules]]
+    ) -> bool:
+        if is_directory and relative_path.rsplit("/", 1)[-1] == ".git":
+            return True
+        # Rules from deeper directories take precedence.
+        for directory, rules in reversed(rules_stack):
+            path_in_directory = relative_path[len(directory) + 1 :] if directory else relative_path
+            if (result := rules.match(path_in_directory, is_directory)) is not None:
+                return result
+        return False
+
+    def _stat_ignore_file(self, directory_path: str) -> Tuple[Optional[_FileStamp], Optional[str]]:
+        for name in self._ignore_file_names:
+            path = os.path.join(directory_path, name)
+            if (stamp := _stat_file(path)) is not None:
+                return stamp, path
+        return None, None
+
+    def _list_directory(
+        self,
+        relative_path: str,
+        mtime: int,
+        rules_stack: List[Tuple[str, _IgnoreRules]],
+        ignore_stamp: Optional[_FileStamp],
+        ignore_path: Optional[str],
+        new_files: Dict[str, _FileStamp],
+    ) -> _Directory:
+        rules: Optional[_IgnoreRules] = None
+        if ignore_path is not None:
+            try:
+                with open(ignore_path, "r", encoding="utf-8", errors="replace") as file:
+                    rules = _IgnoreRules(file.readlines())
+            except OSError:
+                pass
+        if rules is not None:
+            rules_stack = rules_stack + [(relative_path, rules)]
+
+        files: List[str] = []
+        directories: List[str] = []
+        with os.scandir(self._root / relative_path) as entries:
+            for entry in entries:
+                try:
+                    # Symlinks to directories are not followed, so the walk cannot run into cycles.
+                    is_directory = entry.is_dir(follow_symlinks=False)
+                    if not is_directory and not entry.is_file():
+                        continue
+                    entry_path = _join(relative_path, entry.name)
+                    if self._is_ignored(entry_path, is_directory, rules_stack):
+                        continue
+                    if is_directory:
+                        directories.append(entry.name)
+                    else:
+                        stat = entry.stat()
+                        new_files[entry_path] = (stat.st_mtime_ns, stat.st_size)
+                        files.append(entry.name)
+                except OSError:
+                    # The entry was removed while listing the directory.
+                    continue
+        return _Directory(mtime, files, directories, ignore_stamp, rules)
+
+    def refresh(self) -> List[Tuple[Path, FileChangeType]]:
+        """
+        Updates the index and returns the files which were created, changed or deleted since the
+        last call to ``refresh()``. Files which become ignored or stop being ignored because an ignore
+        file changed are reported as deleted or created respectively.
+
+        The first call builds the index and reports every file as created.
+        """
+        new_directories: Dict[str, _Directory] = {}
+        new_files: Dict[str, _FileStamp] = {}
+
+        # (relative path, ignore rules of the parent directories, whether the listing of the parent can be reused)
+        stack: List[Tuple[str, List[Tuple[str, _IgnoreRules]], bool]] = [("", [], True)]
+        while stack:
+            relative_path, rules_stack, reusable = stack.pop()
+            directory_path = str(self._root / relative_path)
+            try:
+                mtime = os.stat(directory_path).st_mtime_ns
+            except OSError:
+                continue
+            ignore_stamp, ignore_path = self._stat_ignore_file(directory_path)
+
+            old_entry = self._directories.get(relative_path)
+            if (
+                reusable
+                and old_entry is not None
+                and old_entry.mtime == mtime
+                and old_entry.ignore_stamp == ignore_stamp
+            ):
+                # No entries were added or removed, so only the files themselves need to be checked.
+                entry = old_entry
+                for name in entry.files:
+                    file_path = _join(relative_path, name)
+                    if (stamp := _stat_file(os.path.join(directory_path, name))) is not None:
+                        new_files[file_path] = stamp
+            else:
+                try:
+                    entry = self._list_directory(
+                        relative_path, mtime, rules_stack, ignore_stamp, ignore_path, new_files
+                    )
+                except OSError:
+                    continue
+                # Changed ignore rules can affect the whole subtree, including the subtrees of
+                # directories whose own ignore files did not change.
+                reusable = (
+                    reusable and old_entry is not None and old_entry.ignore_stamp == ignore_stamp
+                )
+
+            new_directories[relative_path] = entry
+            if entry.rules is not None:
+                rules_stack = rules_stack + [(relative_path, entry.rules)]
+            for name in entry.directories:
+                stack.append((_join(relative_path, name), rules_stack, reusable))
+
+        events: List[Tuple[Path, FileChangeType]] = []
+        for relative_path, stamp in new_files.items():
+            old_stamp = self._files.get(relative_path)
+            if old_stamp is None:
+                events.append((self._root / relative_path, FileChangeType.Created))
+            elif old_stamp != stamp:
+                events.append((self._root / relative_path, FileChangeType.Changed))
+        for relative_path in self._files:
+            if relative_path not in new_files:
+                events.append((self._root / relative_path, FileChangeType.Deleted))
+
+        self._directories = new_directories
+        self._files = new_files
+        return events
@@ -0,0 +1,213 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, Optional, Sequence, Tuple
+
+from change_ls._rope import Rope
+from change_ls.types import PositionEncodingKind
+
+
+def _utf_8_prefix_sums(line: str) -> "array[int]":
+    widths = (
+        1 if c < "\x80" else 2 if c < "\u0800" else 3 if c < "\U00010000" else 4 for c in line
+    )
+    return array("i", accumulate(widths, initial=0))
+
+
+def _utf_16_prefix_sums(line: str) -> "array[int]":
+    widths = (1 if c < "\U00010000" else 2 for c in line)
+    return array("i", accumulate(widths, initial=0))
+
+
+class _LineWidths:
+    """
+    Code unit prefix sums for a single line containing non-ASCII characters.
+
+    ``utf_8[i]`` and ``utf_16[i]`` contain the number of code units before the i-th
+    character of the line.
+    """
+
+    __slots__ = ("utf_8", "utf_16")
+
+    utf_8: "array[int]"
+    utf_16: "array[int]"
+
+    def __init__(self, line: str) -> None:
+        self.utf_8 = _utf_8_prefix_sums(line)
+        self.utf_16 = _utf_16_prefix_sums(line)
+
+    def get(self, encoding: PositionEncodingKind) -> Optional["array[int]"]:
+        if encoding == PositionEncodingKind.UTF8:
+            return self.utf_8
+        elif encoding == PositionEncodingKind.UTF16:
+            return self.utf_16
+        else:
+            return None
+
+
+class _Line:
+    """
+    Offsets and code unit widths of a single line.
+    """
+
+    __slots__ = ("start", "end", "length", "widths")
+
+    # The offset of the first character of the line.
+    start: int
+
+    # The offset after the line break, or the end of the text for the last line.
+    end: int
+
+    # The number of characters on the line, excluding the line break.
+    length: int
+
+    # None for ASCII-only lines.
+    widths: Optional[_LineWidths]
+
+    def __init__(self, start: int, text: str) -> None:
+        self.start = start
+        self.end = start + len(text)
+        self.length = len(text.rstrip("\r\n"))
+        self.widths = None if text.isascii() else _LineWidths(text)
+
+    def get_prefix_sums(self, encoding: PositionEncodingKind) -> Optional["array[int]"]:
+        return self.widths.get(encoding) if self.widths is not None else None
+
+
+class _LineIndex:
+    """
+    Converts between offsets into a text and line/character positions in any of the
+    LSP position encodings.
+
+    Lines are located through the line break counts stored in the rope, so creating an
+    index is free and each line is found in O(log n). The offsets and code unit widths of
+    a line are only computed when a position on that line is converted for the first time.
+    Lines consisting only of ASCII characters (the common case for source code) need no
+    further bookkeeping, because offsets and code units coincide for all encodings.
+    """
+
+    _rope: Rope
+
+    # Lines which have been accessed before.
+    _lines: Dict[int, _Line]
+
+    def __init__(self, rope: Rope) -> None:
+        self._rope = rope
+        self._lines = {}
+
+    @property
+    def line_count(self) -> int:
+        return self._rope.line_count
+
+    def line_start(self, line: int) -> int:
+        return self._rope.line_start(line)
+
+    def line_of_offset(self, offset: int) -> int:
+        return self._rope.line_of_offset(offset)
+
+    def _get_line(self, line: int) -> _Line:
+        try:
+            return self._lines[line]
+        except KeyError:
+            if line < 0 or line >= self._rope.line_count:
+                raise IndexError(f"Line {line} is out of bounds") from None
+            start = self._rope.line_start(line)
+            end = (
+                self._rope.line_start(line + 1)
+                if line + 1 < self._rope.line_count
+                else len(self._rope)
+            )
+            out = _Line(start, self._rope.slice(start, end))
+            self._lines[line] = out
+            return out
+
+    def _code_units_to_column(
+        self, line: int, code_units: int, prefix_sums: Optional["array[int]"], line_length: int
+    ) -> int:
+        if prefix_sums is None:
+            if code_units < 0 or code_units > line_length:
+                raise IndexError(f"Position at line {line} character {code_units} does not exist")
+            return code_units
+
+        column = bisect_left(prefix_sums, code_units, 0, line_length + 1)
+        if column > line_length or code_units < 0:
+            raise IndexError(f"Position at line {line} character {code_units} does not exist")
+        if prefix_sums[column] != code_units:
+            raise IndexError(f"Code unit {code_units} is not a valid codepoint boundary.")
+        return column
+
+    def position_to_offset(self, line: int, character: int, encoding: PositionEncodingKind) -> int:
+        line_data = self._get_line(line)
+        column = self._code_units_to_column(
+            line, character, line_data.get_prefix_sums(encoding), line_data.length
+        )
+        return line_data.start + column
+
+    def offset_to_position(self, offset: int, encoding: PositionEncodingKind) -> Tuple[int, int]:
+        line = self._rope.line_of_offset(offset)
+        line_data = self._get_line(line)
+        column = offset - line_data.start
+        prefix_sums = line_data.get_prefix_sums(encoding)
+        return line, prefix_sums[column] if prefix_sums is not None else column
+
+    def positions_to_offsets(
+        self, positions: Sequence[int], encoding: PositionEncodingKind
+    ) -> "array[int]":
+        """
+        Batched version of :meth:`position_to_offset`. ``positions`` is a flat sequence
+        of line/character pairs. The line data is only looked up when the line changes
+        between two consecutive positions, so positions should be sorted by line.
+        """
+        if len(positions) % 2 != 0:
+            raise ValueError("positions must contain pairs of line and character.")
+
+        out = array("i")
+        current_line = -1
+        line_data: Optional[_Line] = None
+        prefix_sums: Optional["array[int]"] = None
+        for i in range(0, len(positions), 2):
+            line = positions[i]
+            if line != current_line or line_data is None:
+                current_line = line
+                line_data = self._get_line(line)
+                prefix_sums = line_data.get_prefix_sums(encoding)
+            out.append(
+                line_data.start
+                + self._code_units_to_column(line, positions[i + 1], prefix_sums, line_data.length)
+            )
+        return out
+
+    def offsets_to_positions(
+        self, offsets: Sequence[int], encoding: PositionEncodingKind
+    ) -> "array[int]":
+        """
+        Batched version of :meth:`offset_to_position`. Returns a flat array of line/character
+        pairs. The line is only looked up when an offset falls outside of the line of the
+        previous offset, so offsets should be sorted.
+        """
+        text_length = len(self._rope)
+        last_line = self._rope.line_count - 1
+
+        out = array("i")
+        line = 0
+        line_data = self._get_line(0)
+        prefix_sums = line_data.get_prefix_sums(encoding)
+        for offset in offsets:
+            if offset < 0 or offset > text_length:
+                raise IndexError(f"Offset {offset} is out of bounds.")
+
+            if offset < line_data.start or (offset >= line_data.end and line != last_line):
+                line = self._rope.line_of_offset(offset)
+                line_data = self._get_line(line)
+                prefix_sums = line_data.get_prefix_sums(encoding)
+
+            column = offset - line_data.start
+            out.append(line)
+            out.append(prefix_sums[column] if prefix_sums is not None else column)
+        return out
+
+    def offset_to_byte_offset(self, offset: int) -> int:
+        return self._rope.utf_8_offset(offset)
+
+    def byte_offset_to_offset(self, byte_offset: int) -> int:
+        return self._rope.offset_of_utf_8(byte_offset)
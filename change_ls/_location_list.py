@@ -1,4 +1,5 @@
 import os
+from array import array
 from itertools import groupby
 from types import TracebackType
 from typing import Dict, Iterator, List, Mapping, Sequence, Tuple, Type, Union
@@ -6,6 +7,7 @@ from typing import Dict, Iterator, List, Mapping, Sequence, Tuple, Type, Union
 import change_ls._text_document as td
 import change_ls._workspace as ws
 from change_ls._change_ls_error import ChangeLSError
+from change_ls._snapshot import TextDocumentSnapshot
 from change_ls.types import Location, LocationLink
 
 
@@ -17,10 +19,20 @@ def _text_document_matches_uri_windows(doc: "td.TextDocument", uri: str) -> bool
     return doc.uri.casefold() == uri.casefold()
 
 
+def _uris_match_posix(uri_1: str, uri_2: str) -> bool:
+    return uri_1 == uri_2
+
+
+def _uris_match_windows(uri_1: str, uri_2: str) -> bool:
+    return uri_1.casefold() == uri_2.casefold()
+
+
 if os.name == "nt":
     _text_document_matches_uri = _text_document_matches_uri_windows
+    _uris_match = _uris_match_windows
 else:
     _text_document_matches_uri = _text_document_matches_uri_posix
+    _uris_match = _uris_match_posix
 
 
 class LocationList(Mapping["td.TextDocument", List[Tuple[int, int]]]):
@@ -37,15 +49,18 @@ class LocationList(Mapping["td.TextDocument", List[Tuple[int, int]]]):
             for start_offset, end_offset in locations[text_document]:
                 ...
 
-    An entry in a ``LocationList`` is only valid as long as the underlying ``TextDocument`` is not changed
-    (e.g. by calling :meth:`TextDocument.commit_edits()` or :meth:`Workspace.perform_edit_and_save()`). When
-    a ``TextDocument`` is changed, it is no longer returned by the ``LocationList``, but other entries are unaffected
-    by this. It is therefore possible to commit changes once to a document while iterating through the entries of a list
-    (i.e. at the end of the outer loop in the example above).
+    An entry in a ``LocationList`` is only valid as long as the ranges in the underlying ``TextDocument`` are not changed
+    (e.g. by calling :meth:`TextDocument.commit_edits()` or :meth:`Workspace.perform_edit_and_save()`). Edits
+    elsewhere in the document do not invalidate the entry, instead its ranges are moved to the new version of the document
+    (see :meth:`TextDocument.map_range()`). When the text of any of the ranges is changed, the ``TextDocument``
+    is no longer returned by the ``LocationList``, but other entries are unaffected by this. It is therefore possible to commit changes once to a document while iterating through the entries of a list
+    (i.e. at the end of the outer loop in the example above). The entries of changed documents remain available
+    through :meth:`get_with_snapshot()`, together with the :class:`TextDocumentSnapshot` they refer to.
     """
 
     _text_documents: List["td.TextDocument"]
     _original_keys: List[Tuple[str, int]]
+    _snapshots: List[TextDocumentSnapshot]
     _data: Dict[str, List[Tuple[int, int]]]
 
     class _LocationListIterator(Iterator["td.TextDocument"]):
@@ -81,6 +96,7 @@ class LocationList(Mapping["td.TextDocument", List[Tuple[int, int]]]):
     ) -> None:
         self._text_documents = list(text_documents)
         self._original_keys = [(doc.uri, doc.version) for doc in text_documents]
+        self._snapshots = [doc.snapshot() for doc in text_documents]
         self._data = {doc.uri: l for doc, l in zip(text_documents, locations)}
 
         for doc in self._text_documents:
@@ -113,16 +129,23 @@ class LocationList(Mapping["td.TextDocument", List[Tuple[int, int]]]):
             doc = workspace.open_text_document(uri)
             text_documents.append(doc)
 
-            offset_locations_in_document: List[Tuple[int, int]] = []
+            positions = array("i")
             for l in lsp_locations_in_document:
                 if isinstance(l, Location):
                     location_range = l.range
                 else:
                     location_range = l.targetSelectionRange
-                start = doc.position_to_offset(location_range.start)
-                end = doc.position_to_offset(location_range.end)
-                offset_locations_in_document.append((start, end))
-
+                positions.extend(
+                    (
+                        location_range.start.line,
+                        location_range.start.character,
+                        location_range.end.line,
+                        location_range.end.character,
+                    )
+                )
+
+            offsets = doc.positions_to_offsets(positions)
+            offset_locations_in_document = list(zip(offsets[0::2], offsets[1::2]))
             offset_locations_in_document.sort()
             locations.append(offset_locations_in_document)
 
@@ -143,16 +166,64 @@ class LocationList(Mapping["td.TextDocument", List[Tuple[int, int]]]):
             doc.close()
         self._text_documents = []
         self._original_keys = []
+        self._snapshots = []
         self._data = {}
         return False
 
     def _is_valid_index(self, index: int) -> bool:
         if index >= len(self._text_documents):
             return False
-        return (
-            self._text_documents[index].uri,
-            self._text_documents[index].version,
-        ) == self._original_keys[index]
+        doc = self._text_documents[index]
+        uri, version = self._original_keys[index]
+        if doc.uri != uri:
+            return False
+        if doc.version == version:
+            return True
+
+        # Try to carry the ranges over to the new version of the document.
+        new_ranges: List[Tuple[int, int]] = []
+        for offset_range in self._data[uri]:
+            try:
+                new_range = doc.map_range(version, offset_range)
+            except ValueError:
+                # The edits since the version are no longer recorded, e.g. after a reload.
+                return False
+            if new_range is None:
+                return False
+            new_ranges.append(new_range)
+        self._data[uri] = new_ranges
+        self._original_keys[index] = (uri, doc.version)
+        self._snapshots[index] = doc.snapshot()
+        return True
+
+    def _find_index(self, key: Union["td.TextDocument", str]) -> int:
+        if isinstance(key, td.TextDocument):
+            try:
+                return self._text_documents.index(key)
+            except ValueError as e:
+                raise KeyError(key.uri) from e
+
+        # The original URIs are used, so renamed documents can be found as well.
+        for index, (uri, _) in enumerate(self._original_keys):
+            if _uris_match(uri, key):
+                return index
+        raise KeyError(key)
+
+    def get_with_snapshot(
+        self, key: Union["td.TextDocument", str]
+    ) -> Tuple[TextDocumentSnapshot, List[Tuple[int, int]]]:
+        """
+        Returns the ranges for a :class:`TextDocument`, together with the :class:`TextDocumentSnapshot`
+        of the version the ranges refer to. Unlike indexing the ``LocationList`` directly, this also works
+        after the ranges in the ``TextDocument`` have been changed. Otherwise, the ranges are moved to the
+        current version of the document first.
+
+        :param key: Either a ``TextDocument`` or the URI of the document at the time the ``LocationList`` was created.
+        """
+        index = self._find_index(key)
+        self._is_valid_index(index)
+        snapshot = self._snapshots[index]
+        return snapshot, self._data[snapshot.uri]
 
     def __getitem__(self, key: Union["td.TextDocument", str]) -> List[Tuple[int, int]]:
         if isinstance(key, td.TextDocument):
@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class DurationStats:
+    """
+    Summary of the durations recorded with :meth:`Metrics.record_duration()`.
+    All durations are in seconds.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+    last: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+
+class Metrics:
+    """
+    A collection of named counters, which track the work done by a :class:`Workspace`
+    and its :class:`TextDocuments <TextDocument>`. The metrics of a ``Workspace`` are available
+    through :attr:`Workspace.metrics`.
+
+    The following counters are currently collected:
+
+    * ``did_change.full_events``: Number of *textDocument/didChange* notifications
+      which contained the full text of a document.
+    * ``did_change.incremental_events``: Number of incremental content change events sent
+      in *textDocument/didChange* notifications.
+    * ``did_change.bytes_sent``: Estimated size of the content changes sent to language servers.
+    * ``did_change.bytes_saved``: Estimated number of bytes saved by choosing the smaller of full and
+      incremental content changes.
+    * ``save.skipped_writes``: Number of saves which did not write the file, because its contents were
+      already up to date.
+
+    Sizes are estimated from character counts, so they are exact for ASCII text only.
+
+    Additionally, the following durations are recorded:
+
+    * ``save``: Total duration of :meth:`TextDocument.save()`, including the communication with language servers.
+    * ``save.write``: Duration of writing a document to its file.
+    """
+
+    _counters: Dict[str, int]
+    _durations: Dict[str, DurationStats]
+
+    def __init__(self) -> None:
+        self._counters = {}
+        self._durations = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Adds ``value`` to the counter ``name``.
+        """
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def get(self, name: str) -> int:
+        """
+        Returns the current value of the counter ``name``, or 0 if the counter was never incremented.
+        """
+        return self._counters.get(name, 0)
+
+    def record_duration(self, name: str, seconds: float) -> None:
+        """
+        Adds a duration to the :class:`DurationStats` ``name``.
+        """
+        stats = self._durations.setdefault(name, DurationStats())
+        stats.count += 1
+        stats.total += seconds
+        stats.maximum = max(stats.maximum, seconds)
+        stats.last = seconds
+
+    def get_duration(self, name: str) -> Optional[DurationStats]:
+        """
+        Returns the :class:`DurationStats` for ``name``, or None if no duration was recorded.
+        """
+        return self._durations.get(name)
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Returns a copy of all counters.
+        """
+        return dict(self._counters)
+
+    def reset(self) -> None:
+        """
+        Resets all counters and durations.
+        """
+        self._counters = {}
+        self._durations = {}
+
+    def __repr__(self) -> str:
+        return f"Metrics({self._counters!r}, durations={self._durations!r})"
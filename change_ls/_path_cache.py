@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Tuple, Union
+
+
+def _is_below(path: Path, directory: Path) -> bool:
+    return path == directory or directory in path.parents
+
+
+class _PathCache:
+    """
+    A bounded LRU cache for the full paths and URIs which :meth:`Workspace._normalize_path_parameter()`
+    computes for ``Path``, ``str`` path and URI parameters. Normalizing a path involves parsing
+    URIs and resolving symlinks, which adds up when the same documents are referenced many times,
+    e.g. by the locations returned from a *textDocument/references* request.
+
+    Entries only depend on the file system through symlinks and, for relative paths in workspaces
+    with multiple roots, through which of the roots contain the path. So the cache has to be
+    invalidated whenever files are created, renamed or deleted.
+
+    Paths are also normalized by executor threads while documents are read, so all accesses are
+    guarded by a lock.
+    """
+
+    __slots__ = ("_entries", "_max_size", "_generation", "_lock")
+
+    # Values are the full path, the URI and whether the entry was resolved by checking multiple roots.
+    _entries: "OrderedDict[Union[Path, str], Tuple[Path, str, bool]]"
+    _max_size: int
+
+    # Incremented by each invalidation, so entries computed before an invalidation are not stored.
+    _generation: int
+    _lock: Lock
+
+    def __init__(self, max_size: int) -> None:
+        self._entries = OrderedDict()
+        self._max_size = max_size
+        self._generation = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Union[Path, str]) -> Optional[Tuple[Path, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(
+        self,
+        key: Union[Path, str],
+        full_path: Path,
+        uri: str,
+        searched_roots: bool,
+        generation: int,
+    ) -> None:
+        """
+        Stores an entry which was computed while the cache was at ``generation``.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (full_path, uri, searched_roots)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: Path) -> None:
+        """
+        Removes all entries affected by creating, renaming or deleting the file or directory at ``path``.
+        """
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key, (full_path, _, searched_roots) in self._entries.items()
+                if searched_roots
+                or _is_below(full_path, path)
+                or (isinstance(key, Path) and key.is_absolute() and _is_below(key, path))
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
@@ -6,14 +6,31 @@ from asyncio import (
     Protocol,
     SubprocessProtocol,
     SubprocessTransport,
+    Task,
     Transport,
     WriteTransport,
+    ensure_future,
 )
+from contextlib import contextmanager
 from dataclasses import dataclass
+from inspect import isawaitable
 from json import JSONDecodeError, dumps, loads
 from logging import DEBUG
 from sys import getdefaultencoding
-from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from change_ls.logging import OperationLoggerAdapter
 from change_ls.types import JSON_VALUE, ErrorCodes, LSPErrorCodes
@@ -102,8 +119,11 @@ def _json_to_packet(data: JSON_VALUE) -> bytes:
     return header.to_bytes() + content
 
 
+# Request handlers which need to wait for something, e.g. for other requests to the server,
+# return an Awaitable. The response is sent when it is done, without blocking other messages.
 _RequestHandler = Callable[
-    [str, Union[Sequence[JSON_VALUE], Mapping[str, JSON_VALUE], None]], JSON_VALUE
+    [str, Union[Sequence[JSON_VALUE], Mapping[str, JSON_VALUE], None]],
+    Union[JSON_VALUE, Awaitable[JSON_VALUE]],
 ]
 _NotificationHandler = Callable[
     [str, Union[Sequence[JSON_VALUE], Mapping[str, JSON_VALUE], None]], None
@@ -129,6 +149,12 @@ class LSProtocol(ABC):
     _connected: bool
     _disconnect_event: Event
 
+    # Messages which are held back until the end of batch_writes().
+    _write_batch: Optional[List[bytes]]
+
+    # Requests from the server which are handled asynchronously and have not been responded to yet.
+    _deferred_responses: Set["Task[None]"]
+
     def __init__(
         self, request_handler: _RequestHandler, notification_handler: _NotificationHandler
     ) -> None:
@@ -144,6 +170,8 @@ class LSProtocol(ABC):
         self._request_counter = 0
         self._connected = False
         self._disconnect_event = Event()
+        self._write_batch = None
+        self._deferred_responses = set()
 
     def _set_loggers(
         self,
@@ -179,7 +207,7 @@ class LSProtocol(ABC):
             "id": request_id,
             "error": {"code": error_code, "message": message, "data": data},
         }
-        self._write_data(_json_to_packet(message_json))
+        self._send_packet(_json_to_packet(message_json))
 
     def _try_read_message(self) -> Optional[Dict[str, JSON_VALUE]]:
         if not self._pending_header:
@@ -226,13 +254,42 @@ class LSProtocol(ABC):
             self._send_error_response(request_id, e.error_code, e.message, e.data)
             return
 
+        if isawaitable(result):
+            task = ensure_future(self._send_deferred_response(request_id, result))
+            self._deferred_responses.add(task)
+            task.add_done_callback(self._deferred_responses.discard)
+            return
+
+        self._send_response(request_id, result)
+
+    def _send_response(self, request_id: Union[int, str], result: JSON_VALUE) -> None:
         request_content: Dict[str, JSON_VALUE] = {
             "jsonrpc": "2.0",
             "id": request_id,
             "result": result,
         }
 
-        self._write_data(_json_to_packet(request_content))
+        self._send_packet(_json_to_packet(request_content))
+
+    async def _send_deferred_response(
+        self, request_id: Union[int, str], result: Awaitable[JSON_VALUE]
+    ) -> None:
+        try:
+            value = await result
+        except LSPException as e:
+            if self._connected:
+                self._send_error_response(request_id, e.error_code, e.message, e.data)
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            _ = self._logger_client and self._logger_client.exception(
+                f"Error while handling request {request_id}."
+            )
+            if self._connected:
+                self._send_error_response(request_id, ErrorCodes.InternalError, str(e))
+            return
+
+        if self._connected:
+            self._send_response(request_id, value)
 
     def _process_response(self, request_id: Union[int, str], result: JSON_VALUE) -> None:
         future = self._active_requests.get(request_id)
@@ -388,6 +445,32 @@ class LSProtocol(ABC):
     def _write_data(self, data: bytes) -> None:
         pass
 
+    def _send_packet(self, data: bytes) -> None:
+        if self._write_batch is not None:
+            self._write_batch.append(data)
+        else:
+            self._write_data(data)
+
+    @contextmanager
+    def batch_writes(self) -> Iterator[None]:
+        """
+        Collects all messages sent inside of the ``with`` block and writes them
+        to the transport at once when the block is left.
+        """
+        if self._write_batch is not None:
+            # Already inside of a batch, which will write the messages.
+            yield
+            return
+
+        self._write_batch = []
+        try:
+            yield
+        finally:
+            batch = self._write_batch
+            self._write_batch = None
+            if batch and self._connected:
+                self._write_data(b"".join(batch))
+
     def send_request(self, method: str, params: JSON_VALUE, future: "Future[JSON_VALUE]") -> None:
         """
         Sends a request to the language server, using the given `method` and `params`.
@@ -405,7 +488,7 @@ class LSProtocol(ABC):
             message_json["params"] = params
 
         self._active_requests[request_id] = future
-        self._write_data(_json_to_packet(message_json))
+        self._send_packet(_json_to_packet(message_json))
 
     def send_notification(self, method: str, params: JSON_VALUE) -> None:
         """
@@ -416,7 +499,7 @@ class LSProtocol(ABC):
         if params is not None:
             message_json["params"] = params
 
-        self._write_data(_json_to_packet(message_json))
+        self._send_packet(_json_to_packet(message_json))
 
     def _on_connection_lost(self) -> None:
         _ = self._logger_client and self._logger_client.info("Server terminated connection.")
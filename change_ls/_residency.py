@@ -0,0 +1,139 @@
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from change_ls._text_document import TextDocument
+
+
+class _ResidencyManager:
+    """
+    Decides which :class:`TextDocuments <TextDocument>` are open on the language servers.
+
+    When a ``TextDocument`` is fully closed, the *textDocument/didClose* notification can be delayed by
+    a grace period. If the document is opened again in the meantime, the existing ``TextDocument`` is reused
+    and the language servers do not have to analyze it again. Documents in the grace period are *idle*.
+
+    The number of documents and the total size of their contents on the language servers can be limited.
+    When a limit is exceeded, the least recently used documents are closed on the servers. Idle documents are
+    closed completely, other documents are transparently opened again the next time they are used.
+    """
+
+    __slots__ = (
+        "_send_did_open",
+        "grace_period",
+        "max_documents",
+        "max_bytes",
+        "_resident",
+        "_resident_bytes",
+        "_deferred_closes",
+    )
+
+    # Sends didOpen notifications for a document and returns the size of the sent contents in bytes.
+    _send_did_open: Callable[["TextDocument"], int]
+
+    grace_period: float
+    max_documents: Optional[int]
+    max_bytes: Optional[int]
+
+    # The documents which are open on the servers with the size of their contents,
+    # from the least to the most recently used.
+    _resident: "OrderedDict[TextDocument, int]"
+    _resident_bytes: int
+
+    _deferred_closes: Dict["TextDocument", asyncio.TimerHandle]
+
+    def __init__(self, send_did_open: Callable[["TextDocument"], int]) -> None:
+        self._send_did_open = send_did_open
+        self.grace_period = 0.0
+        self.max_documents = None
+        self.max_bytes = None
+        self._resident = OrderedDict()
+        self._resident_bytes = 0
+        self._deferred_closes = {}
+
+    @property
+    def resident_documents(self) -> int:
+        return len(self._resident)
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes
+
+    def is_idle(self, text_document: "TextDocument") -> bool:
+        return text_document in self._deferred_closes
+
+    def open(self, text_document: "TextDocument") -> None:
+        """
+        Opens ``text_document`` on the language servers, possibly closing other documents to stay within the limits.
+        """
+        size = self._send_did_open(text_document)
+        text_document._server_open = True  # type: ignore
+        self._resident[text_document] = size
+        self._resident_bytes += size
+        self.enforce_limits()
+
+    def ensure_open(self, text_document: "TextDocument") -> None:
+        """
+        Called whenever ``text_document`` is used. Reopens it on the language servers if it was evicted.
+        """
+        if text_document in self._resident:
+            self._resident.move_to_end(text_document)
+        else:
+            text_document.logger.info("Reopening evicted TextDocument on the language servers.")
+            self.open(text_document)
+
+    def release(self, text_document: "TextDocument") -> None:
+        """
+        Called when the reference count of ``text_document`` drops to zero.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.grace_period <= 0 or loop is None or text_document not in self._resident:
+            text_document._final_close()  # type: ignore
+            return
+        text_document.logger.info(f"Deferring close by {self.grace_period}s.")
+        self._deferred_closes[text_document] = loop.call_later(
+            self.grace_period, self._expire, text_document
+        )
+
+    def revive(self, text_document: "TextDocument") -> None:
+        """
+        Called when ``text_document`` is opened again. Cancels a deferred close.
+        """
+        if (handle := self._deferred_closes.pop(text_document, None)) is not None:
+            handle.cancel()
+            text_document.logger.info("Reusing idle TextDocument.")
+            self.ensure_open(text_document)
+
+    def forget(self, text_document: "TextDocument") -> None:
+        """
+        Called when ``text_document`` is closed on the language servers.
+        """
+        if (handle := self._deferred_closes.pop(text_document, None)) is not None:
+            handle.cancel()
+        if (size := self._resident.pop(text_document, None)) is not None:
+            self._resident_bytes -= size
+        text_document._server_open = False  # type: ignore
+
+    def _expire(self, text_document: "TextDocument") -> None:
+        if self._deferred_closes.pop(text_document, None) is not None:
+            text_document._final_close()  # type: ignore
+
+    def _is_over_limits(self) -> bool:
+        return (self.max_documents is not None and len(self._resident) > self.max_documents) or (
+            self.max_bytes is not None and self._resident_bytes > self.max_bytes
+        )
+
+    def enforce_limits(self) -> None:
+        # The most recently used document is never evicted, even if it exceeds max_bytes on its own.
+        while len(self._resident) > 1 and self._is_over_limits():
+            text_document = next(iter(self._resident))
+            if self.is_idle(text_document):
+                text_document._final_close()  # type: ignore
+            else:
+                text_document.logger.info("Evicting TextDocument from the language servers.")
+                text_document._close_on_servers()  # type: ignore
+            self.forget(text_document)
@@ -0,0 +1,365 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+# Leaves are split to at most this many characters when a rope is built from a string.
+# Small leaves created by edits are merged with their neighbors up to the same size.
+_LEAF_SIZE = 2048
+
+
+class _Node:
+    """
+    A node in a persistent, height-balanced rope. Nodes are never modified after
+    they have been created, so subtrees can be shared freely between ropes.
+
+    Leaves store their text in ``text`` and have no children. Inner nodes have
+    exactly two non-empty children.
+
+    Every node also counts the line breaks and UTF-8 code units of its text, so lines and
+    byte offsets can be located without visiting the text itself. ``line_breaks`` counts
+    the line breaks as if the node's text stood alone, i.e. a trailing CR is counted
+    even if the next node starts with LF. ``_seam()`` corrects for this.
+    """
+
+    __slots__ = (
+        "left",
+        "right",
+        "text",
+        "length",
+        "height",
+        "line_breaks",
+        "utf_8_length",
+        "starts_with_lf",
+        "ends_with_cr",
+    )
+
+    left: Optional["_Node"]
+    right: Optional["_Node"]
+    text: str
+    length: int
+    height: int
+    line_breaks: int
+    utf_8_length: int
+    starts_with_lf: bool
+    ends_with_cr: bool
+
+    def __init__(self, left: Optional["_Node"], right: Optional["_Node"], text: str = "") -> None:
+        self.left = left
+        self.right = right
+        self.text = text
+        if left is not None and right is not None:
+            self.length = left.length + right.length
+            self.height = max(left.height, right.height) + 1
+            self.line_breaks = left.line_breaks + right.line_breaks - _seam(left, right)
+            self.utf_8_length = left.utf_8_length + right.utf_8_length
+            self.starts_with_lf = left.starts_with_lf
+            self.ends_with_cr = right.ends_with_cr
+        else:
+            self.length = len(text)
+            self.height = 0
+            self.line_breaks = _count_line_breaks(text)
+            self.utf_8_length = _utf_8_length(text)
+            self.starts_with_lf = text.startswith("\n")
+            self.ends_with_cr = text.endswith("\r")
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.left is None
+
+
+def _count_line_breaks(text: str) -> int:
+    return text.count("\n") + text.count("\r") - text.count("\r\n")
+
+
+def _utf_8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8", "surrogatepass"))
+
+
+def _seam(left: _Node, right: _Node) -> int:
+    """
+    Returns 1 if a CRLF is split between ``left`` and ``right``, which both count
+    as a line break on their own.
+    """
+    return 1 if left.ends_with_cr and right.starts_with_lf else 0
+
+
+def _leaf(text: str) -> Optional[_Node]:
+    return _Node(None, None, text) if text else None
+
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node is not None else -1
+
+
+def _rotate_left(node: _Node) -> _Node:
+    assert node.left is not None and node.right is not None
+    right = node.right
+    assert right.left is not None and right.right is not None
+    return _Node(_Node(node.left, right.left), right.right)
+
+
+def _rotate_right(node: _Node) -> _Node:
+    assert node.left is not None and node.right is not None
+    left = node.left
+    assert left.left is not None and left.right is not None
+    return _Node(left.left, _Node(left.right, node.right))
+
+
+def _balance(node: _Node) -> _Node:
+    if node.is_leaf:
+        return node
+    assert node.left is not None and node.right is not None
+    difference = node.left.height - node.right.height
+    if difference > 1:
+        if node.left.right is not None and _height(node.left.left) < node.left.right.height:
+            node = _Node(_rotate_left(node.left), node.right)
+        return _rotate_right(node)
+    elif difference < -1:
+        if node.right.left is not None and _height(node.right.right) < node.right.left.height:
+            node = _Node(node.left, _rotate_right(node.right))
+        return _rotate_left(node)
+    return node
+
+
+def _concat(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """
+    Concatenates two ropes in O(log n), rebalancing along the seam.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.is_leaf and right.is_leaf and left.length + right.length <= _LEAF_SIZE:
+        return _Node(None, None, left.text + right.text)
+
+    if left.height > right.height + 1:
+        assert left.left is not None
+        return _balance(_Node(left.left, _concat(left.right, right)))
+    elif right.height > left.height + 1:
+        assert right.right is not None
+        return _balance(_Node(_concat(left, right.left), right.right))
+    else:
+        return _Node(left, right)
+
+
+def _split(node: Optional[_Node], offset: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """
+    Splits a rope into the parts before and after ``offset`` in O(log n).
+    """
+    if node is None:
+        return None, None
+    if offset <= 0:
+        return None, node
+    if offset >= node.length:
+        return node, None
+
+    if node.is_leaf:
+        return _leaf(node.text[:offset]), _leaf(node.text[offset:])
+
+    assert node.left is not None
+    if offset < node.left.length:
+        left, right = _split(node.left, offset)
+        return left, _concat(right, node.right)
+    else:
+        left, right = _split(node.right, offset - node.left.length)
+        return _concat(node.left, left), right
+
+
+def _build(text: str, start: int, end: int) -> Optional[_Node]:
+    if end - start <= _LEAF_SIZE:
+        return _leaf(text[start:end])
+    middle = start + (end - start) // 2
+    return _Node(_build(text, start, middle), _build(text, middle, end))
+
+
+def _iter_leaves(node: Optional[_Node], start: int, end: int) -> Iterator[str]:
+    """
+    Yields the text of the rope in the range [start:end) leaf by leaf.
+    """
+    stack: List[Tuple[_Node, int]] = [(node, 0)] if node is not None else []
+    while stack:
+        current, current_start = stack.pop()
+        current_end = current_start + current.length
+        if current_end <= start or current_start >= end:
+            continue
+        if current.is_leaf:
+            yield current.text[max(start - current_start, 0) : end - current_start]
+        else:
+            assert current.left is not None and current.right is not None
+            stack.append((current.right, current_start + current.left.length))
+            stack.append((current.left, current_start))
+
+
+class Rope:
+    """
+    Immutable text storage based on a balanced binary tree of string chunks.
+
+    Replacing a range of text creates a new ``Rope`` in O(log n), which shares all unchanged
+    chunks with the original, so ropes also serve as cheap snapshots of a text. Lines and
+    UTF-8 byte offsets are located in O(log n) as well. The full text is assembled each time
+    it is requested with ``str()`` and is not kept by the rope.
+    """
+
+    __slots__ = ("_root",)
+
+    _root: Optional[_Node]
+
+    def __init__(self, text: str = "") -> None:
+        self._root = _build(text, 0, len(text))
+
+    @classmethod
+    def _from_root(cls, root: Optional[_Node]) -> "Rope":
+        out = cls.__new__(cls)
+        out._root = root
+        return out
+
+    def __len__(self) -> int:
+        return self._root.length if self._root is not None else 0
+
+    def __str__(self) -> str:
+        if self._root is not None and self._root.is_leaf:
+            return self._root.text
+        return "".join(_iter_leaves(self._root, 0, len(self)))
+
+    def __repr__(self) -> str:
+        return f"Rope(length={len(self)})"
+
+    def slice(self, start: int, end: int) -> str:
+        """
+        Returns the text in the range [start:end) without materializing the whole rope.
+        """
+        return "".join(_iter_leaves(self._root, start, end))
+
+    def replace(self, start: int, end: int, new_text: str) -> "Rope":
+        """
+        Returns a new ``Rope`` where the range [start:end) is replaced by ``new_text``.
+        """
+        if start < 0 or end < start or end > len(self):
+            raise IndexError(f"Range [{start}:{end}] is out of bounds.")
+        before, rest = _split(self._root, start)
+        _, after = _split(rest, end - start)
+        return Rope._from_root(_concat(_concat(before, _build(new_text, 0, len(new_text))), after))
+
+    @property
+    def line_count(self) -> int:
+        """
+        The number of lines, including the empty line after a trailing line break.
+        """
+        return (self._root.line_breaks if self._root is not None else 0) + 1
+
+    @property
+    def utf_8_length(self) -> int:
+        return self._root.utf_8_length if self._root is not None else 0
+
+    def line_start(self, line: int) -> int:
+        """
+        Returns the offset of the first character on ``line``.
+        """
+        if line < 0 or line >= self.line_count:
+            raise IndexError(f"Line {line} is out of bounds")
+        if line == 0:
+            return 0
+
+        # Find the end of the line-th line break.
+        node = self._root
+        offset = 0
+        remaining = line
+        assert node is not None
+        while not node.is_leaf:
+            assert node.left is not None and node.right is not None
+            left_breaks = node.left.line_breaks - _seam(node.left, node.right)
+            if remaining <= left_breaks:
+                node = node.left
+            else:
+                remaining -= left_breaks
+                offset += node.left.length
+                node = node.right
+
+        for line_break in _LINE_BREAK.finditer(node.text):
+            remaining -= 1
+            if remaining == 0:
+                return offset + line_break.end()
+        raise AssertionError("Line break counts are inconsistent.")
+
+    def line_of_offset(self, offset: int) -> int:
+        """
+        Returns the line containing ``offset``. The end of the text belongs to the last line.
+        """
+        if offset < 0 or offset > len(self):
+            raise IndexError(f"Offset {offset} is out of bounds.")
+
+        # Count the line breaks before offset.
+        line = 0
+        node = self._root
+        remaining = offset
+        while node is not None and remaining > 0:
+            if node.is_leaf:
+                line += _count_line_breaks(node.text[:remaining])
+                break
+            assert node.left is not None and node.right is not None
+            if remaining <= node.left.length:
+                node = node.left
+            else:
+                line += node.left.line_breaks - _seam(node.left, node.right)
+                remaining -= node.left.length
+                node = node.right
+
+        # An offset between CR and LF is still on the line that the CRLF ends.
+        if 0 < offset < len(self) and self.slice(offset - 1, offset + 1) == "\r\n":
+            line -= 1
+        return line
+
+    def utf_8_offset(self, offset: int) -> int:
+        """
+        Returns the number of UTF-8 code units before ``offset``.
+        """
+        if offset < 0 or offset > len(self):
+            raise IndexError(f"Offset {offset} is out of bounds.")
+
+        out = 0
+        node = self._root
+        remaining = offset
+        while node is not None and remaining > 0:
+            if node.is_leaf:
+                out += _utf_8_length(node.text[:remaining])
+                break
+            assert node.left is not None
+            if remaining <= node.left.length:
+                node = node.left
+            else:
+                out += node.left.utf_8_length
+                remaining -= node.left.length
+                node = node.right
+        return out
+
+    def offset_of_utf_8(self, byte_offset: int) -> int:
+        """
+        Inverse of :meth:`utf_8_offset`. Raises an ``IndexError`` if ``byte_offset`` is not
+        at a codepoint boundary.
+        """
+        if byte_offset < 0 or byte_offset > self.utf_8_length:
+            raise IndexError(f"Byte offset {byte_offset} is out of bounds.")
+
+        out = 0
+        node = self._root
+        remaining = byte_offset
+        while node is not None and remaining > 0:
+            if node.is_leaf:
+                try:
+                    encoded = node.text.encode("utf-8", "surrogatepass")
+                    out += len(encoded[:remaining].decode("utf-8", "surrogatepass"))
+                except UnicodeDecodeError:
+                    raise IndexError(
+                        f"Byte offset {byte_offset} is not a valid codepoint boundary."
+                    ) from None
+                break
+            assert node.left is not None
+            if remaining <= node.left.utf_8_length:
+                node = node.left
+            else:
+                out += node.left.length
+                remaining -= node.left.utf_8_length
+                node = node.right
+        return out
@@ -0,0 +1,174 @@
+from array import array
+from typing import Optional, Sequence
+
+import change_ls._text_document as td
+from change_ls._client import Client
+from change_ls._line_index import _LineIndex
+from change_ls._rope import Rope
+from change_ls.tokens import SyntacticToken, TokenList
+from change_ls.types import Position
+
+
+class TextDocumentSnapshot:
+    """
+    An immutable view of a single version of a :class:`TextDocument`, obtained by calling
+    :meth:`TextDocument.snapshot()`.
+
+    A ``TextDocumentSnapshot`` shares its contents with the ``TextDocument`` and with snapshots
+    of other versions, so creating one is cheap. Unlike the ``TextDocument`` itself, a snapshot
+    is not affected by :meth:`~TextDocument.commit_edits()`, so offsets obtained for its version
+    (e.g. from a :class:`LocationList` or a :class:`Symbol`) can still be resolved against it.
+
+    .. attribute:: text_document
+        :type: TextDocument
+
+        The ``TextDocument`` from which the snapshot was taken.
+
+    .. attribute:: uri
+        :type: str
+
+        The URI of the ``TextDocument`` at the time the snapshot was taken.
+
+    .. attribute:: version
+        :type: int
+
+        The version of the ``TextDocument`` captured by this snapshot.
+
+    .. attribute:: text
+        :type: str
+
+        The contents of the ``TextDocument`` at :attr:`version`.
+
+    .. attribute:: tokens
+        :type: TokenList | None
+
+        The syntactic tokens which were loaded for :attr:`version`, if any.
+    """
+
+    __slots__ = (
+        "_text_document",
+        "_uri",
+        "_version",
+        "_rope",
+        "_line_index",
+        "_tokens",
+        "_frozen",
+        "__weakref__",
+    )
+
+    _text_document: "td.TextDocument"
+    _uri: str
+    _version: int
+    _rope: Rope
+    _line_index: Optional[_LineIndex]
+
+    # Tokens are taken from the TextDocument until it moves on to a new version.
+    _tokens: Optional[TokenList[SyntacticToken]]
+    _frozen: bool
+
+    def __init__(self, text_document: "td.TextDocument", rope: Rope) -> None:
+        self._text_document = text_document
+        self._uri = text_document.uri
+        self._version = text_document.version
+        self._rope = rope
+        self._line_index = None
+        self._tokens = None
+        self._frozen = False
+
+    def _freeze(self, tokens: Optional[TokenList[SyntacticToken]]) -> None:
+        self._tokens = tokens
+        self._frozen = True
+
+    @property
+    def text_document(self) -> "td.TextDocument":
+        return self._text_document
+
+    @property
+    def uri(self) -> str:
+        return self._uri
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def text(self) -> str:
+        return str(self._rope)
+
+    @property
+    def tokens(self) -> Optional[TokenList[SyntacticToken]]:
+        if self._frozen:
+            return self._tokens
+        if self._text_document.version != self._version:
+            return None
+        return self._text_document._tokens  # type: ignore
+
+    def _get_line_index(self) -> _LineIndex:
+        if self._line_index is None:
+            self._line_index = _LineIndex(self._rope)
+        return self._line_index
+
+    def position_to_offset(self, position: Position, client: Optional[Client] = None) -> int:
+        """
+        Converts a :class:`change_ls.types.Position` into an offset into :attr:`text`.
+        See :meth:`TextDocument.position_to_offset()`.
+        """
+        encoding = self._text_document._resolve_client_parameter(  # type: ignore
+            client
+        ).get_position_encoding_kind()
+        return self._get_line_index().position_to_offset(
+            position.line, position.character, encoding
+        )
+
+    def offset_to_position(self, offset: int, client: Optional[Client] = None) -> Position:
+        """
+        Converts an offset into :attr:`text` into a :class:`change_ls.types.Position`.
+        See :meth:`TextDocument.offset_to_position()`.
+        """
+        encoding = self._text_document._resolve_client_parameter(  # type: ignore
+            client
+        ).get_position_encoding_kind()
+        line, character = self._get_line_index().offset_to_position(offset, encoding)
+        return Position(line=line, character=character)
+
+    def positions_to_offsets(
+        self, positions: Sequence[int], client: Optional[Client] = None
+    ) -> "array[int]":
+        """
+        Converts multiple positions into offsets into :attr:`text` at once.
+        See :meth:`TextDocument.positions_to_offsets()`.
+        """
+        encoding = self._text_document._resolve_client_parameter(  # type: ignore
+            client
+        ).get_position_encoding_kind()
+        return self._get_line_index().positions_to_offsets(positions, encoding)
+
+    def offsets_to_positions(
+        self, offsets: Sequence[int], client: Optional[Client] = None
+    ) -> "array[int]":
+        """
+        Converts multiple offsets into :attr:`text` into positions at once.
+        See :meth:`TextDocument.offsets_to_positions()`.
+        """
+        encoding = self._text_document._resolve_client_parameter(  # type: ignore
+            client
+        ).get_position_encoding_kind()
+        return self._get_line_index().offsets_to_positions(offsets, encoding)
+
+    def offset_to_byte_offset(self, offset: int) -> int:
+        """
+        Converts an offset into :attr:`text` into an offset into the UTF-8 encoded text.
+        """
+        return self._get_line_index().offset_to_byte_offset(offset)
+
+    def byte_offset_to_offset(self, byte_offset: int) -> int:
+        """
+        Converts an offset into the UTF-8 encoded text into an offset into :attr:`text`.
+        """
+        return self._get_line_index().byte_offset_to_offset(byte_offset)
+
+    def __str__(self) -> str:
+        return f"{self._uri}@{self._version}"
+
+    def __repr__(self) -> str:
+        return f"{object.__repr__(self)} {{'uri': {self._uri!r}, 'version': {self._version!r}}}"
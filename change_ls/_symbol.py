@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
+from array import array
 from dataclasses import dataclass
 from types import TracebackType
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
 
 import change_ls._location_list as ll
 import change_ls._text_document as td
@@ -9,6 +10,7 @@ import change_ls._workspace as ws
 import change_ls.types as lsptypes
 from change_ls._change_ls_error import ChangeLSError
 from change_ls._client import Client
+from change_ls._snapshot import TextDocumentSnapshot
 from change_ls.logging import operation
 from change_ls.types import (
     DeclarationParams,
@@ -16,6 +18,7 @@ from change_ls.types import (
     ImplementationParams,
     Location,
     Position,
+    Range,
     ReferenceContext,
     ReferenceParams,
     RenameParams,
@@ -31,6 +34,7 @@ from change_ls.types import (
 class _SymbolAnchor:
     text_document: "td.TextDocument"
     position: Position
+    snapshot: TextDocumentSnapshot
 
     _original_uri: str
     _original_version: int
@@ -38,6 +42,7 @@ class _SymbolAnchor:
     def __init__(self, text_document: "td.TextDocument", position: Position) -> None:
         self.text_document = text_document
         self.position = position
+        self.snapshot = text_document.snapshot()
         self._original_uri = text_document.uri
         self._original_version = text_document.version
 
@@ -48,6 +53,34 @@ class _SymbolAnchor:
             and self.text_document.version == self._original_version
         )
 
+    def remap(
+        self, ranges: List[Tuple[int, int]], client: Client
+    ) -> Optional[List[Tuple[int, int]]]:
+        """
+        Moves the anchor to the current version of the ``TextDocument``, if none of the given ranges
+        were changed in the meantime. Returns the mapped ranges, or None if the anchor could not be moved.
+        """
+        text_document = self.text_document
+        if text_document.is_closed() or text_document.uri != self._original_uri:
+            return None
+
+        new_ranges: List[Tuple[int, int]] = []
+        try:
+            for offset_range in ranges:
+                new_range = text_document.map_range(self._original_version, offset_range)
+                if new_range is None:
+                    return None
+                new_ranges.append(new_range)
+            offset = self.snapshot.position_to_offset(self.position, client)
+            offset = text_document.map_offset(self._original_version, offset)
+        except ValueError:
+            # The edits since the original version are no longer recorded, e.g. after a reload.
+            return None
+        self.position = text_document.offset_to_position(offset, client)
+        self.snapshot = text_document.snapshot()
+        self._original_version = text_document.version
+        return new_ranges
+
 
 @dataclass
 class Symbol(ABC):
@@ -55,8 +88,10 @@ class Symbol(ABC):
     A ``Symbol`` represents a symbol in a :class:`TextDocument`. This is the base class for more specific kinds
     of ``Symbols`` and provides the basic methods and properties available on all ``Symbols``.
 
-    A ``Symbol`` keeps a reference to the ``TextDocument`` it was obtained from. If the document changes or is closed,
-    the Symbol will be invalidated and its methods can no longer be used.
+    A ``Symbol`` keeps a reference to the ``TextDocument`` it was obtained from. When the document changes,
+    the ``Symbol`` is moved to the new version of the document, as long as the edits did not touch
+    the ``Symbol`` itself. Otherwise, or if the document is closed, the Symbol will be invalidated and its methods
+    can no longer be used. Its :attr:`range` can still be resolved against its :attr:`snapshot`, though.
 
     .. property:: name
         :type: str
@@ -75,6 +110,11 @@ class Symbol(ABC):
 
         The range [start offset, end offset] in the ``TextDocument`` which contains this reference to the ``Symbol``.
 
+    .. property:: snapshot
+        :type: TextDocumentSnapshot
+
+        The :class:`TextDocumentSnapshot` of the ``TextDocument`` version to which :attr:`range` refers.
+
     .. property:: kind
         :type: change_ls.types.SymbolKind
 
@@ -102,6 +142,14 @@ class Symbol(ABC):
     def _get_anchor(self) -> _SymbolAnchor:
         ...
 
+    @abstractmethod
+    def _get_ranges(self) -> List[Tuple[int, int]]:
+        ...
+
+    @abstractmethod
+    def _set_ranges(self, ranges: List[Tuple[int, int]]) -> None:
+        ...
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -132,13 +180,35 @@ class Symbol(ABC):
     def container_name(self) -> Optional[str]:
         ...
 
+    @property
+    def snapshot(self) -> TextDocumentSnapshot:
+        self._update()
+        return self._get_anchor().snapshot
+
     def is_valid(self) -> bool:
         """
         Checks whether a ``Symbol`` is still valid.
         Symbols are invalidated when their underlying :class:`TextDocument`
-        changes.
+        is closed or when an edit changes the text of the ``Symbol``. After edits elsewhere
+        in the document, :attr:`range` and :attr:`snapshot` refer to the document's new version instead.
         """
-        return self._get_anchor().is_valid()
+        return self._update()
+
+    def _update(self) -> bool:
+        """
+        Moves the ``Symbol`` to the current version of its ``TextDocument``, if that is still possible.
+        This is done whenever :attr:`range` or :attr:`snapshot` are accessed, so both always refer
+        to the same version. Returns whether the ``Symbol`` is valid.
+        """
+        anchor = self._get_anchor()
+        if anchor.is_valid():
+            return True
+
+        new_ranges = anchor.remap(self._get_ranges(), self._client)
+        if new_ranges is None:
+            return False
+        self._set_ranges(new_ranges)
+        return True
 
     def _assert_valid(self) -> None:
         if not self.is_valid():
@@ -153,6 +223,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(
             f"Requesting workspace edit to rename symbol {self} to '{new_name}'."
         )
@@ -177,6 +248,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(f"Finding references to symbol {self}.")
         if not self._client.check_feature(
             "textDocument/references", text_documents=[anchor.text_document]
@@ -205,6 +277,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(f"Finding declaration for symbol {self}.")
         if not self._client.check_feature(
             "textDocument/declaration", text_documents=[anchor.text_document]
@@ -232,6 +305,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(f"Finding definition for symbol {self}.")
         if not self._client.check_feature(
             "textDocument/definition", text_documents=[anchor.text_document]
@@ -259,6 +333,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(f"Finding type definition for symbol {self}.")
         if not self._client.check_feature(
             "textDocument/typeDefinition", text_documents=[anchor.text_document]
@@ -286,6 +361,7 @@ class Symbol(ABC):
         """
         self._assert_valid()
         anchor = self._get_anchor()
+        anchor.text_document._ensure_open()  # type: ignore
         anchor.text_document.logger.info(f"Finding implementation for symbol {self}.")
         if not self._client.check_feature(
             "textDocument/implementation", text_documents=[anchor.text_document]
@@ -355,7 +431,9 @@ class CustomSymbol(Symbol):
         if symbol_range[0] >= symbol_range[1]:
             raise ValueError("Invalid range for CustomSymbol")
         super().__init__(text_document._workspace, client)
-        self._name = text_document.text[symbol_range[0] : symbol_range[1]]
+        self._name = text_document._get_rope().slice(  # type: ignore
+            symbol_range[0], symbol_range[1]
+        )
         self._uri = text_document.uri
         self._range = symbol_range
         self._kind = kind
@@ -368,6 +446,12 @@ class CustomSymbol(Symbol):
     def _get_anchor(self) -> _SymbolAnchor:
         return self._anchor
 
+    def _get_ranges(self) -> List[Tuple[int, int]]:
+        return [self._range]
+
+    def _set_ranges(self, ranges: List[Tuple[int, int]]) -> None:
+        (self._range,) = ranges
+
     @property
     def name(self) -> str:
         return self._name
@@ -378,6 +462,7 @@ class CustomSymbol(Symbol):
 
     @property
     def range(self) -> Tuple[int, int]:
+        self._update()
         return self._range
 
     @property
@@ -424,22 +509,28 @@ class UnresolvedWorkspaceSymbol:
         self._lsp_workspace_symbol = lsp_workspace_symbol
 
     @operation
-    async def resolve(self) -> "WorkspaceSymbol":
+    async def resolve(self, *, lazy: bool = False) -> "WorkspaceSymbol":
         """
         Resolves this ``UnresolvedWorkspaceSymbol`` into a full :class:`WorkspaceSymbol`.
 
         This will open the :class:`TextDocument` which contains this symbol.
+        To resolve many symbols at once, use :meth:`Workspace.resolve_symbols()`.
+
+        :param lazy: If ``True``, the ``TextDocument`` is only opened once the ``WorkspaceSymbol`` is used.
         """
         self._workspace.logger.info(f"Resolving symbol {self}.")
+        resolved_symbol = await self._resolve_lsp_symbol()
+        return WorkspaceSymbol(self._client, self._workspace, resolved_symbol, lazy=lazy)
+
+    async def _resolve_lsp_symbol(
+        self,
+    ) -> Union[lsptypes.WorkspaceSymbol, lsptypes.SymbolInformation]:
         if isinstance(
             self._lsp_workspace_symbol, lsptypes.WorkspaceSymbol
         ) and self._client.check_feature("workspace/symbol", workspace_symbol_resolve=True):
-            resolved_symbol = await self._client.send_workspace_symbol_resolve(
-                self._lsp_workspace_symbol
-            )
-            return WorkspaceSymbol(self._client, self._workspace, resolved_symbol)
+            return await self._client.send_workspace_symbol_resolve(self._lsp_workspace_symbol)
         else:
-            return WorkspaceSymbol(self._client, self._workspace, self._lsp_workspace_symbol)
+            return self._lsp_workspace_symbol
 
     @property
     def name(self) -> str:
@@ -491,10 +582,14 @@ class WorkspaceSymbol(UnresolvedWorkspaceSymbol, Symbol):
     a ``WorkspaceSymbol`` is a context manager so that the referenced ``TextDocument`` can
     be closed when the ``WorkspaceSymbol`` is no longer needed. Like all ``Symbols``, closing
     the underlying ``TextDocument`` will invalidate the ``WorkspaceSymbol``.
+
+    A *lazy* ``WorkspaceSymbol`` only opens its ``TextDocument`` once its :attr:`range` or :attr:`snapshot`
+    is accessed or one of its methods sends a request. Until then, it is considered valid.
     """
 
-    _anchor: _SymbolAnchor
+    _anchor: Optional[_SymbolAnchor]
     _lsp_workspace_symbol: Union[lsptypes.WorkspaceSymbol, lsptypes.SymbolInformation]
+    _location: Location
     _range: Tuple[int, int]
     _is_closed: bool
 
@@ -503,6 +598,8 @@ class WorkspaceSymbol(UnresolvedWorkspaceSymbol, Symbol):
         client: Client,
         workspace: "ws.Workspace",
         lsp_workspace_symbol: Union[lsptypes.WorkspaceSymbol, lsptypes.SymbolInformation],
+        *,
+        lazy: bool = False,
     ) -> None:
         if not isinstance(lsp_workspace_symbol.location, Location):
             raise ChangeLSError(
@@ -510,19 +607,54 @@ class WorkspaceSymbol(UnresolvedWorkspaceSymbol, Symbol):
             )
         super().__init__(client, workspace, lsp_workspace_symbol)  # init UnresolvedWorkspaceSymbol
         super(UnresolvedWorkspaceSymbol, self).__init__(workspace, client)  # init Symbol
-        text_document = workspace.open_text_document(self.uri)
-        self._anchor = _SymbolAnchor(text_document, lsp_workspace_symbol.location.range.start)
-        self._range = (
-            text_document.position_to_offset(lsp_workspace_symbol.location.range.start),
-            text_document.position_to_offset(lsp_workspace_symbol.location.range.end),
-        )
+        self._location = lsp_workspace_symbol.location
+        self._anchor = None
         self._is_closed = False
+        if not lazy:
+            self._open()
+
+    def _set_text_document(
+        self, text_document: "td.TextDocument", offset_range: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """
+        Anchors the symbol in ``text_document``, taking over one of its references. ``offset_range``
+        can be passed if the positions were already converted, see :meth:`Workspace.resolve_symbols()`.
+        """
+        if offset_range is None:
+            offset_range = (
+                text_document.position_to_offset(self._location.range.start, self._client),
+                text_document.position_to_offset(self._location.range.end, self._client),
+            )
+        self._anchor = _SymbolAnchor(text_document, self._location.range.start)
+        self._range = offset_range
+
+    def _open(self) -> _SymbolAnchor:
+        if self._is_closed:
+            raise ChangeLSError("WorkspaceSymbol was already closed.")
+        self._set_text_document(self._workspace.open_text_document(self.uri))
+        assert self._anchor is not None
+        return self._anchor
+
+    def is_valid(self) -> bool:
+        if self._anchor is None:
+            return not self._is_closed
+        return super().is_valid()
 
     def _get_anchor(self) -> _SymbolAnchor:
+        if self._anchor is None:
+            return self._open()
         return self._anchor
 
+    def _get_ranges(self) -> List[Tuple[int, int]]:
+        self._get_anchor()
+        return [self._range]
+
+    def _set_ranges(self, ranges: List[Tuple[int, int]]) -> None:
+        (self._range,) = ranges
+
     @property
     def range(self) -> Tuple[int, int]:
+        self._update()
         return self._range
 
     def __enter__(self) -> "WorkspaceSymbol":
@@ -540,11 +672,44 @@ class WorkspaceSymbol(UnresolvedWorkspaceSymbol, Symbol):
 
         The ``TextDocument`` will only be closed once, calling this method multiple times has no effect.
         """
-        if not self._is_closed:
+        if not self._is_closed and self._anchor is not None:
             self._anchor.text_document.close()
         self._is_closed = True
 
 
+def _get_document_symbol_positions(
+    lsp_symbols: Sequence[Union[lsptypes.DocumentSymbol, lsptypes.SymbolInformation]]
+) -> "array[int]":
+    """
+    Collects the positions of the given symbols and their children in the order in which
+    :class:`DocumentSymbol` consumes their offsets, as a flat array of line/character pairs.
+    """
+    out = array("i")
+
+    def add_range(lsp_range: Range) -> None:
+        out.extend(
+            (
+                lsp_range.start.line,
+                lsp_range.start.character,
+                lsp_range.end.line,
+                lsp_range.end.character,
+            )
+        )
+
+    def add_symbol(lsp_symbol: Union[lsptypes.DocumentSymbol, lsptypes.SymbolInformation]) -> None:
+        if isinstance(lsp_symbol, lsptypes.DocumentSymbol):
+            add_range(lsp_symbol.range)
+            add_range(lsp_symbol.selectionRange)
+            for child in lsp_symbol.children or []:
+                add_symbol(child)
+        else:
+            add_range(lsp_symbol.location.range)
+
+    for symbol in lsp_symbols:
+        add_symbol(symbol)
+    return out
+
+
 class DocumentSymbol(Symbol):
     """
     A :class:`Symbol` which is part of a :class:`TextDocument`'s outline.
@@ -597,6 +762,7 @@ class DocumentSymbol(Symbol):
         text_document: "td.TextDocument",
         lsp_symbol: Union[lsptypes.DocumentSymbol, lsptypes.SymbolInformation],
         parent: Optional["DocumentSymbol"],
+        offsets: Optional[Iterator[int]] = None,
     ) -> None:
         super().__init__(workspace, client)
         self._text_document = text_document
@@ -604,34 +770,29 @@ class DocumentSymbol(Symbol):
         self._tags = list(lsp_symbol.tags) if lsp_symbol.tags else []
         self._parent = parent
 
+        if offsets is None:
+            positions = _get_document_symbol_positions([lsp_symbol])
+            offsets = iter(text_document.positions_to_offsets(positions, client))
+
         if isinstance(lsp_symbol, lsptypes.DocumentSymbol):
+            if lsp_symbol.deprecated:
+                self._tags.append(SymbolTag.Deprecated)
+
+            self._context_range = (next(offsets), next(offsets))
+            self._symbol_range = (next(offsets), next(offsets))
+
             if lsp_symbol.children is not None:
                 self._children = [
-                    DocumentSymbol(client, workspace, text_document, child, self)
+                    DocumentSymbol(client, workspace, text_document, child, self, offsets)
                     for child in lsp_symbol.children
                 ]
             else:
                 self._children = None
 
-            if lsp_symbol.deprecated:
-                self._tags.append(SymbolTag.Deprecated)
-
-            self._context_range = (
-                text_document.position_to_offset(lsp_symbol.range.start),
-                text_document.position_to_offset(lsp_symbol.range.end),
-            )
-            self._symbol_range = (
-                text_document.position_to_offset(lsp_symbol.selectionRange.start),
-                text_document.position_to_offset(lsp_symbol.selectionRange.end),
-            )
-
             self._anchor = _SymbolAnchor(text_document, lsp_symbol.selectionRange.start)
         else:
             self._children = None
-            self._context_range = (
-                text_document.position_to_offset(lsp_symbol.location.range.start),
-                text_document.position_to_offset(lsp_symbol.location.range.end),
-            )
+            self._context_range = (next(offsets), next(offsets))
             self._symbol_range = self._context_range
 
             self._anchor = _SymbolAnchor(text_document, lsp_symbol.location.range.start)
@@ -639,6 +800,12 @@ class DocumentSymbol(Symbol):
     def _get_anchor(self) -> _SymbolAnchor:
         return self._anchor
 
+    def _get_ranges(self) -> List[Tuple[int, int]]:
+        return [self._context_range, self._symbol_range]
+
+    def _set_ranges(self, ranges: List[Tuple[int, int]]) -> None:
+        self._context_range, self._symbol_range = ranges
+
     @property
     def name(self) -> str:
         return self._lsp_symbol.name
@@ -653,10 +820,12 @@ class DocumentSymbol(Symbol):
 
     @property
     def symbol_range(self) -> Tuple[int, int]:
+        self._update()
         return self._symbol_range
 
     @property
     def context_range(self) -> Tuple[int, int]:
+        self._update()
         return self._context_range
 
     @property
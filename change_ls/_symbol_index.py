@@ -0,0 +1,430 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Type, Union
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+import change_ls._symbol as symbol
+import change_ls._workspace as ws
+from change_ls._change_ls_error import ChangeLSError
+from change_ls._client import Client
+from change_ls._file_index import _FileStamp, _stat_file
+from change_ls.logging import operation
+from change_ls.types import (
+    DocumentSymbol,
+    DocumentSymbolParams,
+    Location,
+    SymbolInformation,
+    WorkspaceSymbol,
+)
+
+_LSPSymbol = Union[WorkspaceSymbol, SymbolInformation]
+
+# Bump this whenever the schema changes, so existing index files are rebuilt.
+_SCHEMA_VERSION = "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    uri TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    uri TEXT NOT NULL,
+    name TEXT NOT NULL,
+    folded_name TEXT NOT NULL,
+    is_workspace_symbol INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (folded_name);
+CREATE INDEX IF NOT EXISTS symbols_by_uri ON symbols (uri);
+"""
+
+# The number of documents which are opened at the same time while refreshing stale files.
+_REFRESH_WINDOW = 16
+
+# rebuild() collects the new symbols in these tables and only replaces the index once all symbols
+# have arrived, so the database is not locked by a transaction while waiting for the language server.
+_STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS new_files AS SELECT * FROM files WHERE 0;
+CREATE TEMP TABLE IF NOT EXISTS new_symbols AS SELECT * FROM symbols WHERE 0;
+DELETE FROM new_files;
+DELETE FROM new_symbols;
+"""
+
+
+def _fuzzy_match(name: str, query: str) -> bool:
+    """
+    Checks whether the characters of ``query`` appear in ``name`` in the same order.
+    """
+    position = 0
+    for c in query:
+        position = name.find(c, position) + 1
+        if position == 0:
+            return False
+    return True
+
+
+def _hash_file(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _stamp_and_hash_file(path: Path) -> Optional[Tuple[_FileStamp, str]]:
+    # The stamp is taken before the file is read, so changes while the symbols are loaded
+    # make the file stale again instead of being missed.
+    stamp = _stat_file(str(path))
+    content_hash = _hash_file(path)
+    if stamp is None or content_hash is None:
+        return None
+    return stamp, content_hash
+
+
+def _flatten_document_symbols(
+    uri: str, lsp_symbols: Iterable[DocumentSymbol], container_name: Optional[str]
+) -> List[_LSPSymbol]:
+    out: List[_LSPSymbol] = []
+    for lsp_symbol in lsp_symbols:
+        out.append(
+            SymbolInformation(
+                name=lsp_symbol.name,
+                kind=lsp_symbol.kind,
+                tags=lsp_symbol.tags,
+                containerName=container_name,
+                location=Location(uri=uri, range=lsp_symbol.selectionRange),
+            )
+        )
+        if lsp_symbol.children:
+            out += _flatten_document_symbols(uri, lsp_symbol.children, lsp_symbol.name)
+    return out
+
+
+class SymbolIndex:
+    """
+    A persistent index of the symbols in a :class:`Workspace`, which is stored in an SQLite database.
+
+    Loading all symbols of a large workspace with :meth:`Workspace.load_all_symbols()` can take a long time.
+    A ``SymbolIndex`` stores the symbols per file together with the modification time, size and content hash
+    of the file, so they can be reused the next time. Afterwards, only the files which actually changed are
+    requested again with *textDocument/documentSymbol*.
+
+    Queries are answered from the database. Before symbols are returned, the files containing them are checked
+    and stale files are refreshed from the language server first. Files which were added to the workspace
+    after the index was built are only found after :meth:`refresh()` is called with their paths or after
+    :meth:`rebuild()`.
+
+    Only symbols in files below the roots of the ``Workspace`` are stored. The index is discarded automatically
+    when it was built by a different language server or with a different position encoding.
+
+    A ``SymbolIndex`` should be closed when it is no longer needed, preferably by using a ``with`` statement.
+
+    :param workspace: The ``Workspace`` whose symbols are indexed.
+    :param path: The path of the database file. Use ``":memory:"`` for an index which is not persisted.
+    :param client: The :class:`Client` which is used to request symbols. If only one ``Client``
+        is open in the ``Workspace``, this parameter is optional.
+    """
+
+    _workspace: "ws.Workspace"
+    _client: Client
+    _connection: sqlite3.Connection
+    _validated: bool
+
+    def __init__(
+        self,
+        workspace: "ws.Workspace",
+        path: Union[Path, str],
+        *,
+        client: Optional[Client] = None,
+    ) -> None:
+        self._workspace = workspace
+        self._client = workspace._resolve_client_parameter(client)  # type: ignore
+        self._connection = sqlite3.connect(str(path))
+        self._connection.create_function("fuzzy_match", 2, _fuzzy_match, deterministic=True)
+        self._connection.executescript(_SCHEMA)
+        self._validated = False
+
+    def __enter__(self) -> "SymbolIndex":
+        return self
+
+    def __exit__(
+        self, exc_type: Type[Exception], exc_value: Exception, traceback: TracebackType
+    ) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """
+        Closes the database. The ``SymbolIndex`` can not be used afterwards.
+        """
+        self._connection.close()
+
+    def __len__(self) -> int:
+        ((count,),) = self._connection.execute("SELECT COUNT(*) FROM symbols")
+        return count
+
+    def _get_meta(self) -> Dict[str, str]:
+        return {
+            "schema": _SCHEMA_VERSION,
+            "server": str(self._client.server_info),
+            "position_encoding": str(self._client.get_position_encoding_kind()),
+        }
+
+    def _validate(self) -> None:
+        """
+        Discards the stored symbols if they were built by a different language server.
+        """
+        if self._validated:
+            return
+        meta = self._get_meta()
+        stored = dict(self._connection.execute("SELECT key, value FROM meta"))
+        if stored != meta:
+            if stored:
+                self._workspace.logger.info(
+                    "Symbol index was built by a different language server, discarding it."
+                )
+            with self._connection:
+                self._connection.execute("DELETE FROM symbols")
+                self._connection.execute("DELETE FROM files")
+                self._connection.execute("DELETE FROM meta")
+                self._connection.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        self._validated = True
+
+    def _get_path(self, uri: str) -> Optional[Path]:
+        scheme, _, raw_path, _, _ = urlsplit(uri)
+        if scheme != "file":
+            return None
+        path = Path(url2pathname(raw_path))
+        if not any(
+            ws._path_is_relative_to(path, root) for root in self._workspace._roots  # type: ignore
+        ):
+            return None
+        return path
+
+    def _store_file(
+        self, uri: str, stamp: _FileStamp, content_hash: str, lsp_symbols: Sequence[_LSPSymbol]
+    ) -> None:
+        # Runs inside a transaction, see the callers.
+        self._connection.execute("DELETE FROM symbols WHERE uri = ?", (uri,))
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (uri, *stamp, content_hash)
+        )
+        self._store_symbols(uri, lsp_symbols)
+
+    def _store_symbols(
+        self, uri: str, lsp_symbols: Sequence[_LSPSymbol], table: str = "symbols"
+    ) -> None:
+        self._connection.executemany(
+            f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    uri,
+                    s.name,
+                    s.name.casefold(),
+                    isinstance(s, WorkspaceSymbol),
+                    json.dumps(s.to_json()),
+                )
+                for s in lsp_symbols
+            ],
+        )
+
+    def _remove_file(self, uri: str) -> None:
+        self._connection.execute("DELETE FROM symbols WHERE uri = ?", (uri,))
+        self._connection.execute("DELETE FROM files WHERE uri = ?", (uri,))
+
+    async def _is_stale(self, uri: str) -> bool:
+        """
+        Checks whether the file at ``uri`` changed since its symbols were stored. Files whose modification time
+        changed, but whose contents are the same, are not stale.
+        """
+        row = self._connection.execute(
+            "SELECT mtime_ns, size, hash FROM files WHERE uri = ?", (uri,)
+        ).fetchone()
+        path = self._get_path(uri)
+        if row is None or path is None:
+            return True
+        stamp = _stat_file(str(path))
+        if stamp is None:
+            return True
+        if stamp == (row[0], row[1]):
+            return False
+        content_hash = await asyncio.get_running_loop().run_in_executor(None, _hash_file, path)
+        if content_hash != row[2]:
+            return True
+        with self._connection:
+            self._connection.execute(
+                "UPDATE files SET mtime_ns = ?, size = ? WHERE uri = ?", (*stamp, uri)
+            )
+        return False
+
+    @operation
+    async def rebuild(self, **kwargs: Any) -> None:
+        """
+        Discards the stored symbols and loads all symbols of the ``Workspace`` with a *workspace/symbol* request.
+        The symbols are stored as they arrive, see :meth:`Workspace.iter_all_symbols()`, but the previously
+        stored symbols are only replaced once all symbols have arrived.
+
+        :param timeout: See :meth:`Client.send_request()`.
+        """
+        self._validate()
+        self._connection.executescript(_STAGING_SCHEMA)
+        # Whether each file is indexed. Files are stamped when their first symbol arrives.
+        indexed: Dict[str, bool] = {}
+        async for chunk in self._workspace.iter_all_symbols(client=self._client, **kwargs):
+            by_uri: Dict[str, List[_LSPSymbol]] = {}
+            for unresolved_symbol in chunk:
+                lsp_symbol = unresolved_symbol._lsp_workspace_symbol  # type: ignore
+                by_uri.setdefault(unresolved_symbol.uri, []).append(lsp_symbol)
+            new_uris = [uri for uri in by_uri if uri not in indexed]
+            stamps = await asyncio.gather(*(self._stamp_new_file(uri) for uri in new_uris))
+            with self._connection:
+                for uri, stamp in zip(new_uris, stamps):
+                    indexed[uri] = stamp is not None
+                    if stamp is not None:
+                        self._connection.execute(
+                            "INSERT INTO new_files VALUES (?, ?, ?, ?)", (uri, *stamp[0], stamp[1])
+                        )
+                for uri, lsp_symbols in by_uri.items():
+                    if indexed[uri]:
+                        self._store_symbols(uri, lsp_symbols, "new_symbols")
+
+        with self._connection:
+            self._connection.execute("DELETE FROM symbols")
+            self._connection.execute("DELETE FROM files")
+            self._connection.execute("INSERT INTO files SELECT * FROM new_files")
+            self._connection.execute("INSERT INTO symbols SELECT * FROM new_symbols")
+            self._connection.execute("DELETE FROM new_files")
+            self._connection.execute("DELETE FROM new_symbols")
+        self._workspace.logger.info(
+            f"Indexed {len(self)} symbols in {sum(indexed.values())} files."
+        )
+
+    async def _stamp_new_file(self, uri: str) -> Optional[Tuple[_FileStamp, str]]:
+        path = self._get_path(uri)
+        if path is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(None, _stamp_and_hash_file, path)
+
+    async def _load_document_symbols(
+        self, uri: str
+    ) -> Optional[Tuple[_FileStamp, str, List[_LSPSymbol]]]:
+        """
+        Requests the symbols of the file at ``uri``. Returns None if the file does not exist
+        or is outside of the ``Workspace``.
+        """
+        path = self._get_path(uri)
+        if path is None:
+            return None
+        stamped = await asyncio.get_running_loop().run_in_executor(None, _stamp_and_hash_file, path)
+        if stamped is None:
+            return None
+        stamp, content_hash = stamped
+        with self._workspace.open_text_document(path) as text_document:
+            if not self._client.check_feature(
+                "textDocument/documentSymbol", text_document=text_document
+            ):
+                raise ChangeLSError(
+                    f"Language server {self._client.server_info} does not support document symbols."
+                )
+            text_document._ensure_open()  # type: ignore
+            res = await self._client.send_text_document_document_symbol(
+                DocumentSymbolParams(textDocument=text_document.get_text_document_identifier())
+            )
+        lsp_symbols: List[_LSPSymbol] = []
+        for lsp_symbol in res or []:
+            if isinstance(lsp_symbol, DocumentSymbol):
+                lsp_symbols += _flatten_document_symbols(uri, [lsp_symbol], None)
+            else:
+                lsp_symbols.append(lsp_symbol)
+        return stamp, content_hash, lsp_symbols
+
+    @operation
+    async def refresh(self, paths: Optional[Sequence[Union[Path, str]]] = None) -> List[str]:
+        """
+        Requests the symbols of stale files again with *textDocument/documentSymbol*. Symbols of files which
+        were deleted are removed.
+
+        :param paths: The files to check. By default, all files in the index are checked.
+            Files which are not in the index yet are added.
+        :returns: The URIs of the files which were refreshed.
+        """
+        self._validate()
+        if paths is None:
+            uris = [uri for (uri,) in self._connection.execute("SELECT uri FROM files")]
+        else:
+            uris = [self._workspace._normalize_path_parameter(p)[1] for p in paths]  # type: ignore
+        stale = [uri for uri in uris if await self._is_stale(uri)]
+
+        for window_start in range(0, len(stale), _REFRESH_WINDOW):
+            window = stale[window_start : window_start + _REFRESH_WINDOW]
+            results = await asyncio.gather(*(self._load_document_symbols(uri) for uri in window))
+            with self._connection:
+                for uri, result in zip(window, results):
+                    if result is None:
+                        self._remove_file(uri)
+                    else:
+                        self._store_file(uri, *result)
+        self._workspace.logger.info(f"Refreshed {len(stale)} of {len(uris)} files.")
+        return stale
+
+    def _query_rows(
+        self, query: str, mode: str, limit: Optional[int]
+    ) -> List[Tuple[str, bool, str]]:
+        folded_query = query.casefold()
+        if mode == "prefix":
+            condition = "folded_name >= ?1 AND folded_name < ?1 || char(1114111)"
+        elif mode == "substring":
+            condition = "instr(folded_name, ?1) > 0"
+        elif mode == "fuzzy":
+            condition = "fuzzy_match(folded_name, ?1)"
+        else:
+            raise ValueError(f"Unknown query mode '{mode}'.")
+        sql = (
+            "SELECT uri, is_workspace_symbol, data FROM symbols "
+            f"WHERE {condition} ORDER BY length(name), folded_name LIMIT ?2"
+        )
+        return self._connection.execute(
+            sql, (folded_query, limit if limit is not None else -1)
+        ).fetchall()
+
+    @operation
+    async def query(
+        self,
+        query: str,
+        *,
+        mode: Literal["prefix", "substring", "fuzzy"] = "prefix",
+        limit: Optional[int] = None,
+    ) -> List["symbol.UnresolvedWorkspaceSymbol"]:
+        """
+        Returns the symbols whose names match ``query``, ignoring case. Shorter names are returned first.
+
+        Files containing matching symbols are refreshed first if they are stale. Stale files without
+        matching symbols are not checked, call :meth:`refresh()` to bring the whole index up to date.
+
+        :param query: The string to match the names of the symbols against.
+        :param mode: How the names are matched. ``"prefix"`` matches names starting with ``query``,
+            ``"substring"`` matches names containing ``query`` and ``"fuzzy"`` matches names
+            which contain the characters of ``query`` in the same order.
+        :param limit: The maximum number of returned symbols.
+        """
+        self._validate()
+        rows = self._query_rows(query, mode, limit)
+        stale = [uri for uri in dict.fromkeys(row[0] for row in rows) if await self._is_stale(uri)]
+        if stale:
+            await self.refresh(stale)
+            rows = self._query_rows(query, mode, limit)
+
+        out: List[symbol.UnresolvedWorkspaceSymbol] = []
+        for _, is_workspace_symbol, data in rows:
+            lsp_symbol: _LSPSymbol
+            if is_workspace_symbol:
+                lsp_symbol = WorkspaceSymbol.from_json(json.loads(data))
+            else:
+                lsp_symbol = SymbolInformation.from_json(json.loads(data))
+            out.append(symbol.UnresolvedWorkspaceSymbol(self._client, self._workspace, lsp_symbol))
+        self._workspace.logger.info(f"Found {len(out)} Symbols!")
+        return out
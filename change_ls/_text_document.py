@@ -1,16 +1,49 @@
 import asyncio
+import codecs
+import locale
+import mmap
+import os
+import stat
+import sys
+import tempfile
+import time
+import uuid
 import warnings
+import weakref
+from array import array
 from bisect import bisect_right
+from contextlib import suppress
 from dataclasses import dataclass, field
-from logging import LoggerAdapter
+from difflib import SequenceMatcher
+from heapq import merge
+from itertools import accumulate, islice
+from logging import INFO, LoggerAdapter, getLogger
+from operator import attrgetter
 from pathlib import Path
 from types import TracebackType
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional, Type, overload
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    overload,
+)
 
 import change_ls._symbol as sym
 import change_ls._workspace as ws
 from change_ls._change_ls_error import ChangeLSError
 from change_ls._client import Client
+from change_ls._edit_log import _EditLog
+from change_ls._line_index import _LineIndex
+from change_ls._rope import _LINE_BREAK, Rope
+from change_ls._snapshot import TextDocumentSnapshot
 from change_ls._util import TextDocumentInfo, guess_language_id
 from change_ls.logging import get_change_ls_default_logger  # type: ignore
 from change_ls.logging import operation
@@ -23,7 +56,6 @@ from change_ls.types import (
     DocumentSymbolParams,
     OptionalVersionedTextDocumentIdentifier,
     Position,
-    PositionEncodingKind,
     Range,
     SymbolKind,
     SymbolTag,
@@ -57,17 +89,6 @@ class _Edit:
 
         return covers_from_offset or covers_to_offset or covers_both
 
-    def as_text_document_content_change_event(
-        self, line_offsets: List[int]
-    ) -> TextDocumentContentChangeEvent:
-        from_line = bisect_right(line_offsets, self.from_offset) - 1
-        from_character = self.from_offset - line_offsets[from_line]
-        from_position = Position(line=from_line, character=from_character)
-        to_line = bisect_right(line_offsets, self.to_offset) - 1
-        to_character = self.to_offset - line_offsets[to_line]
-        to_position = Position(line=to_line, character=to_character)
-        return {"text": self.new_text, "range": Range(start=from_position, end=to_position)}
-
     def __str__(self) -> str:
         if self.from_offset == self.to_offset:
             return f"Insert {self.new_text} at offset {self.from_offset}"
@@ -77,72 +98,222 @@ class _Edit:
             return f"Change characters in range [{self.from_offset}:{self.to_offset}] to {self.new_text}"
 
 
-class DroppedChangesWarning(Warning):
+# Same order as the comparison methods generated by dataclass, but much faster.
+_edit_sort_key = attrgetter("from_offset", "to_offset")
+
+# Rough size of a serialized TextDocumentContentChangeEvent, excluding the text.
+_CHANGE_EVENT_SIZE = 64
+
+# Incremental changes are preferred, because they allow language servers to update their state
+# without reprocessing the whole document. The full text is only sent if it is smaller by this margin.
+_FULL_SYNC_MARGIN = 1024
+
+
+# Files larger than this are decoded directly from a memory mapping of the file.
+_MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# The logger behind the loggers of all TextDocuments. See TextDocument._log_info().
+_workspace_logger = getLogger("change-ls.workspace")
+
+
+# Byte order marks and the encodings they indicate. The UTF-32 marks need to be checked first,
+# because the little endian UTF-32 mark starts with the little endian UTF-16 mark.
+_BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _detect_byte_order_mark(data: Union[bytes, mmap.mmap], encoding: str) -> Tuple[str, bytes]:
     """
-    Warning category used when dropping changes when closing a TextDocument.
+    Returns the encoding to decode ``data`` with and the byte order mark at the start of ``data``.
+    A byte order mark takes precedence over the configured ``encoding``.
     """
+    for byte_order_mark, byte_order_mark_encoding in _BYTE_ORDER_MARKS:
+        if data[: len(byte_order_mark)] == byte_order_mark:
+            return byte_order_mark_encoding, byte_order_mark
 
+    # Saving a file without a byte order mark should not add one. Without a byte order mark,
+    # the UTF-16 and UTF-32 codecs decode in native byte order, so the explicit-endian codec is equivalent.
+    name = codecs.lookup(encoding).name
+    if name == "utf-8-sig":
+        return "utf-8", b""
+    if name in ("utf-16", "utf-32"):
+        return f"{name}-{'le' if sys.byteorder == 'little' else 'be'}", b""
+    return encoding, b""
 
-def _skip_to_next_line(text: str, offset: int) -> int:
-    for i in range(offset, len(text)):
-        if text[i : i + 2] == "\r\n":
-            return i + 2
-        if text[i] in ["\n", "\r"]:
-            return i + 1
-    return -1
 
+def _read_text_file(path: Path, encoding: str) -> Tuple[str, str, bytes]:
+    """
+    Reads a file in binary mode and decodes it in one go. Newlines are not translated, so
+    :func:`_write_text_file` reproduces the file exactly. Returns the text, the encoding used to decode
+    it and the byte order mark of the file, which is not part of the text.
+    """
+    with path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size < _MMAP_THRESHOLD:
+            data = file.read()
+            encoding, byte_order_mark = _detect_byte_order_mark(data, encoding)
+            if byte_order_mark:
+                data = data[len(byte_order_mark) :]
+            return str(data, encoding), encoding, byte_order_mark
+
+        # Decoding from the mapping avoids an intermediate copy of the raw file content.
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            encoding, byte_order_mark = _detect_byte_order_mark(mapping, encoding)
+            with memoryview(mapping)[len(byte_order_mark) :] as view:
+                return str(view, encoding), encoding, byte_order_mark
+
+
+def _create_temp_file(path: Path) -> Tuple[int, str]:
+    """
+    Creates a temporary file next to ``path`` and returns its file descriptor and path.
+    The temporary file needs to be on the same file system for :func:`os.replace` to be atomic.
+    Unlike :func:`tempfile.mkstemp`, the file is created with the default permissions of new files.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for _ in range(tempfile.TMP_MAX):
+        temp_path = os.path.join(path.parent, f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            return os.open(temp_path, flags, 0o666), temp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"Could not create a temporary file for '{path}'.")
+
+
+def _write_text_file(
+    path: Path, text: str, encoding: str, byte_order_mark: bytes, fsync: bool
+) -> bool:
+    """
+    Atomically replaces the contents of ``path`` with ``text``, unless the file already contains ``text``.
+    Newlines are written as they are. Returns whether the file was written.
+    """
+    data = byte_order_mark + text.encode(encoding)
+
+    # Write through symlinks instead of replacing them.
+    path = Path(os.path.realpath(path))
+    try:
+        stat_result = path.stat()
+    except FileNotFoundError:
+        stat_result = None
+    if stat_result is not None and stat_result.st_size == len(data) and path.read_bytes() == data:
+        return False
 
-def _calculate_line_offsets(text: str) -> List[int]:
-    offset = 0
-    line_offsets: List[int] = []
-    # This loop will include trailing newlines. This is intentional because it
-    # is needed for edits at the end of the file.
-    while offset >= 0:
-        line_offsets.append(offset)
-        offset = _skip_to_next_line(text, offset)
-    return line_offsets
+    fd, temp_path = _create_temp_file(path)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        # New files keep the mode of the temporary file, which honors the umask like open() does.
+        if stat_result is not None:
+            os.chmod(temp_path, stat.S_IMODE(stat_result.st_mode))
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+
+    if fsync and os.name != "nt":
+        # Persist the directory entry as well.
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return True
+
+
+def _merge_adjacent_edits(edits: List[_Edit]) -> List[_Edit]:
+    """
+    Merges runs of sorted edits where each edit starts at the end of the previous one.
+    """
+    out: List[_Edit] = []
+    run_start = 0
+    for index in range(1, len(edits) + 1):
+        if index < len(edits) and edits[index].from_offset == edits[index - 1].to_offset:
+            continue
+        if index - run_start == 1:
+            out.append(edits[run_start])
+        else:
+            out.append(
+                _Edit(
+                    edits[run_start].from_offset,
+                    edits[index - 1].to_offset,
+                    "".join(e.new_text for e in edits[run_start:index]),
+                )
+            )
+        run_start = index
+    return out
 
 
-def _utf_8_character_length(char: int) -> int:
-    if char <= 0x7F:
-        return 1
-    elif char <= 0x7FF:
-        return 2
-    elif char <= 0xFFFF:
-        return 3
-    else:
-        return 4
+def _common_prefix_length(a: str, b: str) -> int:
+    # Binary search over slice comparisons, which is much faster than comparing character by character.
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
 
-def _utf_16_character_length(char: int) -> int:
-    if char <= 0xFFFF:
-        return 1
-    else:
-        return 2
+def _common_suffix_length(a: str, b: str, limit: int) -> int:
+    low, high = 0, min(len(a), len(b), limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle : len(a) - low] == b[len(b) - middle : len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
 
-_code_units_to_character_length: Dict[PositionEncodingKind, Callable[[int], int]] = {
-    PositionEncodingKind.UTF8: _utf_8_character_length,
-    PositionEncodingKind.UTF16: _utf_16_character_length,
-    PositionEncodingKind.UTF32: lambda _: 1,
-}
+def _diff_texts(old_text: str, new_text: str) -> List[_Edit]:
+    """
+    Computes sorted, non-overlapping edits which turn ``old_text`` into ``new_text``. The common prefix
+    and suffix are skipped, the remaining text is compared line by line.
+    """
+    prefix = _common_prefix_length(old_text, new_text)
+    suffix = _common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - prefix)
+    old_middle = old_text[prefix : len(old_text) - suffix]
+    new_middle = new_text[prefix : len(new_text) - suffix]
+    if not old_middle and not new_middle:
+        return []
+    if not old_middle or not new_middle:
+        return [_Edit(prefix, prefix + len(old_middle), new_middle)]
+
+    old_lines = old_middle.splitlines(keepends=True)
+    new_lines = new_middle.splitlines(keepends=True)
+    old_line_offsets = list(accumulate((len(line) for line in old_lines), initial=prefix))
+
+    out: List[_Edit] = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        out.append(
+            _Edit(
+                old_line_offsets[old_start],
+                old_line_offsets[old_end],
+                "".join(new_lines[new_start:new_end]),
+            )
+        )
+    return out
 
 
-def _code_units_to_offset(reference: str, code_units: int, encoding: PositionEncodingKind) -> int:
-    get_character_length = _code_units_to_character_length[encoding]
-    counter = 0
-    for i, c in enumerate(reference):
-        if counter == code_units:
-            return i
-        if counter > code_units:
-            raise IndexError(f"Code unit {code_units} is not a valid codepoint boundary.")
-        counter += get_character_length(ord(c))
-    return len(reference)
+def _estimate_content_changes_size(edits: List[_Edit]) -> int:
+    return sum(len(e.new_text) for e in edits) + len(edits) * _CHANGE_EVENT_SIZE
 
 
-def _offset_to_code_units(reference: str, offset: int, encoding: PositionEncodingKind) -> int:
-    get_character_length = _code_units_to_character_length[encoding]
-    return sum(get_character_length(ord(c)) for c in reference[:offset])
+class DroppedChangesWarning(Warning):
+    """
+    Warning category used when dropping changes when closing a TextDocument.
+    """
 
 
 if TYPE_CHECKING:
@@ -186,7 +357,16 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
     .. attribute:: encoding
         :type: str
 
-        The character encoding used by this ``TextDocument``.
+        The character encoding used by this ``TextDocument``. If the file starts with a byte order mark,
+        this is the encoding indicated by the byte order mark. The byte order mark itself is not part of
+        :attr:`text`, but it is written back when the document is saved.
+
+    .. attribute:: newline
+        :type: str
+
+        The line break used by the first line of :attr:`text`, or ``"\\n"`` if the text has only one line.
+        Line breaks are neither translated when a document is loaded nor when it is saved, so this can be used to
+        keep edits consistent with the rest of the document.
 
     .. attribute:: tokens
         :type: TokenList | None
@@ -194,26 +374,65 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         The tokens for this document. This attribute is only populated after :meth:`load_tokens` has been called.
     """
 
-    _text: str
+    # Workspaces can hold a large number of TextDocuments, so the per-document state is kept small.
+    # Everything that is not needed for every document is only allocated on first use.
+    __slots__ = (
+        "_rope",
+        "_version",
+        "_path",
+        "_encoding",
+        "_byte_order_mark",
+        "_workspace",
+        "_tokens",
+        "_outlines",
+        "_pending_edits",
+        "_reference_count",
+        "_server_open",
+        "_content_saved",
+        "_release_text",
+        "_logger",
+        "_snapshot",
+        "_released_snapshot",
+        "_edit_log",
+        "_cached_results",
+        "_loaded_semantic_tokens",
+    )
+
+    # The contents are stored as a rope, so edits don't need to copy the whole text.
+    # The text itself is only assembled when it is actually needed.
+    # None if the contents have not been loaded yet or were released, see _get_rope().
+    _rope: Optional[Rope]
     _version: int
 
     _path: Path
     _encoding: str
-    _clients: Dict[str, Client]
+
+    # The byte order mark at the start of the file, which is not part of the text.
+    _byte_order_mark: bytes
+
     _workspace: "ws.Workspace"
     _tokens: Optional[TokenList[SyntacticToken]]
-    _outlines: Dict[Client, List["sym.DocumentSymbol"]]
+    _outlines: Optional[Dict[Client, List["sym.DocumentSymbol"]]]
     _pending_edits: List[_Edit]
-    _line_offsets: List[int]
     _reference_count: int
+
+    # Whether the document is currently open on the language servers. See Workspace.set_residency_limits().
+    _server_open: bool
     _content_saved: bool
-    _logger: _LoggerAdapter
+    _release_text: bool
+
+    # Created on first use, see logger.
+    _logger: Optional[_LoggerAdapter]
+
+    # Snapshot of the current version, which also holds the line index. See snapshot().
+    _snapshot: Optional[TextDocumentSnapshot]
 
-    # Cache for position_to_offset, to speed up processing of semantic tokens
-    _cached_line: int
-    _cached_version: int
-    _cached_start_offset: int
-    _cached_reference_string: str
+    # The snapshot of the current version while the text is released, so it is reused
+    # as long as it is still referenced elsewhere. See _maybe_release_text().
+    _released_snapshot: "Optional[weakref.ref[TextDocumentSnapshot]]"
+
+    # The edits committed for each version, see map_offset(). None until the first commit.
+    _edit_log: Optional[_EditLog]
 
     def __init__(
         self,
@@ -222,11 +441,15 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         language_id: Optional[str] = None,
         version: int = 0,
         encoding: Optional[str] = None,
+        *,
+        lazy: bool = False,
+        release_text: bool = False,
     ) -> None:
         self._path = path
-        with path.open(encoding=encoding) as file:
-            self._text = file.read()
-            self._encoding = file.encoding
+        self._encoding = encoding if encoding else locale.getpreferredencoding(False)
+        self._byte_order_mark = b""
+        self._rope = None
+        self._release_text = release_text
 
         if not language_id:
             guessed_id = guess_language_id(path)
@@ -237,42 +460,117 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         self._version = version
         self._workspace = workspace
         self._tokens = None
-        self._outlines = {}
+        self._outlines = None
         self._pending_edits = []
-        self._line_offsets = _calculate_line_offsets(self._text)
+        self._snapshot = None
+        self._released_snapshot = None
+        self._edit_log = None
         self._reference_count = 0
+        self._server_open = False
         self._content_saved = True
 
-        self._cached_line = -1
-        self._cached_version = -1
-        self._cached_start_offset = -1
-        self._cached_reference_string = ""
-
         uri = path.as_uri()
         TextDocumentInfo.__init__(self, uri, language_id)
         SemanticTokensMixin.__init__(self)
 
-        self._logger = get_change_ls_default_logger(
-            "change-ls.workspace", cls_workspace=str(workspace._id), cls_text_document=uri
-        )  # type: ignore
+        self._logger = None
+
+        if not lazy:
+            self._get_rope()
 
         self._reopen()
 
     @property
     def logger(self) -> _LoggerAdapter:
+        if self._logger is None:
+            self._logger = get_change_ls_default_logger(
+                "change-ls.workspace",
+                cls_workspace=str(self._workspace._id),
+                cls_text_document=self.uri,
+            )  # type: ignore
         return self._logger
 
     def _get_logger_from_context(self, *_args: Any, **_kwargs: Any) -> _LoggerAdapter:
-        return self._logger
+        return self.logger
+
+    def _log_info(self, message: str) -> None:
+        # Used on the paths taken by every document, so that documents which
+        # never log anything don't need to create a logger at all.
+        if _workspace_logger.isEnabledFor(INFO):
+            self.logger.info(message)
+
+    def _get_rope(self) -> Rope:
+        if self._rope is None:
+            snapshot = self._released_snapshot() if self._released_snapshot is not None else None
+            self._released_snapshot = None
+            if snapshot is not None:
+                self._rope = snapshot._rope  # type: ignore
+                self._snapshot = snapshot
+            else:
+                self._log_info(f"Loading text content from {self._path}.")
+                self._set_loaded_text(*_read_text_file(self._path, self._encoding))
+        assert self._rope is not None
+        return self._rope
+
+    def _set_loaded_text(self, text: str, encoding: str, byte_order_mark: bytes) -> None:
+        """
+        Sets the contents as returned by :func:`_read_text_file`. This is called directly by
+        :meth:`Workspace.open_text_documents()`, which reads the files in advance.
+        """
+        self._rope = Rope(text)
+        self._encoding = encoding
+        self._byte_order_mark = byte_order_mark
+
+    def _maybe_release_text(self) -> None:
+        """
+        Drops the in-memory contents, if they were opened with ``release_text=True`` and
+        are identical to the file contents. The contents are read from the file again when needed.
+        """
+        if (
+            self._release_text
+            and self._rope is not None
+            and self._content_saved
+            and not self._pending_edits
+        ):
+            self.logger.debug("Releasing text content.")
+            if self._snapshot is not None:
+                self._released_snapshot = weakref.ref(self._snapshot)
+            self._rope = None
+            self._snapshot = None
 
     def _reopen(self) -> None:
         self._reference_count += 1
-        self.logger.info(f"Incremented reference count. New count is {self._reference_count}.")
+        self._log_info(f"Incremented reference count. New count is {self._reference_count}.")
+        if self._reference_count == 1:
+            self._workspace._residency.revive(self)  # type: ignore
+
+    def _ensure_open(self) -> None:
+        """
+        Makes sure that the document is open on the language servers before sending a request for it.
+        """
+        self._check_closed()
+        self._workspace._residency.ensure_open(self)  # type: ignore
+
+    def _get_synced_clients(self) -> List[Client]:
+        # Documents which were evicted from the language servers are synchronized when they are opened again.
+        return self._workspace.clients if self._server_open else []
+
+    def _close_on_servers(self) -> None:
+        for client in self._workspace.clients:
+            if not client.check_feature("textDocument/didClose", text_documents=[self]):
+                continue
+            params = DidCloseTextDocumentParams(textDocument=self.get_text_document_identifier())
+            client.send_text_document_did_close(params)
+        # The language servers discard their previous results, so semantic token deltas are not possible anymore.
+        self._cached_results = None
 
     def _set_path(self, new_path: Path) -> None:
         del self._workspace._opened_text_documents[self.uri]  # type: ignore
         self._path = new_path
         self._uri = new_path.as_uri()
+        self._snapshot = None
+        self._released_snapshot = None
+        self._logger = None
         self._workspace._opened_text_documents[self.uri] = self  # type: ignore
 
     async def rename_file(
@@ -309,11 +607,9 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
                 DroppedChangesWarning,
             )
 
-        for client in self._workspace.clients:
-            if not client.check_feature("textDocument/didClose", text_documents=[self]):
-                continue
-            params = DidCloseTextDocumentParams(textDocument=self.get_text_document_identifier())
-            client.send_text_document_did_close(params)
+        if self._server_open:
+            self._close_on_servers()
+        self._workspace._residency.forget(self)  # type: ignore
 
         # Set the reference_count to 0 explicitly, so documents from a closed
         # Workspace return True on is_closed().
@@ -333,14 +629,16 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         Manually closes this ``TextDocument``. If a ``TextDocument`` has been opened multiple times,
         it needs to be closed that many times to fully close it.
 
-        It is preferred to use a ``with`` statement instead of manually closing the ``TextDocument``
+        It is preferred to use a ``with`` statement instead of manually closing the ``TextDocument``.
+        If a grace period was set with :meth:`Workspace.set_residency_limits()`, the document stays open on the
+        language servers for that time, so it can be reused if it is opened again.
         """
         self._check_closed()
 
         self._reference_count -= 1
-        self.logger.info(f"Decremented reference count. New count is {self._reference_count}.")
+        self._log_info(f"Decremented reference count. New count is {self._reference_count}.")
         if self._reference_count <= 0:
-            self._final_close()
+            self._workspace._residency.release(self)  # type: ignore
 
     def __enter__(self) -> "TextDocument":
         return self
@@ -356,7 +654,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
 
     @property
     def text(self) -> str:
-        return self._text
+        return str(self._get_rope())
 
     @property
     def version(self) -> int:
@@ -366,6 +664,17 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
     def encoding(self) -> str:
         return self._encoding
 
+    @property
+    def newline(self) -> str:
+        rope = self._get_rope()
+        if rope.line_count == 1:
+            return "\n"
+        # Only the end of the first line needs to be looked at.
+        end = rope.line_start(1)
+        line_break = _LINE_BREAK.search(rope.slice(max(end - 2, 0), end))
+        assert line_break is not None
+        return line_break.group()
+
     @property
     def language_id(self) -> str:
         assert self._language_id is not None
@@ -420,6 +729,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
                 self.text, self.language_id, include_whitespace=include_whitespace
             )
         if mode in ["enrich", "semantic"]:
+            self._ensure_open()
             await self._load_semantic_tokens(client)
         if mode == "enrich":
             assert self._tokens is not None
@@ -448,7 +758,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
                     "Outline is ambiguous because the Workspace has multiple open Clients. Pass a Client to load_outline to load the outline for that Client."
                 )
 
-        out = self._outlines.get(client)
+        out = self._outlines.get(client) if self._outlines is not None else None
         if out is None:
             raise AttributeError(
                 f"No outline is loaded for Client {client}. Use load_outline(...) to fill the outline property."
@@ -472,6 +782,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         """
 
         client = self._resolve_client_parameter(client)
+        self._ensure_open()
         if not client.check_feature("textDocument/documentSymbol", text_document=self):
             raise ChangeLSError(f"Client '{client}' does not support document outlines.")
 
@@ -481,9 +792,16 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         if res is None:
             raise ChangeLSError(f"Client '{client}' returned an empty outline.")
 
+        # Convert the positions of the whole outline at once and let the
+        # symbols consume their offsets while the hierarchy is built.
+        positions = sym._get_document_symbol_positions(res)
+        offsets = iter(self.positions_to_offsets(positions, client))
         outline = [
-            sym.DocumentSymbol(client, self._workspace, self, symbol, None) for symbol in res
+            sym.DocumentSymbol(client, self._workspace, self, symbol, None, offsets)
+            for symbol in res
         ]
+        if self._outlines is None:
+            self._outlines = {}
         self._outlines[client] = outline
         self.logger.info("Outline loaded!")
 
@@ -492,7 +810,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         Returns a :class:`TextDocumentItem` for this ``TextDocument``.
         """
         return TextDocumentItem(
-            uri=self.uri, languageId=self.language_id, version=self._version, text=self._text
+            uri=self.uri, languageId=self.language_id, version=self._version, text=self.text
         )
 
     def get_text_document_identifier(self) -> TextDocumentIdentifier:
@@ -527,11 +845,11 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
             raise ValueError(
                 f"Edit '{new_edit}' overlaps existing edit '{self._pending_edits[insertion_point - 1]}'"
             )
-        if insertion_point < len(self._pending_edits) - 1 and self._pending_edits[
-            insertion_point + 1
+        if insertion_point < len(self._pending_edits) and self._pending_edits[
+            insertion_point
         ].overlaps(new_edit):
             raise ValueError(
-                f"Edit '{new_edit}' overlaps existing edit '{self._pending_edits[insertion_point + 1]}'"
+                f"Edit '{new_edit}' overlaps existing edit '{self._pending_edits[insertion_point]}'"
             )
 
         self._pending_edits.insert(insertion_point, new_edit)
@@ -576,6 +894,9 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
                 raise IndexError("One of 'to_offset' and 'length' must be given.")
             to_offset = from_offset + length
 
+        self._queue_edit(self._create_edit(new_text, from_offset, to_offset))
+
+    def _create_edit(self, new_text: str, from_offset: int, to_offset: int) -> _Edit:
         if to_offset < from_offset:
             raise IndexError(
                 f"'to_offset' ({to_offset}) must be greater or equal to 'from_offset' ({from_offset})"
@@ -583,15 +904,68 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
 
         if (
             from_offset < 0
-            or from_offset > len(self._text)
+            or from_offset > len(self._get_rope())
             or to_offset < 0
-            or to_offset > len(self._text)
+            or to_offset > len(self._get_rope())
         ):
             raise IndexError(
-                f"edit() offsets are out of bounds: from_offset {from_offset}, to_offset {to_offset}, document length {len(self._text)}"
+                f"edit() offsets are out of bounds: from_offset {from_offset}, to_offset {to_offset}, document length {len(self._get_rope())}"
             )
 
-        self._queue_edit(_Edit(from_offset, to_offset, new_text))
+        return _Edit(from_offset, to_offset, new_text)
+
+    def edit_many(
+        self,
+        edits: Iterable[Union[Tuple[str, int, int], TextEdit]],
+        client: Optional[Client] = None,
+    ) -> None:
+        """
+        Queue many edits at once. Each edit is either a tuple ``(new_text, from_offset, to_offset)``,
+        with the same meaning as the arguments to :meth:`edit()`, or a :class:`TextEdit`.
+
+        This is equivalent to calling :meth:`edit()` or :meth:`push_text_edit()` for every element of ``edits``,
+        but is considerably faster for large numbers of edits. If any of the edits is invalid,
+        none of the edits are queued.
+
+        :param edits: The edits to queue.
+        :param client: The :class:`Client` whose position encoding is used for the ranges of ``TextEdits``.
+        """
+        self._check_closed()
+
+        edit_list = list(edits)
+
+        # Convert the ranges of all TextEdits in one go.
+        positions = array("i")
+        for e in edit_list:
+            if isinstance(e, TextEdit):
+                positions.extend(
+                    (
+                        e.range.start.line,
+                        e.range.start.character,
+                        e.range.end.line,
+                        e.range.end.character,
+                    )
+                )
+        offsets = iter(self.positions_to_offsets(positions, client) if positions else ())
+
+        new_edits: List[_Edit] = []
+        for e in edit_list:
+            if isinstance(e, TextEdit):
+                new_edits.append(self._create_edit(e.newText, next(offsets), next(offsets)))
+            else:
+                new_edits.append(self._create_edit(*e))
+
+        # sort() is stable, so insertions at the same position keep the order in which they were given.
+        # merge() takes the already pending edits first when edits compare equal.
+        new_edits.sort(key=_edit_sort_key)
+        merged_edits = list(merge(self._pending_edits, new_edits, key=_edit_sort_key))
+
+        for previous_edit, next_edit in zip(merged_edits, islice(merged_edits, 1, None)):
+            if previous_edit.overlaps(next_edit):
+                raise ValueError(f"Edit '{next_edit}' overlaps edit '{previous_edit}'")
+
+        self.logger.debug(f"Queuing {len(new_edits)} edits.")
+        self._pending_edits = merged_edits
 
     @overload
     def edit_tokens(self, new_text: str, from_index: int) -> None:
@@ -677,28 +1051,64 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         to_offset = self.position_to_offset(text_edit.range.end)
         self.edit(text_edit.newText, from_offset, to_offset)
 
-    def _edit_to_text_document_change_event(
-        self, edit: _Edit, client: Client
-    ) -> TextDocumentContentChangeEvent:
-        from_position = self.offset_to_position(edit.from_offset, client)
-        to_position = self.offset_to_position(edit.to_offset, client)
-        return {"text": edit.new_text, "range": Range(start=from_position, end=to_position)}
+    def _edits_to_text_document_change_events(
+        self, edits: List[_Edit], client: Client
+    ) -> List[TextDocumentContentChangeEvent]:
+        offsets = array("i")
+        for edit in edits:
+            offsets.append(edit.from_offset)
+            offsets.append(edit.to_offset)
+        positions = self.offsets_to_positions(offsets, client)
+
+        # The edits are reversed because, unlike commit_edits, ContentChangeEvents are applied one
+        # at a time, in the order they are received. So in order for edits earlier in the document
+        # to not invalidate later edits, the edits are entered in reverse order.
+        content_changes: List[TextDocumentContentChangeEvent] = []
+        for index in reversed(range(len(edits))):
+            from_line, from_character, to_line, to_character = positions[index * 4 : index * 4 + 4]
+            content_changes.append(
+                {
+                    "text": edits[index].new_text,
+                    "range": Range(
+                        start=Position(line=from_line, character=from_character),
+                        end=Position(line=to_line, character=to_character),
+                    ),
+                }
+            )
+        return content_changes
 
-    def _handle_text_change(self, client: Client) -> None:
+    def _handle_text_change(
+        self, client: Client, new_rope: Rope, merged_edits: List[_Edit]
+    ) -> None:
+        # This is called before the text is updated, so the positions in
+        # incremental changes refer to the text before the edits.
         self.logger.info(f"Updating document content for Client '{client}'")
 
+        metrics = self._workspace.metrics
+        full_size = len(new_rope)
+
         if client.check_feature("textDocument/didChange", sync_kind=TextDocumentSyncKind.Full):
-            content_changes: List[TextDocumentContentChangeEvent] = [{"text": self._text}]
+            content_changes: List[TextDocumentContentChangeEvent] = [{"text": str(new_rope)}]
+            metrics.increment("did_change.full_events")
+            metrics.increment("did_change.bytes_sent", full_size)
         elif client.check_feature(
             "textDocument/didChange", sync_kind=TextDocumentSyncKind.Incremental
         ):
-            # The edits are reversed because, unlike commit_edits, ContentChangeEvents are applied one
-            # at a time, in the order they are received. So in order for edits earlier in the document
-            # to not invalidate later edits, the edits are entered in reverse order.
-            content_changes = [
-                self._edit_to_text_document_change_event(edit, client)
-                for edit in reversed(self._pending_edits)
-            ]
+            unmerged_size = _estimate_content_changes_size(self._pending_edits)
+            incremental_size = _estimate_content_changes_size(merged_edits)
+            if full_size + _FULL_SYNC_MARGIN < incremental_size:
+                self.logger.debug(
+                    f"Sending full text instead of {len(merged_edits)} incremental changes."
+                )
+                content_changes = [{"text": str(new_rope)}]
+                metrics.increment("did_change.full_events")
+                metrics.increment("did_change.bytes_sent", full_size)
+                metrics.increment("did_change.bytes_saved", unmerged_size - full_size)
+            else:
+                content_changes = self._edits_to_text_document_change_events(merged_edits, client)
+                metrics.increment("did_change.incremental_events", len(content_changes))
+                metrics.increment("did_change.bytes_sent", incremental_size)
+                metrics.increment("did_change.bytes_saved", unmerged_size - incremental_size)
         else:
             # Document Sync is disabled for this client
             return
@@ -720,29 +1130,34 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
             After calling ``commit_edits()``, :meth:`load_tokens` will need to be called again if
             updated tokens are needed.
 
+        The committed edits are recorded, so that offsets into earlier versions can still be mapped
+        to the new version using :meth:`map_offset()` and :meth:`map_range()`.
+
         This function will NOT save the document to file, this needs to be done separately by calling
         :meth:`save()`.
         """
         self._check_closed()
 
-        text_offset = 0
-        segments: List[str] = []
-        for edit in self._pending_edits:
-            if text_offset < edit.from_offset:
-                segments.append(self._text[text_offset : edit.from_offset])
-            segments.append(edit.new_text)
-            text_offset = edit.to_offset
-        if text_offset < len(self._text):
-            segments.append(self._text[text_offset:])
-
-        self._text = "".join(segments)
+        # Edits are applied back to front, so the offsets of the remaining edits stay valid.
+        new_rope = self._get_rope()
+        for edit in reversed(self._pending_edits):
+            new_rope = new_rope.replace(edit.from_offset, edit.to_offset, edit.new_text)
+
+        merged_edits = _merge_adjacent_edits(self._pending_edits)
+        self._get_edit_log().append(
+            [(e.from_offset, e.to_offset, len(e.new_text)) for e in self._pending_edits]
+        )
         self._version += 1
-        for client in self._workspace.clients:
-            self._handle_text_change(client)
+        for client in self._get_synced_clients():
+            self._handle_text_change(client, new_rope, merged_edits)
+        self._rope = new_rope
+        if self._snapshot is not None:
+            self._snapshot._freeze(self._tokens)  # type: ignore
+            self._snapshot = None
         self._pending_edits = []
         self._tokens = None
-        self._loaded_semantic_tokens = {}
-        self._outlines = {}
+        self._loaded_semantic_tokens = None
+        self._outlines = None
         self._content_saved = False
 
     @operation
@@ -754,23 +1169,107 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         self._check_closed()
         self._pending_edits = []
 
+    @operation(
+        start_message="Reloading TextDocument...", get_logger_from_context=_get_logger_from_context
+    )
+    async def reload(self) -> bool:
+        """
+        Reloads the contents of this ``TextDocument`` from its file, e.g. after the file was changed
+        by another program. :meth:`Workspace.refresh_files()` does this automatically for all open documents.
+
+        The differences to the current contents are applied like edits passed to :meth:`commit_edits()`,
+        so the :attr:`version` is incremented, language servers only receive the changed parts in their
+        *textDocument/didChange* notifications, and offsets into earlier versions can still be mapped
+        using :meth:`map_offset()`. If the contents were released (see ``release_text`` in
+        :meth:`Workspace.open_text_document()`), the full text is sent instead.
+
+        A ``ChangeLSError`` is raised if the document has uncommitted edits or unsaved changes.
+
+        :returns: ``True`` if the contents changed, otherwise ``False``.
+        """
+        self._check_closed()
+        if self._pending_edits or not self._content_saved:
+            raise ChangeLSError(
+                f"TextDocument {self.uri} has unsaved changes and cannot be reloaded."
+            )
+
+        text, encoding, byte_order_mark = await asyncio.get_running_loop().run_in_executor(
+            None, _read_text_file, self._path, self._encoding
+        )
+        # The document might have been edited while the file was read.
+        if self._pending_edits or not self._content_saved:
+            raise ChangeLSError(
+                f"TextDocument {self.uri} has unsaved changes and cannot be reloaded."
+            )
+
+        self._encoding = encoding
+        self._byte_order_mark = byte_order_mark
+        if self._rope is None:
+            self._replace_released_text(text)
+        else:
+            edits = _diff_texts(str(self._rope), text)
+            if not edits:
+                self.logger.info("File content is unchanged.")
+                return False
+            self._pending_edits = edits
+            self.commit_edits()
+        self._content_saved = True
+        self.logger.info(f"Reloaded TextDocument, new version is {self._version}.")
+        self._maybe_release_text()
+        return True
+
+    def _replace_released_text(self, text: str) -> None:
+        # The previous contents are unknown, so language servers receive the full text
+        # and offsets from earlier versions can no longer be mapped.
+        self._version += 1
+        self._rope = Rope(text)
+        self._released_snapshot = None
+        self._edit_log = None
+        self._tokens = None
+        self._loaded_semantic_tokens = None
+        self._outlines = None
+
+        params = DidChangeTextDocumentParams(
+            textDocument=self.get_versioned_text_document_identifier(),
+            contentChanges=[{"text": text}],
+        )
+        metrics = self._workspace.metrics
+        for client in self._get_synced_clients():
+            if not client.check_feature(
+                "textDocument/didChange", sync_kind=TextDocumentSyncKind.Full
+            ) and not client.check_feature(
+                "textDocument/didChange", sync_kind=TextDocumentSyncKind.Incremental
+            ):
+                continue
+            client.send_text_document_did_change(params)
+            metrics.increment("did_change.full_events")
+            metrics.increment("did_change.bytes_sent", len(text))
+
     @operation(
         start_message="Saving TextDocument...", get_logger_from_context=_get_logger_from_context
     )
-    async def save(self) -> None:
+    async def save(self, *, fsync: bool = False) -> None:
         """
         Saves the ``TextDocument`` to file.
 
+        The file is written in a background thread. The contents are first written to a temporary file,
+        which then replaces the original file, so the file is never left partially written. If the file
+        already has the same contents, it is not written at all.
+
         .. warning::
 
             The LSP defines the ``textDocument/willSaveWaitUntil`` request, which can modify the document
             during saving. If any of the language servers try to perform illegal (overlapping) edits at this point,
             this method will raise an Exception and the document WILL NOT get saved. If this becomes an issue,
             the contents of :attr:`~TextDocument.text` may need to be saved manually using the standard Python I/O functions.
+
+        :param fsync: Whether to flush the file to disk before replacing the original file.
         """
         self._check_closed()
 
-        clients = self._workspace.clients
+        start_time = time.perf_counter()
+        metrics = self._workspace.metrics
+        clients = self._get_synced_clients()
 
         will_save_params = WillSaveTextDocumentParams(
             textDocument=self.get_text_document_identifier(), reason=TextDocumentSaveReason.Manual
@@ -783,31 +1282,56 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
             client.send_text_document_will_save(will_save_params)
 
         self.logger.info("Sending textDocument/willSaveWaitUntil requests.")
-        requests = [
-            client.send_text_document_will_save_wait_until(will_save_params)
+        will_save_wait_until_clients = [
+            client
             for client in clients
             if client.check_feature("textDocument/willSaveWaitUntil", text_document=self)
         ]
-        edit_lists: List[Optional[List[TextEdit]]] = await asyncio.gather(*requests)
+        edit_lists: List[Optional[List[TextEdit]]] = await asyncio.gather(
+            *(
+                client.send_text_document_will_save_wait_until(will_save_params)
+                for client in will_save_wait_until_clients
+            )
+        )
 
-        for edit_list in edit_lists:
-            if not edit_list:
-                continue
-            for e in edit_list:
-                self.push_text_edit(e)
+        for client, edit_list in zip(will_save_wait_until_clients, edit_lists):
+            if edit_list:
+                self.edit_many(edit_list, client)
         if len(self._pending_edits) > 0:
             self.commit_edits()
 
+        # The document may be edited while the file is written, so everything
+        # below refers to the text as it was written.
+        text = self.text
+        version = self._version
+
         self.logger.info("Writing text content to file.")
-        with self._path.open("w", encoding=self._encoding) as file:
-            file.write(self._text)
+        write_start_time = time.perf_counter()
+        written = await asyncio.get_running_loop().run_in_executor(
+            None,
+            _write_text_file,
+            self._path,
+            text,
+            self._encoding,
+            self._byte_order_mark,
+            fsync,
+        )
+        metrics.record_duration("save.write", time.perf_counter() - write_start_time)
+        if not written:
+            self.logger.info("File content is already up to date, skipped writing.")
+            metrics.increment("save.skipped_writes")
+
+        if self.is_closed() or self._version != version:
+            self.logger.info("TextDocument changed while saving, it is not marked as saved.")
+            metrics.record_duration("save", time.perf_counter() - start_time)
+            return
 
         self.logger.info("Sending textDocument/didSave notifications.")
         did_save_params = DidSaveTextDocumentParams(
             textDocument=self.get_text_document_identifier()
         )
         did_save_params_include_text = DidSaveTextDocumentParams(
-            textDocument=self.get_text_document_identifier(), text=self._text
+            textDocument=self.get_text_document_identifier(), text=text
         )
         for client in clients:
             if client.check_feature("textDocument/didSave", include_text=True, text_document=self):
@@ -818,7 +1342,76 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
                 client.send_text_document_did_save(did_save_params)
 
         self._content_saved = True
+        metrics.record_duration("save", time.perf_counter() - start_time)
         self.logger.info("TextDocument saved!")
+        self._maybe_release_text()
+
+    def snapshot(self) -> TextDocumentSnapshot:
+        """
+        Returns a :class:`TextDocumentSnapshot` of the current version of this ``TextDocument``.
+        The snapshot shares its contents with the ``TextDocument``, so no text is copied.
+        Calling ``snapshot()`` multiple times for the same version returns the same instance.
+        """
+        if self._snapshot is None:
+            # Getting the rope can bring back the snapshot of released contents.
+            rope = self._get_rope()
+            if self._snapshot is None:
+                self._snapshot = TextDocumentSnapshot(self, rope)
+        return self._snapshot
+
+    def _get_line_index(self) -> _LineIndex:
+        return self.snapshot()._get_line_index()  # type: ignore
+
+    def _get_edit_log(self) -> _EditLog:
+        if self._edit_log is None:
+            self._edit_log = _EditLog(self._version)
+        return self._edit_log
+
+    def map_offset(
+        self,
+        old_version: int,
+        offset: int,
+        new_version: Optional[int] = None,
+        *,
+        bias: Literal["left", "right"] = "left",
+    ) -> int:
+        """
+        Maps an offset into the text of an older version of this ``TextDocument`` to the corresponding
+        offset in a newer version, by following the edits committed in between.
+
+        :param old_version: The version to which ``offset`` refers.
+        :param offset: The offset to map.
+        :param new_version: The version to map the offset to. Defaults to the current :attr:`version`.
+        :param bias: Where to place the offset if text was inserted at its position. With ``"left"``
+            the offset stays before the inserted text, with ``"right"`` it is moved behind it. Offsets
+            inside of replaced text are moved to the start or the end of the new text respectively.
+        :raises ValueError: If the versions are out of order or no longer available. Only the edits of the
+            most recent versions are recorded, and reloading a released document discards them.
+        """
+        if new_version is None:
+            new_version = self._version
+        return self._get_edit_log().map_offset(old_version, offset, new_version, bias == "right")
+
+    def map_range(
+        self, old_version: int, offset_range: Tuple[int, int], new_version: Optional[int] = None
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Maps a range [start offset, end offset) in an older version of this ``TextDocument`` to
+        the corresponding range in a newer version. Text inserted directly before or after the range is
+        not included in the mapped range.
+
+        :param old_version: The version to which ``offset_range`` refers.
+        :param offset_range: The range to map.
+        :param new_version: The version to map the range to. Defaults to the current :attr:`version`.
+        :returns: The mapped range, or ``None`` if the text inside of the range was changed by an edit.
+        :raises ValueError: If the versions are out of order or no longer available. Only the edits of the
+            most recent versions are recorded, and reloading a released document discards them.
+        """
+        if new_version is None:
+            new_version = self._version
+        return self._get_edit_log().map_range(
+            old_version, offset_range[0], offset_range[1], new_version
+        )
 
     def position_to_offset(self, position: Position, client: Optional[Client] = None) -> int:
         """
@@ -831,33 +1424,10 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         """
         self._check_closed()
 
-        if self._version == self._cached_version and position.line == self._cached_line:
-            start_offset = self._cached_start_offset
-            reference_string = self._cached_reference_string
-        else:
-            if position.line >= len(self._line_offsets):
-                raise IndexError(f"Line {position.line} is out of bounds")
-
-            start_offset = self._line_offsets[position.line]
-            end_offset = (
-                self._line_offsets[position.line + 1]
-                if position.line < len(self._line_offsets)
-                else len(self._text)
-            )
-            reference_string = self._text[start_offset:end_offset]
-
-            if position.character >= len(reference_string):
-                raise IndexError(
-                    f"Position at line {position.line} character {position.character} does not exist"
-                )
-
-            self._cached_version = self._version
-            self._cached_line = position.line
-            self._cached_start_offset = start_offset
-            self._cached_reference_string = reference_string
-
         encoding = self._resolve_client_parameter(client).get_position_encoding_kind()
-        return start_offset + _code_units_to_offset(reference_string, position.character, encoding)
+        return self._get_line_index().position_to_offset(
+            position.line, position.character, encoding
+        )
 
     def offset_to_position(self, offset: int, client: Optional[Client] = None) -> Position:
         """
@@ -870,22 +1440,66 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         """
         self._check_closed()
 
-        if offset >= len(self._text):
-            raise IndexError(f"Offset {offset} is out of bounds.")
+        encoding = self._resolve_client_parameter(client).get_position_encoding_kind()
+        line, character = self._get_line_index().offset_to_position(offset, encoding)
+        return Position(line=line, character=character)
 
-        line = bisect_right(self._line_offsets, offset) - 1
+    def positions_to_offsets(
+        self, positions: Sequence[int], client: Optional[Client] = None
+    ) -> "array[int]":
+        """
+        Converts multiple positions into offsets into :attr:`text` at once. This is considerably faster
+        than calling :meth:`position_to_offset()` for each position separately.
+
+        :param positions: A flat sequence of line/character pairs, i.e. ``[line_0, character_0, line_1, character_1, ...]``.
+            This can also be an ``array('i')``. Positions should be sorted by line, since the data
+            for a line is only looked up when the line changes between consecutive positions.
+        :param client: The :class:`Client` for which the positions should be converted.
+            See :meth:`position_to_offset()`.
+        :returns: An ``array('i')`` containing one offset for each position.
+        """
+        self._check_closed()
 
-        start_offset = self._line_offsets[line]
-        end_offset = (
-            self._line_offsets[line + 1] if line < len(self._line_offsets) - 1 else len(self._text)
-        )
-        reference_string = self._text[start_offset:end_offset]
         encoding = self._resolve_client_parameter(client).get_position_encoding_kind()
-        character = _offset_to_code_units(
-            reference_string, offset - self._line_offsets[line], encoding
-        )
+        return self._get_line_index().positions_to_offsets(positions, encoding)
 
-        return Position(line=line, character=character)
+    def offsets_to_positions(
+        self, offsets: Sequence[int], client: Optional[Client] = None
+    ) -> "array[int]":
+        """
+        Converts multiple offsets into :attr:`text` into positions at once. This is the batched
+        version of :meth:`offset_to_position()`.
+
+        :param offsets: A sequence of offsets, preferably sorted in ascending order.
+        :param client: The :class:`Client` for which the offsets should be converted.
+            See :meth:`offset_to_position()`.
+        :returns: A flat ``array('i')`` of line/character pairs, i.e. ``[line_0, character_0, line_1, character_1, ...]``.
+        """
+        self._check_closed()
+
+        encoding = self._resolve_client_parameter(client).get_position_encoding_kind()
+        return self._get_line_index().offsets_to_positions(offsets, encoding)
+
+    def offset_to_byte_offset(self, offset: int) -> int:
+        """
+        Converts an offset into :attr:`text` into an offset into the UTF-8 encoded text. This is useful
+        when exchanging locations with external tools which work on bytes rather than characters.
+
+        :param offset: The offset to convert.
+        """
+        self._check_closed()
+        return self._get_line_index().offset_to_byte_offset(offset)
+
+    def byte_offset_to_offset(self, byte_offset: int) -> int:
+        """
+        Converts an offset into the UTF-8 encoded text into an offset into :attr:`text`.
+        This is the inverse of :meth:`offset_to_byte_offset()`.
+
+        :param byte_offset: The offset to convert. An ``IndexError`` is raised if ``byte_offset``
+            does not point to the start of a character.
+        """
+        self._check_closed()
+        return self._get_line_index().byte_offset_to_offset(byte_offset)
 
     def offset_to_token_index(self, offset: int) -> Optional[int]:
         """
@@ -897,7 +1511,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         :param offset: The offset to convert.
         """
 
-        if offset < 0 or offset >= len(self._text):
+        if offset < 0 or offset >= len(self._get_rope()):
             raise ValueError("offset is out of bounds.")
 
         # Inline bisection because the key parameter for bisect_left is not supported until Python 3.10.
@@ -976,7 +1590,7 @@ class TextDocument(TextDocumentInfo, SemanticTokensMixin):
         # were printed in their entirety, so we use the default
         # object representation instead.
         values = {
-            "text": object.__repr__(self._text),
+            "text": object.__repr__(self._rope) if self._rope is not None else None,
             "uri": self.uri,
             "version": self._version,
             "language_id": self.language_id,
@@ -7,7 +7,14 @@ from urllib.parse import urlsplit
 
 import change_ls._languages as languages
 from change_ls.tokens import Grammar
-from change_ls.types import FileOperationFilter, FileOperationPatternKind, TextDocumentFilter
+from change_ls.types import (
+    FileEvent,
+    FileOperationFilter,
+    FileOperationPatternKind,
+    FileSystemWatcher,
+    RelativePattern,
+    TextDocumentFilter,
+)
 
 
 @dataclass
@@ -94,6 +101,9 @@ def guess_language_id(path: Path) -> Optional[str]:
 
 
 class TextDocumentInfo:
+    # __weakref__ keeps this class and TextDocument weak-referenceable.
+    __slots__ = ("_uri", "_language_id", "__weakref__")
+
     _uri: str
     _language_id: Optional[str]
 
@@ -187,6 +197,41 @@ def matches_file_operation_filter(uri: str, document_filter: FileOperationFilter
     return True
 
 
+def matches_file_system_watcher(file_event: FileEvent, watcher: FileSystemWatcher) -> bool:
+    """
+    Checks whether a `FileEvent` matches the glob pattern and kind of the `FileSystemWatcher`.
+    """
+
+    # WatchKind is a bit set with Create = 1, Change = 2 and Delete = 4,
+    # while FileChangeType uses Created = 1, Changed = 2 and Deleted = 3.
+    kind = watcher.kind.value if watcher.kind is not None else 7
+    if not kind & (1 << (file_event.type.value - 1)):
+        return False
+
+    (_, _, path_raw, _, _) = urlsplit(file_event.uri, scheme="file")
+
+    if isinstance(watcher.globPattern, RelativePattern):
+        base_uri = watcher.globPattern.baseUri
+        if not isinstance(base_uri, str):
+            base_uri = base_uri.uri
+        (_, _, base_path, _, _) = urlsplit(base_uri, scheme="file")
+        base_path = base_path.rstrip("/") + "/"
+        if not path_raw.startswith(base_path):
+            return False
+        path_raw = path_raw[len(base_path) :]
+        lsp_glob = watcher.globPattern.pattern
+    else:
+        lsp_glob = watcher.globPattern
+
+    for glob in _expand_lsp_glob(lsp_glob):
+        if fnmatch(path_raw, glob):
+            return True
+        # fnmatch requires a '/' for '**/', but the LSP glob also matches files without any directory.
+        if glob.startswith("**/") and fnmatch(path_raw, glob[3:]):
+            return True
+    return False
+
+
 def install_language(
     *,
     language_id: str,
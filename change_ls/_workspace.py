@@ -2,19 +2,26 @@ import asyncio
 import os.path
 import uuid
 import warnings
+from array import array
+from contextlib import ExitStack, suppress
 from logging import DEBUG
 from pathlib import Path
 from types import TracebackType
 from typing import (
     Any,
+    AsyncIterator,
+    Awaitable,
     Callable,
     Dict,
+    Iterable,
     List,
     Literal,
     Optional,
     Sequence,
+    Set,
     Tuple,
     Type,
+    TypeVar,
     Union,
     overload,
 )
@@ -29,34 +36,81 @@ from change_ls._client import (
     WorkspaceRequestHandler,
     get_default_initialize_params,
 )
+from change_ls._diagnostics import DiagnosticStore, DocumentDiagnostics
+from change_ls._edit_journal import (
+    _active_journal,
+    _EditJournal,
+    _FileBackup,
+    _Rename,
+)
+from change_ls._file_index import _FileIndex
+from change_ls._metrics import Metrics
+from change_ls._path_cache import _PathCache
+from change_ls._residency import _ResidencyManager
 from change_ls.logging import get_change_ls_default_logger  # type: ignore
 from change_ls.logging import OperationLoggerAdapter, operation
 from change_ls.types import (
+    JSON_VALUE,
     ApplyWorkspaceEditParams,
     ApplyWorkspaceEditResult,
+    ChangeAnnotation,
     ConfigurationParams,
     CreateFile,
     CreateFilesParams,
     DeleteFile,
     DeleteFilesParams,
+    Diagnostic,
+    DidChangeWatchedFilesParams,
     DidOpenTextDocumentParams,
+    DocumentDiagnosticParams,
+    FileChangeType,
     FileCreate,
     FileDelete,
+    FileEvent,
     FileRename,
+    FullDocumentDiagnosticReport,
     InitializeParams,
+    Location,
     LSPAny,
+    OptionalVersionedTextDocumentIdentifier,
+    PreviousResultId,
     PublishDiagnosticsParams,
     RenameFile,
     RenameFilesParams,
+    SymbolInformation,
     TextDocumentEdit,
+    TextDocumentIdentifier,
     TextEdit,
+    UnchangedDocumentDiagnosticReport,
+    WorkspaceDiagnosticParams,
     WorkspaceEdit,
     WorkspaceFolder,
+    WorkspaceSymbol,
     WorkspaceSymbolParams,
 )
+from change_ls.types._util import json_assert_type_array, json_assert_type_object, parse_or_type
 
 ConfigurationProvider = Callable[[Optional[str], Optional[str]], LSPAny]
 
+_FileOperation = TypeVar("_FileOperation", FileCreate, FileRename, FileDelete)
+
+# Number of files read by a single task in Workspace.open_text_documents().
+_READ_CHUNK_SIZE = 16
+
+# Default number of TextDocuments which Workspace.perform_edit_and_save() edits and saves at the same time.
+_EDIT_WINDOW = 32
+
+# Maximum number of paths and URIs for which Workspace._normalize_path_parameter() caches the result.
+_PATH_CACHE_SIZE = 4096
+
+# Default number of workspaceSymbol/resolve requests which Workspace.resolve_symbols() sends at the same time.
+_RESOLVE_WINDOW = 64
+
+
+def _parse_workspace_symbol(value: JSON_VALUE) -> Union[SymbolInformation, WorkspaceSymbol]:
+    obj = json_assert_type_object(value)
+    return parse_or_type(obj, (SymbolInformation.from_json, WorkspaceSymbol.from_json))
+
 
 def _path_is_relative_to(path: Path, root: Path) -> bool:
     try:
@@ -66,6 +120,111 @@ def _path_is_relative_to(path: Path, root: Path) -> bool:
         return False
 
 
+def _remove_tree(path: Path) -> None:
+    """
+    Deletes the directory at ``path`` with all its contents. Symbolic links are deleted, but not followed.
+    The tree is walked iteratively with :func:`os.scandir`, so deep trees do not hit the recursion limit
+    and the file type does not require an extra ``stat()`` call for every file.
+    """
+    # Directories are pushed a second time with visited=True, so they are removed after their contents.
+    stack: List[Tuple[str, bool]] = [(str(path), False)]
+    while stack:
+        directory, visited = stack.pop()
+        if visited:
+            os.rmdir(directory)
+            continue
+        stack.append((directory, True))
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, False))
+                else:
+                    os.unlink(entry.path)
+
+
+def _get_resource_operation_uris(operation: Union[CreateFile, RenameFile, DeleteFile]) -> List[str]:
+    if isinstance(operation, RenameFile):
+        return [operation.oldUri, operation.newUri]
+    return [operation.uri]
+
+
+def _combine_text_document_edits(
+    first: TextDocumentEdit, second: TextDocumentEdit
+) -> TextDocumentEdit:
+    version = first.textDocument.version
+    if version is None:
+        version = second.textDocument.version
+    elif second.textDocument.version is not None and second.textDocument.version != version:
+        raise ChangeLSError(
+            f"Encountered edits for versions {version} and {second.textDocument.version} of {first.textDocument.uri}."
+        )
+    return TextDocumentEdit(
+        textDocument=OptionalVersionedTextDocumentIdentifier(
+            uri=first.textDocument.uri, version=version
+        ),
+        edits=[*first.edits, *second.edits],
+    )
+
+
+def _merge_workspace_edits(edits: Sequence[WorkspaceEdit]) -> WorkspaceEdit:
+    """
+    Combines ``edits``, which were all computed against the same contents, into a single :class:`WorkspaceEdit`.
+    The text edits for the same document are combined into one :class:`TextDocumentEdit`, so they are applied
+    together and must not overlap. Resource operations are performed in the order of ``edits``.
+    """
+    if len(edits) == 1:
+        return edits[0]
+
+    document_changes: List[Union[TextDocumentEdit, CreateFile, RenameFile, DeleteFile]] = []
+    annotations: Dict[str, ChangeAnnotation] = {}
+    # The index of the TextDocumentEdit in document_changes that further edits of each document are added to.
+    combined: Dict[str, int] = {}
+    resource_uris: List[str] = []
+    for edit in edits:
+        changes: Sequence[Union[TextDocumentEdit, CreateFile, RenameFile, DeleteFile]]
+        if edit.documentChanges is not None:
+            changes = edit.documentChanges
+        elif edit.changes is not None:
+            changes = [
+                TextDocumentEdit(
+                    textDocument=OptionalVersionedTextDocumentIdentifier(uri=uri, version=None),
+                    edits=list(text_edits),
+                )
+                for uri, text_edits in edit.changes.items()
+            ]
+        else:
+            changes = []
+
+        edited: Set[str] = set()
+        for change in changes:
+            if not isinstance(change, TextDocumentEdit):
+                resource_uris += _get_resource_operation_uris(change)
+                document_changes.append(change)
+                continue
+
+            uri = change.textDocument.uri
+            # Documents affected by resource operations, or edited more than once by the same server,
+            # have to be edited one after the other.
+            if uri in edited or any(
+                uri == r or uri.startswith(r.rstrip("/") + "/") for r in resource_uris
+            ):
+                combined.pop(uri, None)
+                document_changes.append(change)
+            elif (index := combined.get(uri)) is not None:
+                previous = document_changes[index]
+                assert isinstance(previous, TextDocumentEdit)
+                document_changes[index] = _combine_text_document_edits(previous, change)
+            else:
+                combined[uri] = len(document_changes)
+                document_changes.append(change)
+            edited.add(uri)
+
+        if edit.changeAnnotations is not None:
+            annotations.update(edit.changeAnnotations)
+
+    return WorkspaceEdit(documentChanges=document_changes, changeAnnotations=annotations or None)
+
+
 def _validate_node_type(full_path: Path, expect_directory: Optional[bool]) -> None:
     if expect_directory is not None:
         if expect_directory and not full_path.is_dir():
@@ -124,6 +283,27 @@ class Workspace(WorkspaceRequestHandler):
     _opened_text_documents: Dict[str, "td.TextDocument"]
     _id: uuid.UUID
     _logger: OperationLoggerAdapter
+    _metrics: Metrics
+    _path_cache: _PathCache
+    _residency: _ResidencyManager
+
+    # One index per root, built on first use. See list_files().
+    _file_indexes: Optional[List[_FileIndex]]
+    _file_watcher: Optional["asyncio.Task[None]"]
+
+    # The files affected by the workspace/applyEdit requests which are currently performed or still waiting,
+    # in the order in which they were received. The Event is set once the request is done.
+    _apply_edit_queue: List[Tuple[Set[Path], asyncio.Event]]
+
+    _diagnostics: DiagnosticStore
+
+    # Set and dropped whenever diagnostics are stored. See wait_for_diagnostics().
+    # Created on demand, because on Python < 3.10 an Event is bound to the loop
+    # which is current when it is constructed.
+    _diagnostics_updated: Optional[asyncio.Event]
+
+    # Diagnostics which are pulled again in the background after a workspace/diagnostic/refresh request.
+    _diagnostic_refreshes: Set["asyncio.Task[None]"]
 
     default_encoding: str
 
@@ -144,6 +324,15 @@ class Workspace(WorkspaceRequestHandler):
         self._configuration_provider = None
         self._opened_text_documents = {}
         self._id = uuid.uuid4()
+        self._metrics = Metrics()
+        self._path_cache = _PathCache(_PATH_CACHE_SIZE)
+        self._residency = _ResidencyManager(self._send_did_open_notifications)
+        self._file_indexes = None
+        self._file_watcher = None
+        self._apply_edit_queue = []
+        self._diagnostics = DiagnosticStore()
+        self._diagnostics_updated = None
+        self._diagnostic_refreshes = set()
         self._logger = get_change_ls_default_logger(
             "change-ls.workspace", cls_workspace=str(self._id), cls_text_document=None
         )
@@ -209,15 +398,19 @@ class Workspace(WorkspaceRequestHandler):
     def _register_client(self, client: Client) -> None:
         def send_did_open_notifications() -> None:
             for doc in self._opened_text_documents.values():
+                if not doc._server_open:  # type: ignore
+                    continue
                 if not client.check_feature("textDocument/didOpen", text_documents=[doc]):
                     continue
                 client.send_text_document_did_open(
                     DidOpenTextDocumentParams(textDocument=doc.get_text_document_item())
                 )
+                doc._maybe_release_text()  # type: ignore
 
         def unregister_client() -> None:
             client.set_workspace_request_handler(None)
             del self._clients[self._clients.index(client)]
+            self._diagnostics.remove_client(client)
 
         if client in self._clients:
             raise ChangeLSError(f"Client {client} was already registered with this Workspace")
@@ -231,6 +424,13 @@ class Workspace(WorkspaceRequestHandler):
     def clients(self) -> List[Client]:
         return self._clients
 
+    @property
+    def metrics(self) -> Metrics:
+        """
+        The :class:`Metrics` collected for this ``Workspace``.
+        """
+        return self._metrics
+
     def set_configuration_provider(
         self, configuration_provider: Optional[ConfigurationProvider]
     ) -> None:
@@ -271,22 +471,29 @@ class Workspace(WorkspaceRequestHandler):
         """
         Used to convert the value passed to :meth:`open_text_document` and
         :meth:`rename_text_document` into a tuple with a :class:`pathlib.Path` and a URI.
+        The results are cached until the workspace's own file operations invalidate them.
         """
+        generation = self._path_cache.generation
+        if (cached := self._path_cache.get(path)) is not None:
+            return cached
+
         if isinstance(path, Path):
-            full_path = self._resolve_path_in_workspace(path)
+            path_component = path
         else:
             # This also takes care of string paths
-            (_, _, path_component, _, _) = urlsplit(path, scheme="file")
-            if len(path_component) >= 3 and path_component[2] == ":":
+            (_, _, raw_path, _, _) = urlsplit(path, scheme="file")
+            if len(raw_path) >= 3 and raw_path[2] == ":":
                 # Uris which originate from windows paths have a '/' before the
                 # drive letter and are not recognized as absolute paths. So if we
                 # detect that the first segment is a drive, we remove the leading
                 # '/' so path is actually absolute.
-                path_component = path_component[1:]
-
-            full_path = self._resolve_path_in_workspace(Path(path_component))
+                raw_path = raw_path[1:]
+            path_component = Path(raw_path)
 
+        full_path = self._resolve_path_in_workspace(path_component)
         uri = full_path.as_uri()
+        searched_roots = not path_component.is_absolute() and len(self._roots) > 1
+        self._path_cache.put(path, full_path, uri, searched_roots, generation)
         return (full_path, uri)
 
     @operation
@@ -296,6 +503,8 @@ class Workspace(WorkspaceRequestHandler):
         *,
         encoding: Optional[str] = None,
         language_id: Optional[str] = None,
+        lazy: bool = False,
+        release_text: bool = False,
     ) -> "td.TextDocument":
         """
         Opens a :class:`TextDocument` from this :class:`Workspace`.
@@ -310,24 +519,22 @@ class Workspace(WorkspaceRequestHandler):
             resulting full path points to an existing file. If no file or more than one file is found this way, a ``FileNotFoundError``
             will be raised.
         :param encoding: The character encoding of the document. If ``encoding`` is ``None``, :func:`locale.getencoding()` is used,
-            similar to Python's :func:`open`.
+            similar to Python's :func:`open`. If the file starts with a byte order mark, the encoding indicated by the
+            byte order mark is used instead.
         :param language_id: The language id of the document. If this is not given, it is guessed from the file extension.
+        :param lazy: If ``True``, the file is not read until its contents are actually needed. Note that sending
+            *textDocument/didOpen* notifications requires the contents, so this only defers reading if no
+            :class:`Client` is running. Decoding errors are also deferred until the file is read.
+        :param release_text: If ``True``, the in-memory contents are dropped when they are identical to the file contents
+            after they have been sent to the language servers. The file is read again when the contents are needed.
+            This should only be used if the file is not modified by anything else while the document is open.
         """
 
         full_path, uri = self._normalize_path_parameter(path)
         self.logger.info(f"Opening TextDocument {full_path}...")
 
         if text_document := self._opened_text_documents.get(uri):
-            if encoding is not None and encoding != text_document.encoding:
-                raise ChangeLSError(
-                    f"Textdocument {full_path} was already opened with encoding {text_document.encoding}."
-                )
-            if language_id is not None and language_id != text_document.language_id:
-                raise ChangeLSError(
-                    f"Textdocument {full_path} was already opened with language_id {text_document.language_id}."
-                )
-
-            text_document._reopen()
+            self._reopen_text_document(text_document, full_path, encoding, language_id)
             return text_document
 
         if not full_path.exists():
@@ -336,20 +543,327 @@ class Workspace(WorkspaceRequestHandler):
         if not encoding:
             encoding = self.default_encoding
 
-        text_document = td.TextDocument(full_path, self, language_id, 0, encoding)
+        text_document = td.TextDocument(
+            full_path, self, language_id, 0, encoding, lazy=lazy, release_text=release_text
+        )
+        self._add_text_document(text_document)
+        self.logger.info(
+            f"Opened TextDocument {full_path} with encoding {text_document.encoding} and language id {text_document.language_id}!"
+        )
+        return text_document
 
+    def _reopen_text_document(
+        self,
+        text_document: "td.TextDocument",
+        full_path: Path,
+        encoding: Optional[str],
+        language_id: Optional[str],
+    ) -> None:
+        # The encoding of documents with a byte order mark is given by the byte order mark.
+        if (
+            encoding is not None
+            and encoding != text_document.encoding
+            and not text_document._byte_order_mark  # type: ignore
+        ):
+            raise ChangeLSError(
+                f"Textdocument {full_path} was already opened with encoding {text_document.encoding}."
+            )
+        if language_id is not None and language_id != text_document.language_id:
+            raise ChangeLSError(
+                f"Textdocument {full_path} was already opened with language_id {text_document.language_id}."
+            )
+
+        text_document._reopen()  # type: ignore
+
+    def _add_text_document(self, text_document: "td.TextDocument") -> None:
+        """
+        Adds a newly created :class:`TextDocument` to the opened documents
+        and opens it on the language servers.
+        """
+        self._opened_text_documents[text_document.uri] = text_document
+        self._residency.open(text_document)
+
+    def _send_did_open_notifications(self, text_document: "td.TextDocument") -> int:
+        """
+        Sends *textDocument/didOpen* notifications for ``text_document`` and returns the size of its contents in bytes.
+        """
+        item = text_document.get_text_document_item()
         for client in self._clients:
             if not client.check_feature("textDocument/didOpen", text_documents=[text_document]):
                 continue
-            client.send_text_document_did_open(
-                DidOpenTextDocumentParams(textDocument=text_document.get_text_document_item())
+            client.send_text_document_did_open(DidOpenTextDocumentParams(textDocument=item))
+        text_document._maybe_release_text()  # type: ignore
+        return len(item.text.encode("utf-8", "surrogatepass"))
+
+    def set_residency_limits(
+        self,
+        *,
+        grace_period: float = 0.0,
+        max_documents: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Controls which :class:`TextDocuments <TextDocument>` are kept open on the language servers.
+
+        Language servers keep an analysis of every open document, so opening and closing the same
+        documents repeatedly, or keeping many large documents open, can be expensive. By default,
+        documents are closed on the language servers as soon as they are closed in the ``Workspace``
+        and there is no limit on the number of open documents.
+
+        :param grace_period: The time in seconds by which the *textDocument/didClose* notification for a
+            fully closed ``TextDocument`` is delayed. If the document is opened again during that time,
+            the existing ``TextDocument`` is reused.
+        :param max_documents: The maximum number of documents which are open on the language servers.
+        :param max_bytes: The maximum total size of the documents which are open on the language servers,
+            measured in UTF-8 encoded bytes of the contents at the time they were opened.
+
+        When a limit is exceeded, the least recently used documents are closed on the language servers.
+        They stay open in the ``Workspace`` and are opened on the language servers again when they are used.
+        """
+        if grace_period < 0:
+            raise ValueError("grace_period must not be negative.")
+        if max_documents is not None and max_documents < 1:
+            raise ValueError("max_documents must be at least 1.")
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes must not be negative.")
+        self._residency.grace_period = grace_period
+        self._residency.max_documents = max_documents
+        self._residency.max_bytes = max_bytes
+        self._residency.enforce_limits()
+
+    def _resolve_and_read_text_documents(
+        self, paths: Sequence[Union[Path, str]], encoding: str
+    ) -> List[Tuple[Path, str, Optional[Tuple[str, str, bytes]]]]:
+        # Runs in a worker thread, see open_text_documents().
+        out: List[Tuple[Path, str, Optional[Tuple[str, str, bytes]]]] = []
+        for path in paths:
+            full_path, uri = self._normalize_path_parameter(path)
+            if uri in self._opened_text_documents:
+                out.append((full_path, uri, None))
+                continue
+            if not full_path.exists():
+                raise FileNotFoundError(f"File not found in workspace: '{full_path}'.")
+            out.append((full_path, uri, td._read_text_file(full_path, encoding)))  # type: ignore
+        return out
+
+    @operation
+    async def open_text_documents(
+        self,
+        paths: Iterable[Union[Path, str]],
+        *,
+        encoding: Optional[str] = None,
+        language_id: Optional[str] = None,
+        release_text: bool = False,
+        window: int = 64,
+        wait_for_progress: bool = False,
+    ) -> List["td.TextDocument"]:
+        """
+        Opens multiple :class:`TextDocuments <TextDocument>` at once. This is considerably faster than
+        calling :meth:`open_text_document()` for each path, e.g. when priming the language servers with a whole repository.
+
+        The paths are resolved and the files are read concurrently in a thread pool. The *textDocument/didOpen*
+        notifications are sent in batches of about ``window`` documents, where all notifications of a batch are written
+        to a language server at once. Between two batches, the event loop gets a chance to process the responses of
+        the language servers.
+
+        Like with ``open_text_document()``, each returned ``TextDocument`` needs to be closed.
+        If any of the documents cannot be opened, the documents which were already opened by this call are closed again.
+
+        :param paths: The paths of the documents to open. See the ``path`` parameter of :meth:`open_text_document()`.
+        :param encoding: The character encoding of the documents. See :meth:`open_text_document()`.
+        :param language_id: The language id of the documents. If this is not given, it is guessed for each document from its file extension.
+        :param release_text: See :meth:`open_text_document()`.
+        :param window: The number of documents for which *textDocument/didOpen* notifications are sent at once.
+        :param wait_for_progress: If ``True``, wait after each batch until the language servers have ended their work done progress
+            (see :meth:`Client.wait_for_work_done_progress()`), so that servers which e.g. index the opened documents are not flooded.
+        :returns: The ``TextDocuments`` in the same order as ``paths``.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+
+        paths = list(paths)
+        self.logger.info(f"Opening {len(paths)} TextDocuments...")
+
+        # Each task reads a chunk of files, since the overhead of scheduling
+        # a task per file would outweigh the time spent reading small files.
+        loop = asyncio.get_running_loop()
+        read_encoding = encoding if encoding else self.default_encoding
+        chunk_size = min(window, _READ_CHUNK_SIZE)
+        futures = [
+            loop.run_in_executor(
+                None,
+                self._resolve_and_read_text_documents,
+                paths[chunk_start : chunk_start + chunk_size],
+                read_encoding,
             )
+            for chunk_start in range(0, len(paths), chunk_size)
+        ]
+        chunks_per_window = max(window // chunk_size, 1)
 
-        self._opened_text_documents[uri] = text_document
-        self.logger.info(
-            f"Opened TextDocument {full_path} with encoding {text_document.encoding} and language id {text_document.language_id}!"
-        )
-        return text_document
+        out: List["td.TextDocument"] = []
+        try:
+            for window_start in range(0, len(futures), chunks_per_window):
+                chunks = await asyncio.gather(
+                    *futures[window_start : window_start + chunks_per_window]
+                )
+                with ExitStack() as stack:
+                    for client in self._clients:
+                        stack.enter_context(client.batch_messages())
+                    for full_path, uri, contents in (r for chunk in chunks for r in chunk):
+                        if text_document := self._opened_text_documents.get(uri):
+                            self._reopen_text_document(
+                                text_document, full_path, encoding, language_id
+                            )
+                        else:
+                            text_document = td.TextDocument(
+                                full_path,
+                                self,
+                                language_id,
+                                0,
+                                read_encoding,
+                                lazy=contents is not None,
+                                release_text=release_text,
+                            )
+                            if contents is not None:
+                                text_document._set_loaded_text(*contents)  # type: ignore
+                            self._add_text_document(text_document)
+                        out.append(text_document)
+
+                if wait_for_progress:
+                    await asyncio.gather(
+                        *(client.wait_for_work_done_progress() for client in self._clients)
+                    )
+                else:
+                    await asyncio.sleep(0)
+        except BaseException:
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    # Mark the exceptions of the other reads as retrieved.
+                    future.exception()
+            for text_document in out:
+                text_document.close()
+            raise
+
+        self.logger.info(f"Opened {len(out)} TextDocuments!")
+        return out
+
+    def _get_file_indexes(self) -> List[_FileIndex]:
+        if self._file_indexes is None:
+            file_indexes = [_FileIndex(root) for root in self._roots]
+            for file_index in file_indexes:
+                file_index.refresh()
+            self._file_indexes = file_indexes
+        return self._file_indexes
+
+    def list_files(self) -> List[Path]:
+        """
+        Returns the paths of all files in the workspace roots. Files and directories which are excluded by
+        a ``.gitignore`` file are not listed, and neither are ``.git`` directories. Symbolic links to directories
+        are not followed.
+
+        The listing is cached, so it only reflects changes to the file system after :meth:`refresh_files()` has been called.
+        """
+        return [path for file_index in self._get_file_indexes() for path in file_index]
+
+    @operation
+    async def refresh_files(self) -> List[FileEvent]:
+        """
+        Checks the workspace roots for files which were created, changed or deleted since the last call
+        to ``refresh_files()`` or :meth:`list_files()`. Changes are detected by polling the modification times
+        of the files, so only directories which changed are listed again. Ignored files are not reported, see ``list_files()``.
+
+        The changes are sent to each :class:`Client` in a single *workspace/didChangeWatchedFiles* notification,
+        which only contains the changes matching the file watchers registered by the language server.
+
+        Open :class:`TextDocuments <TextDocument>` whose files changed are reloaded using :meth:`TextDocument.reload()`,
+        so language servers receive the changed parts of the documents in *textDocument/didChange* notifications.
+        Documents with unsaved changes are not reloaded.
+
+        The first call only builds the index of the workspace files and returns no changes.
+
+        :returns: The detected changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._file_indexes is None:
+            self.logger.info("Building file index.")
+            await loop.run_in_executor(None, self._get_file_indexes)
+            return []
+
+        changes: List[Tuple[Path, FileChangeType]] = []
+        for file_index in self._file_indexes:
+            changes += await loop.run_in_executor(None, file_index.refresh)
+        if not changes:
+            return []
+        self.logger.info(f"Detected {len(changes)} changed files.")
+
+        if any(change_type != FileChangeType.Changed for _, change_type in changes):
+            # Files were created or deleted by other programs.
+            self._path_cache.clear()
+        events = [FileEvent(uri=path.as_uri(), type=change_type) for path, change_type in changes]
+        for client in self._clients:
+            client_events = [
+                e
+                for e in events
+                if client.check_feature("workspace/didChangeWatchedFiles", file_changes=[e])
+            ]
+            if client_events:
+                client.send_workspace_did_change_watched_files(
+                    DidChangeWatchedFilesParams(changes=client_events)
+                )
+
+        reloads: List["td.TextDocument"] = []
+        for event in events:
+            text_document = self._opened_text_documents.get(event.uri)
+            if text_document is None or event.type == FileChangeType.Deleted:
+                continue
+            if self._residency.is_idle(text_document):
+                # Nobody uses the document anymore, so it is simpler to close it than to reload it.
+                text_document._final_close()  # type: ignore
+                continue
+            if text_document._pending_edits or not text_document._content_saved:  # type: ignore
+                self.logger.warning(
+                    f"TextDocument {text_document.path} changed on disk, but has unsaved changes. Skipped reloading."
+                )
+                continue
+            reloads.append(text_document)
+        await asyncio.gather(*(text_document.reload() for text_document in reloads))
+
+        return events
+
+    async def _watch_files(self, interval: float) -> None:
+        while True:
+            try:
+                await self.refresh_files()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.logger.exception("Failed to refresh workspace files.")
+            await asyncio.sleep(interval)
+
+    def start_file_watcher(self, interval: float = 1.0) -> None:
+        """
+        Starts a background task, which calls :meth:`refresh_files()` every ``interval`` seconds.
+        The task is stopped by :meth:`stop_file_watcher()` or when the ``Workspace`` is closed.
+
+        :param interval: The time between two checks for changed files in seconds.
+        """
+        if self._file_watcher is not None:
+            raise ChangeLSError("The file watcher is already running.")
+        if interval <= 0:
+            raise ValueError("interval must be greater than 0.")
+        self._file_watcher = asyncio.get_running_loop().create_task(self._watch_files(interval))
+
+    async def stop_file_watcher(self) -> None:
+        """
+        Stops the background task started by :meth:`start_file_watcher()`.
+        """
+        if self._file_watcher is None:
+            return
+        file_watcher = self._file_watcher
+        self._file_watcher = None
+        file_watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await file_watcher
 
     async def __aenter__(self) -> "Workspace":
         return self
@@ -357,6 +871,12 @@ class Workspace(WorkspaceRequestHandler):
     async def __aexit__(
         self, exc_type: Type[Exception], exc_value: Exception, traceback: TracebackType
     ) -> bool:
+        await self.stop_file_watcher()
+        for task in list(self._diagnostic_refreshes):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
         for doc in list(reversed(self._opened_text_documents.values())):
             doc._final_close()  # type: ignore
         self._opened_text_documents = {}
@@ -397,21 +917,76 @@ class Workspace(WorkspaceRequestHandler):
                     f"Edits cannot be applied, because TextDocument {doc.path} has uncommitted edits."
                 )
 
+            if (journal := _active_journal.get()) is not None:
+                journal.backup_file(doc.path)
+
             for edit in edits:
                 doc.push_text_edit(edit)
             doc.commit_edits()
             await doc.save()
 
+    async def _perform_independent_text_document_edits(
+        self, edits: List[Tuple[str, List[TextEdit], Optional[int]]], window: int
+    ) -> None:
+        """
+        Performs the edits for different documents concurrently, with at most ``window`` documents
+        being edited and saved at the same time. Edits for the same document are performed in order.
+        """
+        edits_by_document: Dict[Path, List[Tuple[str, List[TextEdit], Optional[int]]]] = {}
+        for uri, text_edits, version in edits:
+            full_path, _ = self._normalize_path_parameter(uri)
+            edits_by_document.setdefault(full_path, []).append((uri, text_edits, version))
+
+        semaphore = asyncio.Semaphore(window)
+        failed = False
+
+        async def perform_document_edits(
+            document_edits: List[Tuple[str, List[TextEdit], Optional[int]]]
+        ) -> None:
+            nonlocal failed
+            async with semaphore:
+                # Like with sequential application, nothing new is started after an error.
+                if failed:
+                    return
+                try:
+                    for uri, text_edits, version in document_edits:
+                        await self._perform_text_document_edits(uri, text_edits, version)
+                except BaseException:
+                    failed = True
+                    raise
+
+        self.logger.info(f"Editing {len(edits_by_document)} TextDocuments concurrently.")
+        results = await asyncio.gather(
+            *(perform_document_edits(e) for e in edits_by_document.values()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
     async def _perform_document_changes_and_save(
-        self, document_changes: List[Union[TextDocumentEdit, CreateFile, RenameFile, DeleteFile]]
+        self,
+        document_changes: List[Union[TextDocumentEdit, CreateFile, RenameFile, DeleteFile]],
+        window: int,
     ) -> None:
         self.logger.info("Using WorkspaceEdit.documentChanges.")
+
+        # Text edits between two resource operations are independent of each other, unless they edit
+        # the same document. Resource operations are performed in order, after all preceding text edits,
+        # since they can affect any document, e.g. through workspace/willRenameFiles.
+        text_document_edits: List[Tuple[str, List[TextEdit], Optional[int]]] = []
         for action in document_changes:
             if isinstance(action, TextDocumentEdit):
-                await self._perform_text_document_edits(
-                    action.textDocument.uri, action.edits, action.textDocument.version
+                text_document_edits.append(
+                    (action.textDocument.uri, action.edits, action.textDocument.version)
                 )
-            elif isinstance(action, CreateFile):
+                continue
+
+            if text_document_edits:
+                await self._perform_independent_text_document_edits(text_document_edits, window)
+                text_document_edits = []
+
+            if isinstance(action, CreateFile):
                 overwrite = bool(action.options and action.options.overwrite)
                 ignore_if_exists = bool(action.options and action.options.ignoreIfExists)
                 await self._handle_create_file(action.uri, overwrite, ignore_if_exists)
@@ -429,11 +1004,136 @@ class Workspace(WorkspaceRequestHandler):
                 ignore_if_not_exists = bool(action.options and action.options.ignoreIfNotExists)
                 await self._handle_delete_file(action.uri, recursive, ignore_if_not_exists)
 
+        if text_document_edits:
+            await self._perform_independent_text_document_edits(text_document_edits, window)
+
+    def _validate_text_document_edit(
+        self, uri: str, version: Optional[int], edited: Set[Path], resources: List[Path]
+    ) -> None:
+        full_path, uri = self._normalize_path_parameter(uri)
+        # Documents which were edited before, or which are affected by earlier resource operations,
+        # can only be checked when the edit is actually performed.
+        if full_path in edited or any(_path_is_relative_to(full_path, r) for r in resources):
+            return
+        edited.add(full_path)
+
+        if text_document := self._opened_text_documents.get(uri):
+            if len(text_document._pending_edits) > 0:  # type: ignore
+                raise ChangeLSError(
+                    f"Edits cannot be applied, because TextDocument {full_path} has uncommitted edits."
+                )
+            if not text_document._content_saved:  # type: ignore
+                raise ChangeLSError(
+                    f"Edits cannot be applied transactionally, because TextDocument {full_path} has unsaved changes."
+                )
+            current_version = text_document.version
+        elif full_path.is_file():
+            # Documents are opened with version 0.
+            current_version = 0
+        else:
+            raise FileNotFoundError(f"File not found in workspace: '{full_path}'.")
+
+        if version is not None and version != current_version:
+            raise ChangeLSError(
+                f"Encountered edits for version {version} of {full_path}, but the current version is {current_version}."
+            )
+        # Saving replaces the file, so the directory needs to be writable as well.
+        if not os.access(full_path, os.W_OK) or not os.access(full_path.parent, os.W_OK):
+            raise PermissionError(f"File '{full_path}' is not writable.")
+
+    def _validate_edit(self, edit: WorkspaceEdit) -> None:
+        """
+        Checks everything about a :class:`WorkspaceEdit` that can be checked without performing it.
+        """
+        edited: Set[Path] = set()
+        resources: List[Path] = []
+        if edit.documentChanges:
+            for action in edit.documentChanges:
+                if isinstance(action, TextDocumentEdit):
+                    self._validate_text_document_edit(
+                        action.textDocument.uri, action.textDocument.version, edited, resources
+                    )
+                elif isinstance(action, RenameFile):
+                    resources.append(self._normalize_path_parameter(action.oldUri)[0])
+                    resources.append(self._normalize_path_parameter(action.newUri)[0])
+                else:
+                    resources.append(self._normalize_path_parameter(action.uri)[0])
+        elif edit.changes:
+            for uri in edit.changes:
+                self._validate_text_document_edit(uri, None, edited, resources)
+
+    async def _rollback_edit(self, journal: _EditJournal) -> None:
+        """
+        Restores the files recorded in ``journal`` and brings the open :class:`TextDocuments <TextDocument>`
+        and the language servers back in sync with them.
+        """
+        self._path_cache.clear()
+        reloads: List["td.TextDocument"] = []
+        for entry in reversed(journal.entries):
+            if isinstance(entry, _Rename):
+                # The journal entry is written before renaming, so the rename might not have happened.
+                if not entry.destination.exists() or entry.source.exists():
+                    continue
+                if entry.destination.is_dir():
+                    self._transfer_text_documents_recursive(entry.destination, entry.source)
+                elif doc := self._opened_text_documents.get(entry.destination.as_uri()):
+                    doc._set_path(entry.source)  # type: ignore
+                entry.destination.rename(entry.source)
+                self._send_did_rename_notifications(
+                    [(entry.destination.as_uri(), entry.source.as_uri())]
+                )
+            elif isinstance(entry, _FileBackup):
+                uri = entry.path.as_uri()
+                exists = entry.path.exists()
+                doc = self._opened_text_documents.get(uri)
+                if entry.data is None:
+                    if not exists:
+                        continue
+                    if doc:
+                        doc._final_close()  # type: ignore
+                    entry.path.unlink()
+                    self._send_did_delete_file_notifications([uri])
+                else:
+                    if not exists or entry.path.read_bytes() != entry.data:
+                        entry.path.parent.mkdir(parents=True, exist_ok=True)
+                        entry.path.write_bytes(entry.data)
+                    if not exists:
+                        self._send_did_create_file_notifications([uri])
+                    if doc and doc not in reloads:
+                        reloads.append(doc)
+            elif entry.existed:
+                entry.path.mkdir(parents=True, exist_ok=True)
+            else:
+                with suppress(OSError):
+                    entry.path.rmdir()
+
+        # Reloading only sends the differences to the language servers, instead of reopening the documents.
+        for doc in reloads:
+            if self._residency.is_idle(doc):
+                doc._final_close()  # type: ignore
+            if doc.is_closed():
+                continue
+            # The restored files take precedence over any edits left behind by the failed edit.
+            doc._pending_edits = []  # type: ignore
+            doc._content_saved = True  # type: ignore
+            await doc.reload()
+
+    async def _perform_edit(self, edit: WorkspaceEdit, window: int) -> None:
+        if edit.documentChanges:
+            await self._perform_document_changes_and_save(edit.documentChanges, window)
+        elif edit.changes:
+            self.logger.info("Using WorkspaceEdit.changes.")
+            await self._perform_independent_text_document_edits(
+                [(uri, edits, None) for uri, edits in edit.changes.items()], window
+            )
+
     @operation(
         start_message="Performing WorkspaceEdit...",
         get_logger_from_context=_get_logger_from_context,
     )
-    async def perform_edit_and_save(self, edit: WorkspaceEdit) -> None:
+    async def perform_edit_and_save(
+        self, edit: WorkspaceEdit, *, window: int = _EDIT_WINDOW, transactional: bool = False
+    ) -> None:
         """
         Perform the edits described by the given :class:`WorkspaceEdit` and save the affected
         :class:`TextDocuments <TextDocument>`.
@@ -444,8 +1144,27 @@ class Workspace(WorkspaceRequestHandler):
         (see :meth:`TextDocument.save()`). ``TextDocuments`` must not have any uncommitted edits when this method is
         called.
 
+        Edits for different documents are independent of each other, so they are performed and saved concurrently.
+        Edits for the same document and resource operations (creating, renaming and deleting files) are still performed
+        in the order given by the ``WorkspaceEdit``, so the result is the same as performing all changes one after the other.
+        If an edit fails, no further edits are started, but edits of other documents which are already in progress
+        are completed before the error is raised.
+
+        If ``transactional`` is ``True``, the ``WorkspaceEdit`` is performed entirely or not at all. Before anything
+        is changed, the versions of all edited documents are checked, as well as whether their files exist and are writable.
+        While the changes are performed, the original contents of every file which is written, created, renamed or deleted
+        are recorded, including changes made by language servers in response to the ``WorkspaceEdit``
+        (e.g. *workspace/willRenameFiles*). If any change fails, all files are restored and the open ``TextDocuments`` are
+        reloaded, so that language servers only receive the reverted parts in *textDocument/didChange* notifications.
+        ``TextDocuments`` which were closed because their file was deleted stay closed. The original error is re-raised afterwards.
+
         :param edit: The :class:`WorkspaceEdit` to perform.
+        :param window: The maximum number of documents which are edited and saved at the same time.
+        :param transactional: Whether to roll back all changes if the ``WorkspaceEdit`` cannot be performed completely.
+            Documents edited in a transaction must not have unsaved changes.
         """
+        if window < 1:
+            raise ValueError("window must be at least 1.")
         if edit.changes is not None and edit.documentChanges is not None:
             raise ChangeLSError(
                 "Only one of WorkspaceEdit.changes and WorkspaceEdit.documentChanges may be set."
@@ -454,30 +1173,74 @@ class Workspace(WorkspaceRequestHandler):
         if self._logger.getEffectiveLevel() <= DEBUG:
             self._logger.debug("WorkspaceEdit: %s", str(edit.to_json()))
 
-        if edit.documentChanges:
-            await self._perform_document_changes_and_save(edit.documentChanges)
-        elif edit.changes:
-            self.logger.info("Using WorkspaceEdit.changes.")
-            for path, edits in edit.changes.items():
-                await self._perform_text_document_edits(path, edits)
+        # Edits performed during a transaction, e.g. in response to workspace/willRenameFiles,
+        # are recorded in the journal of that transaction.
+        if not transactional or _active_journal.get() is not None:
+            await self._perform_edit(edit, window)
+            self.logger.info("Performed WorkspaceEdit!")
+            return
+
+        self._validate_edit(edit)
+        journal = _EditJournal()
+        token = _active_journal.set(journal)
+        try:
+            await self._perform_edit(edit, window)
+        except BaseException:
+            _active_journal.reset(token)
+            self.logger.warning(
+                f"WorkspaceEdit failed, rolling back {len(journal.entries)} changes."
+            )
+            try:
+                await self._rollback_edit(journal)
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.logger.exception("Rolling back the WorkspaceEdit failed.")
+            raise
+        _active_journal.reset(token)
 
         self.logger.info("Performed WorkspaceEdit!")
 
-    async def _send_will_create_file_requests(self, uri: str) -> None:
-        params = CreateFilesParams(files=[FileCreate(uri=uri)])
+    def _get_file_operations_by_client(
+        self, method: str, files: Sequence[_FileOperation], uris: Sequence[str]
+    ) -> List[Tuple[Client, List[_FileOperation]]]:
+        """
+        Returns the ``files`` for which each ``Client`` wants to receive ``method``, leaving out clients without any.
+        ``uris`` contains the URI of each file, which is matched against the file operation filters of the clients.
+        """
+        out: List[Tuple[Client, List[_FileOperation]]] = []
         for client in self.clients:
-            if not client.check_feature("workspace/willCreateFiles", file_operations=[uri]):
-                continue
-            edit = await client.send_workspace_will_create_files(params)
-            if edit:
-                await self.perform_edit_and_save(edit)
+            matching = [
+                file
+                for file, uri in zip(files, uris)
+                if client.check_feature(method, file_operations=[uri])
+            ]
+            if matching:
+                out.append((client, matching))
+        return out
+
+    async def _perform_will_edits(
+        self, requests: Sequence[Awaitable[Optional[WorkspaceEdit]]]
+    ) -> None:
+        # The requests are sent to all clients at once, so all edits refer to the current contents and
+        # have to be applied together.
+        edits = [edit for edit in await asyncio.gather(*requests) if edit]
+        if edits:
+            await self.perform_edit_and_save(_merge_workspace_edits(edits))
+
+    async def _send_will_create_file_requests(self, uris: Sequence[str]) -> None:
+        files = [FileCreate(uri=uri) for uri in uris]
+        by_client = self._get_file_operations_by_client("workspace/willCreateFiles", files, uris)
+        await self._perform_will_edits(
+            [
+                client.send_workspace_will_create_files(CreateFilesParams(files=matching))
+                for client, matching in by_client
+            ]
+        )
 
-    def _send_did_create_file_notifications(self, uri: str) -> None:
-        params = CreateFilesParams(files=[FileCreate(uri=uri)])
-        for client in self.clients:
-            if not client.check_feature("workspace/didCreateFiles", file_operations=[uri]):
-                continue
-            client.send_workspace_did_create_files(params)
+    def _send_did_create_file_notifications(self, uris: Sequence[str]) -> None:
+        files = [FileCreate(uri=uri) for uri in uris]
+        by_client = self._get_file_operations_by_client("workspace/didCreateFiles", files, uris)
+        for client, matching in by_client:
+            client.send_workspace_did_create_files(CreateFilesParams(files=matching))
 
     @operation(
         name="create_node",
@@ -487,34 +1250,55 @@ class Workspace(WorkspaceRequestHandler):
     async def _handle_create_file(
         self, path: Union[Path, str], overwrite: bool, ignore_if_exists: bool
     ) -> None:
-        full_path, uri = self._normalize_path_parameter(path)
+        target = self._validate_create_file(path, overwrite, ignore_if_exists)
+        if target is None:
+            return
+        full_path, uri = target
+
+        await self._send_will_create_file_requests([uri])
+        await self._create_file(full_path, uri, overwrite)
+        self._send_did_create_file_notifications([uri])
+        self.logger.info(f"File '{full_path}' is ready!")
 
+    def _validate_create_file(
+        self, path: Union[Path, str], overwrite: bool, ignore_if_exists: bool
+    ) -> Optional[Tuple[Path, str]]:
+        """
+        Returns the path and URI of the file to create, or ``None`` if nothing should be created.
+        """
+        full_path, _ = self._normalize_path_parameter(path)
         if full_path.exists() and not overwrite:
             if ignore_if_exists:
                 self.logger.info(f"File '{full_path}' already exists, no new file was created!")
-                return
+                return None
             else:
                 raise FileExistsError(f"File '{full_path}' already exists.")
+        return full_path, full_path.as_uri()
 
-        uri = full_path.as_uri()
+    async def _create_file(self, full_path: Path, uri: str, overwrite: bool) -> None:
         text_document = self._opened_text_documents.get(uri)
+        if text_document and self._residency.is_idle(text_document):
+            text_document._final_close()  # type: ignore
+            text_document = None
 
-        await self._send_will_create_file_requests(uri)
-
+        journal = _active_journal.get()
         if overwrite and text_document:
             self.logger.info(f"File '{full_path}' already exists, deleting content.")
+            if journal is not None:
+                journal.backup_file(full_path)
             text_document.delete(0, len(text_document.text))
             text_document.commit_edits()
             await text_document.save()
         else:
             self.logger.info(f"File '{full_path}' does not exist, creating new file.")
+            self._path_cache.invalidate(full_path)
+            if journal is not None:
+                journal.backup_missing_directories(full_path.parent)
+                journal.backup_file(full_path)
             full_path.parent.mkdir(parents=True, exist_ok=True)
             full_path.unlink(missing_ok=True)
             full_path.touch(exist_ok=False)
 
-        self._send_did_create_file_notifications(uri)
-        self.logger.info(f"File '{full_path}' is ready!")
-
     async def create_text_document(
         self,
         path: Union[Path, str],
@@ -542,48 +1326,46 @@ class Workspace(WorkspaceRequestHandler):
         await self._handle_create_file(path, overwrite, ignore_if_exists)
         return self.open_text_document(path, encoding=encoding, language_id=language_id)
 
-    async def _send_will_rename_requests(self, source_uri: str, destination_uri: str) -> None:
-        params = RenameFilesParams(files=[FileRename(oldUri=source_uri, newUri=destination_uri)])
-        for client in self.clients:
-            if not client.check_feature("workspace/willRenameFiles", file_operations=[source_uri]):
-                continue
-            edit = await client.send_workspace_will_rename_files(params)
-            if edit:
-                await self.perform_edit_and_save(edit)
+    async def _send_will_rename_requests(self, renames: Sequence[Tuple[str, str]]) -> None:
+        files = [FileRename(oldUri=source, newUri=destination) for source, destination in renames]
+        uris = [source for source, _ in renames]
+        by_client = self._get_file_operations_by_client("workspace/willRenameFiles", files, uris)
+        await self._perform_will_edits(
+            [
+                client.send_workspace_will_rename_files(RenameFilesParams(files=matching))
+                for client, matching in by_client
+            ]
+        )
 
-    def _send_did_rename_notifications(self, source_uri: str, destination_uri: str) -> None:
-        params = RenameFilesParams(files=[FileRename(oldUri=source_uri, newUri=destination_uri)])
-        for client in self.clients:
-            if not client.check_feature("workspace/didRenameFiles", file_operations=[source_uri]):
-                continue
-            client.send_workspace_did_rename_files(params)
+    def _send_did_rename_notifications(self, renames: Sequence[Tuple[str, str]]) -> None:
+        files = [FileRename(oldUri=source, newUri=destination) for source, destination in renames]
+        uris = [source for source, _ in renames]
+        by_client = self._get_file_operations_by_client("workspace/didRenameFiles", files, uris)
+        for client, matching in by_client:
+            client.send_workspace_did_rename_files(RenameFilesParams(files=matching))
+
+    def _get_text_documents_below(self, path: Path) -> List["td.TextDocument"]:
+        # Usually far fewer documents are open than there are files in the directory, so this
+        # is cheaper than walking the directory.
+        return [
+            doc
+            for doc in self._opened_text_documents.values()
+            if _path_is_relative_to(doc.path, path)
+        ]
 
     def _delete_directory_recursive(self, path: Path) -> None:
         if not path.exists():
             return
-        for item in path.iterdir():
-            if item.is_dir():
-                self._delete_directory_recursive(item)
-            elif item.is_symlink():
-                item.unlink()
-            else:
-                uri = item.as_uri()
-                document = self._opened_text_documents.get(uri)
-                if document:
-                    document._final_close()  # type: ignore
-                item.unlink()
-        path.rmdir()
+        for doc in self._get_text_documents_below(path):
+            doc._final_close()  # type: ignore
+        _remove_tree(path)
 
     def _transfer_text_documents_recursive(self, path_source: Path, path_destination: Path) -> None:
         assert path_source.is_absolute()
         assert path_destination.is_absolute()
 
-        for source_item in path_source.iterdir():
-            destination_item = path_destination / source_item.relative_to(path_source)
-            if source_item.is_dir():
-                self._transfer_text_documents_recursive(source_item, destination_item)
-            elif doc := self._opened_text_documents.get(source_item.as_uri()):
-                doc._set_path(destination_item)  # type: ignore
+        for doc in self._get_text_documents_below(path_source):
+            doc._set_path(path_destination / doc.path.relative_to(path_source))  # type: ignore
 
     @operation(
         name="rename_node",
@@ -599,36 +1381,65 @@ class Workspace(WorkspaceRequestHandler):
         ignore_if_exists: bool = False,
         expect_directory: Optional[bool] = None,
     ) -> None:
-        path_source, uri_source = self._normalize_path_parameter(source)
-        path_destination, uri_destination = self._normalize_path_parameter(destination)
+        target = self._validate_rename(
+            source, destination, overwrite, ignore_if_exists, expect_directory
+        )
+        if target is None:
+            return
+        path_source, path_destination = target
+        uri_source, uri_destination = path_source.as_uri(), path_destination.as_uri()
+
+        await self._send_will_rename_requests([(uri_source, uri_destination)])
+        self._rename_node(path_source, path_destination)
+        self._send_did_rename_notifications([(uri_source, uri_destination)])
+        self.logger.info(f"Renamed file '{path_source}' to '{path_destination}'!")
+
+    def _validate_rename(
+        self,
+        source: Union[Path, str],
+        destination: Union[Path, str],
+        overwrite: bool,
+        ignore_if_exists: bool,
+        expect_directory: Optional[bool],
+    ) -> Optional[Tuple[Path, Path]]:
+        """
+        Returns the full source and destination paths, or ``None`` if nothing should be renamed.
+        """
+        path_source, _ = self._normalize_path_parameter(source)
+        path_destination, _ = self._normalize_path_parameter(destination)
 
         if path_source == path_destination:
             self.logger.info("Source and destination are the same.")
-            return
+            return None
 
         if path_destination.exists() and ignore_if_exists:
             self.logger.info(f"Destination '{path_destination}' already exists.")
-            return
+            return None
 
         _validate_rename_args(path_source, path_destination, overwrite, expect_directory)
+        return path_source, path_destination
+
+    def _rename_node(self, path_source: Path, path_destination: Path) -> None:
+        self._path_cache.invalidate(path_source)
+        self._path_cache.invalidate(path_destination)
 
-        await self._send_will_rename_requests(uri_source, uri_destination)
+        if (journal := _active_journal.get()) is not None:
+            if path_destination.exists():
+                journal.backup_tree(path_destination)
+            journal.record_rename(path_source, path_destination)
 
         if path_source.is_dir():
             self._delete_directory_recursive(path_destination)
             self._transfer_text_documents_recursive(path_source, path_destination)
         else:
-            if doc := self._opened_text_documents.get(uri_destination):
+            if doc := self._opened_text_documents.get(path_destination.as_uri()):
                 doc._final_close()  # type: ignore
             path_destination.unlink(missing_ok=True)
-            if doc := self._opened_text_documents.get(uri_source):
+            if doc := self._opened_text_documents.get(path_source.as_uri()):
                 doc._set_path(path_destination)  # type: ignore
 
         path_source.rename(path_destination)
 
-        self._send_did_rename_notifications(uri_source, uri_destination)
-        self.logger.info(f"Renamed file '{path_source}' to '{path_destination}'!")
-
     async def rename_text_document(
         self,
         source: Union[Path, str],
@@ -685,21 +1496,21 @@ class Workspace(WorkspaceRequestHandler):
             expect_directory=True,
         )
 
-    async def _send_will_delete_file_requests(self, uri: str) -> None:
-        params = DeleteFilesParams(files=[FileDelete(uri=uri)])
-        for client in self.clients:
-            if not client.check_feature("workspace/willDeleteFiles", file_operations=[uri]):
-                continue
-            edit = await client.send_workspace_will_delete_files(params)
-            if edit:
-                await self.perform_edit_and_save(edit)
+    async def _send_will_delete_file_requests(self, uris: Sequence[str]) -> None:
+        files = [FileDelete(uri=uri) for uri in uris]
+        by_client = self._get_file_operations_by_client("workspace/willDeleteFiles", files, uris)
+        await self._perform_will_edits(
+            [
+                client.send_workspace_will_delete_files(DeleteFilesParams(files=matching))
+                for client, matching in by_client
+            ]
+        )
 
-    def _send_did_delete_file_notifications(self, uri: str) -> None:
-        params = DeleteFilesParams(files=[FileDelete(uri=uri)])
-        for client in self.clients:
-            if not client.check_feature("workspace/didCreateFiles", file_operations=[uri]):
-                continue
-            client.send_workspace_did_delete_files(params)
+    def _send_did_delete_file_notifications(self, uris: Sequence[str]) -> None:
+        files = [FileDelete(uri=uri) for uri in uris]
+        by_client = self._get_file_operations_by_client("workspace/didDeleteFiles", files, uris)
+        for client, matching in by_client:
+            client.send_workspace_did_delete_files(DeleteFilesParams(files=matching))
 
     @operation(
         name="delete_node",
@@ -714,41 +1525,59 @@ class Workspace(WorkspaceRequestHandler):
         *,
         expect_directory: Optional[bool] = None,
     ) -> None:
-        full_path, uri = self._normalize_path_parameter(path)
+        full_path = self._validate_delete(path, recursive, ignore_if_not_exists, expect_directory)
+        if full_path is None:
+            return
+        uri = full_path.as_uri()
+
+        # workspace/willDeleteFiles is sent before the document
+        # is closed. Maybe change this at some point?
+        await self._send_will_delete_file_requests([uri])
+        self._delete_node(full_path)
+        self._send_did_delete_file_notifications([uri])
+        self.logger.info(f"Deleted '{full_path}'!")
+
+    def _validate_delete(
+        self,
+        path: Union[Path, str],
+        recursive: bool,
+        ignore_if_not_exists: bool,
+        expect_directory: Optional[bool],
+    ) -> Optional[Path]:
+        """
+        Returns the full path to delete, or ``None`` if nothing should be deleted.
+        """
+        full_path, _ = self._normalize_path_parameter(path)
 
         if not full_path.exists():
             if ignore_if_not_exists:
-                return
+                return None
             else:
                 raise FileNotFoundError(f"File not found: '{full_path}'.")
 
         _validate_node_type(full_path, expect_directory)
 
-        is_directory = full_path.is_dir()
-
-        if is_directory and not recursive:
+        if full_path.is_dir() and not recursive:
             try:
                 next(full_path.iterdir())
                 raise FileExistsError(f"Directory '{full_path}' is not empty.")
             except StopIteration:
                 pass
+        return full_path
 
-        # workspace/willDeleteFiles is sent before the document
-        # is closed. Maybe change this at some point?
-        await self._send_will_delete_file_requests(uri)
-
-        if is_directory:
+    def _delete_node(self, full_path: Path) -> None:
+        self._path_cache.invalidate(full_path)
+        if (journal := _active_journal.get()) is not None:
+            journal.backup_tree(full_path)
+        if full_path.is_dir():
             self.logger.info(f"Deleting directory '{full_path}'.")
             self._delete_directory_recursive(full_path)
         else:
-            doc = self._opened_text_documents.get(uri)
+            doc = self._opened_text_documents.get(full_path.as_uri())
             if doc:
                 doc._final_close()  # type: ignore
             full_path.unlink()
 
-        self._send_did_delete_file_notifications(uri)
-        self.logger.info(f"Deleted '{full_path}'!")
-
     async def delete_text_document(
         self, path: Union[Path, str], *, ignore_if_not_exists: bool = False
     ) -> None:
@@ -777,6 +1606,143 @@ class Workspace(WorkspaceRequestHandler):
         """
         await self._handle_delete_file(path, recursive, ignore_if_not_exists, expect_directory=True)
 
+    @operation(
+        start_message="Creating files...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def create_files(
+        self,
+        paths: Iterable[Union[Path, str]],
+        *,
+        overwrite: bool = False,
+        ignore_if_exists: bool = False,
+    ) -> None:
+        """
+        Creates multiple empty files at once. Any required directories which do not already exist will be created as well.
+
+        All paths are checked before any file is created. Each :class:`Client` receives a single *workspace/willCreateFiles*
+        request and a single *workspace/didCreateFiles* notification for all files, and the :class:`WorkspaceEdits <WorkspaceEdit>`
+        returned by the language servers are performed together.
+
+        :param paths: The paths of the files which should be created. Each path can either be a :class:`pathlib.Path`,
+            or an ``str`` path or uri.
+        :param overwrite: Whether to clear the contents of existing files. If both ``overwrite`` and ``ignore_if_exists``
+            are given, ``overwrite`` takes priority.
+        :param ignore_if_exists: Whether existing files should be left as they are. If neither ``overwrite`` nor
+            ``ignore_if_exists`` are ``True`` and one of the files already exists, a :class:`FileExistsError` is raised.
+        """
+        targets: Dict[Path, str] = {}
+        for path in paths:
+            if (
+                target := self._validate_create_file(path, overwrite, ignore_if_exists)
+            ) is not None:
+                targets[target[0]] = target[1]
+        if not targets:
+            return
+
+        uris = list(targets.values())
+        await self._send_will_create_file_requests(uris)
+        for full_path, uri in targets.items():
+            await self._create_file(full_path, uri, overwrite)
+        self._send_did_create_file_notifications(uris)
+        self.logger.info(f"Created {len(uris)} files!")
+
+    @operation(
+        start_message="Renaming files...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def rename_files(
+        self,
+        renames: Iterable[Tuple[Union[Path, str], Union[Path, str]]],
+        *,
+        overwrite: bool = False,
+        ignore_if_exists: bool = False,
+    ) -> None:
+        """
+        Renames multiple files or directories at once.
+
+        All renames are checked before anything is renamed. Each :class:`Client` receives a single *workspace/willRenameFiles*
+        request and a single *workspace/didRenameFiles* notification for all renames, and the :class:`WorkspaceEdits <WorkspaceEdit>`
+        returned by the language servers are performed together. The renames must be independent of each other, so a path
+        may not appear in more than one rename and may not be below another renamed path, otherwise a :class:`ValueError` is raised.
+
+        :param renames: Pairs of source and destination paths. Each path can either be a :class:`pathlib.Path`,
+            or an ``str`` path or uri. If a source does not exist, a :class:`FileNotFoundError` is raised.
+        :param overwrite: Existing destinations should be overwritten. If both ``overwrite`` and ``ignore_if_exists``
+            are given, ``overwrite`` takes priority.
+        :param ignore_if_exists: Renames with an existing destination should be skipped. If neither ``overwrite`` nor
+            ``ignore_if_exists`` are ``True`` and one of the destinations already exists, a :class:`FileExistsError` is raised.
+        """
+        targets: List[Tuple[Path, Path]] = []
+        seen: Set[Path] = set()
+        ancestors: Set[Path] = set()
+        for source, destination in renames:
+            target = self._validate_rename(source, destination, overwrite, ignore_if_exists, None)
+            if target is None:
+                continue
+            for full_path in target:
+                if (
+                    full_path in seen
+                    or full_path in ancestors
+                    or any(parent in seen for parent in full_path.parents)
+                ):
+                    raise ValueError(f"'{full_path}' is affected by more than one rename.")
+            for full_path in target:
+                seen.add(full_path)
+                ancestors.update(full_path.parents)
+            targets.append(target)
+        if not targets:
+            return
+
+        uris = [(source.as_uri(), destination.as_uri()) for source, destination in targets]
+        await self._send_will_rename_requests(uris)
+        for path_source, path_destination in targets:
+            self._rename_node(path_source, path_destination)
+        self._send_did_rename_notifications(uris)
+        self.logger.info(f"Renamed {len(targets)} files!")
+
+    @operation(
+        start_message="Deleting files...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def delete_files(
+        self,
+        paths: Iterable[Union[Path, str]],
+        *,
+        recursive: bool = False,
+        ignore_if_not_exists: bool = False,
+    ) -> None:
+        """
+        Deletes multiple files or directories at once. Any opened :class:`TextDocuments <TextDocument>` which are deleted
+        will be closed.
+
+        All paths are checked before anything is deleted. Each :class:`Client` receives a single *workspace/willDeleteFiles*
+        request and a single *workspace/didDeleteFiles* notification for all paths, and the :class:`WorkspaceEdits <WorkspaceEdit>`
+        returned by the language servers are performed together. Paths below another deleted directory are only deleted
+        as part of that directory.
+
+        :param paths: The paths which should be deleted. Each path can either be a :class:`pathlib.Path`,
+            or an ``str`` path or uri.
+        :param recursive: Whether to recursively delete files and subdirectories below directories in ``paths``.
+            If this is ``False``, then all directories must be empty.
+        :param ignore_if_not_exists: Whether to raise a :class:`FileNotFoundError` if one of the ``paths`` does not exist.
+        """
+        targets: Dict[Path, None] = {}
+        for path in paths:
+            full_path = self._validate_delete(path, recursive, ignore_if_not_exists, None)
+            if full_path is not None:
+                targets[full_path] = None
+        full_paths = [p for p in targets if not any(parent in targets for parent in p.parents)]
+        if not full_paths:
+            return
+
+        uris = [full_path.as_uri() for full_path in full_paths]
+        await self._send_will_delete_file_requests(uris)
+        for full_path in full_paths:
+            self._delete_node(full_path)
+        self._send_did_delete_file_notifications(uris)
+        self.logger.info(f"Deleted {len(full_paths)} files!")
+
     async def _query_unresolved_symbols(
         self, query: str, client: Optional[Client]
     ) -> List["symbol.UnresolvedWorkspaceSymbol"]:
@@ -794,15 +1760,102 @@ class Workspace(WorkspaceRequestHandler):
 
         return [symbol.UnresolvedWorkspaceSymbol(client, self, sym) for sym in raw_result]
 
+    @operation(
+        start_message="Resolving symbols...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def resolve_symbols(
+        self,
+        symbols: Sequence["symbol.UnresolvedWorkspaceSymbol"],
+        *,
+        lazy: bool = False,
+        window: int = _RESOLVE_WINDOW,
+    ) -> List["symbol.WorkspaceSymbol"]:
+        """
+        Resolves many :class:`UnresolvedWorkspaceSymbols <UnresolvedWorkspaceSymbol>` at once. This is considerably faster
+        than calling :meth:`UnresolvedWorkspaceSymbol.resolve()` for each symbol.
+
+        At most ``window`` *workspaceSymbol/resolve* requests are sent at the same time. Afterwards, the symbols are grouped
+        by document, so each :class:`TextDocument` is opened only once (see :meth:`open_text_documents()`) and the ranges
+        of all symbols in a document are converted at once.
+
+        :param symbols: The symbols to resolve.
+        :param lazy: If ``True``, the returned :class:`WorkspaceSymbols <WorkspaceSymbol>` only open their ``TextDocument``
+            once they are used, so resolving a large number of symbols does not open every document containing one of them.
+        :param window: The number of *workspaceSymbol/resolve* requests which are sent at the same time.
+        :returns: The resolved symbols in the same order as ``symbols``.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1.")
+
+        lsp_symbols: List[Union[WorkspaceSymbol, SymbolInformation]] = []
+        for window_start in range(0, len(symbols), window):
+            lsp_symbols += await asyncio.gather(
+                *(
+                    sym._resolve_lsp_symbol()  # type: ignore
+                    for sym in symbols[window_start : window_start + window]
+                )
+            )
+
+        out = [
+            symbol.WorkspaceSymbol(sym._client, self, lsp_symbol, lazy=True)  # type: ignore
+            for sym, lsp_symbol in zip(symbols, lsp_symbols)
+        ]
+        if lazy:
+            return out
+
+        # Indices into out, grouped by document and client, since positions depend on the client's encoding.
+        groups: Dict[str, Dict[Client, List[int]]] = {}
+        for i, lsp_symbol in enumerate(lsp_symbols):
+            assert isinstance(lsp_symbol.location, Location)
+            groups.setdefault(lsp_symbol.location.uri, {}).setdefault(out[i]._client, []).append(i)
+
+        text_documents = await self.open_text_documents(list(groups))
+        for text_document, clients in zip(text_documents, groups.values()):
+            first = True
+            for client, indices in clients.items():
+                indices.sort(key=lambda i: out[i]._location.range.start.line)  # type: ignore
+                positions = array("i")
+                for i in indices:
+                    symbol_range = out[i]._location.range  # type: ignore
+                    positions.extend(
+                        (
+                            symbol_range.start.line,
+                            symbol_range.start.character,
+                            symbol_range.end.line,
+                            symbol_range.end.character,
+                        )
+                    )
+                offsets = text_document.positions_to_offsets(positions, client)
+                for n, i in enumerate(indices):
+                    # Each WorkspaceSymbol holds its own reference to the TextDocument.
+                    if not first:
+                        text_document._reopen()  # type: ignore
+                    first = False
+                    out[i]._set_text_document(  # type: ignore
+                        text_document, (offsets[2 * n], offsets[2 * n + 1])
+                    )
+        return out
+
     @overload
     async def query_symbols(
-        self, query: str, *, resolve: Literal[True] = True, client: Optional[Client] = None
+        self,
+        query: str,
+        *,
+        resolve: Literal[True] = True,
+        lazy: bool = False,
+        client: Optional[Client] = None,
     ) -> List["symbol.WorkspaceSymbol"]:
         ...
 
     @overload
     async def query_symbols(
-        self, query: str, *, resolve: Literal[False] = False, client: Optional[Client] = None
+        self,
+        query: str,
+        *,
+        resolve: Literal[False] = False,
+        lazy: bool = False,
+        client: Optional[Client] = None,
     ) -> List["symbol.UnresolvedWorkspaceSymbol"]:
         ...
 
@@ -811,7 +1864,12 @@ class Workspace(WorkspaceRequestHandler):
         get_logger_from_context=_get_logger_from_context,
     )
     async def query_symbols(
-        self, query: str, *, resolve: bool = True, client: Optional[Client] = None
+        self,
+        query: str,
+        *,
+        resolve: bool = True,
+        lazy: bool = False,
+        client: Optional[Client] = None,
     ) -> Union[List["symbol.WorkspaceSymbol"], List["symbol.UnresolvedWorkspaceSymbol"]]:
         """
         Queries the ``Workspace`` for symbols using the given query string.
@@ -822,6 +1880,8 @@ class Workspace(WorkspaceRequestHandler):
             of :class:`UnresolvedWorkspaceSymbols <UnresolvedWorkspaceSymbol>`. Setting ``resolve`` to ``False`` means
             that the language server potentially has to do less work if not all symbols returned by the query are actually
             needed, as well as less :class:`TextDocuments <TextDocument>` are opened.
+        :param lazy: Whether the resolved symbols only open their ``TextDocument`` once they are used.
+            See :meth:`resolve_symbols()`.
         :param client: The :class:`Client` which should send the LSP-request to its language server.
             If only one client is created in this ``Workspace``, this parameter is optional.
         """
@@ -834,8 +1894,7 @@ class Workspace(WorkspaceRequestHandler):
         unresolved_symbols = await self._query_unresolved_symbols(query, client)
         if resolve:
             self.logger.info(f"Resolving {len(unresolved_symbols)} symbols.")
-            requests = [sym.resolve() for sym in unresolved_symbols]
-            symbols = await asyncio.gather(*requests)
+            symbols = await self.resolve_symbols(unresolved_symbols, lazy=lazy)
             self.logger.info(f"Found {len(symbols)} Symbols!")
             return symbols
         else:
@@ -861,6 +1920,245 @@ class Workspace(WorkspaceRequestHandler):
         self.logger.info(f"Found {len(unresolved_symbols)} Symbols!")
         return unresolved_symbols
 
+    async def iter_all_symbols(
+        self, *, client: Optional[Client] = None, chunk_size: int = 1000, **kwargs: Any
+    ) -> AsyncIterator[List["symbol.UnresolvedWorkspaceSymbol"]]:
+        """
+        Like :meth:`load_all_symbols()`, but yields the symbols in chunks of at most ``chunk_size`` symbols,
+        so processing can start before the language server has sent all symbols.
+
+        The symbols are requested with partial results (see :meth:`Client.send_request_iter()`). If the language server
+        does not support partial results, the whole result arrives at once. It is then converted chunk by chunk,
+        and the JSON data of each chunk is released once the chunk has been converted.
+
+        :param client: The :class:`Client` which should send the LSP-request to its language server.
+            If only one client is created in this ``Workspace``, this parameter is optional.
+        :param chunk_size: The maximum number of symbols per chunk.
+        :param timeout: See :meth:`Client.send_request()`. Consider passing ``None`` for large workspaces.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+        client = self._resolve_client_parameter(client)
+        if not client.check_feature("workspace/symbol"):
+            raise ChangeLSError(
+                f"Language server {client.server_info} does not support querying workspace symbols."
+            )
+
+        self.logger.info("Loading all symbols for the workspace...")
+        count = 0
+        params = WorkspaceSymbolParams(query="").to_json()
+        async for part in client.send_request_iter("workspace/symbol", params, **kwargs):
+            raw_symbols = json_assert_type_array(part)
+            for chunk_start in range(0, len(raw_symbols), chunk_size):
+                chunk_end = min(chunk_start + chunk_size, len(raw_symbols))
+                chunk = [
+                    symbol.UnresolvedWorkspaceSymbol(client, self, _parse_workspace_symbol(raw))
+                    for raw in raw_symbols[chunk_start:chunk_end]
+                ]
+                if isinstance(raw_symbols, list):
+                    # Drop the converted JSON data, so only one chunk exists in both forms at a time.
+                    raw_symbols[chunk_start:chunk_end] = [None] * (chunk_end - chunk_start)
+                count += len(chunk)
+                yield chunk
+        self.logger.info(f"Found {count} Symbols!")
+
+    @property
+    def diagnostics(self) -> DiagnosticStore:
+        """
+        The diagnostics which the language servers published or which were pulled with :meth:`pull_diagnostics()`
+        and :meth:`pull_workspace_diagnostics()`. The URIs in the store are the ones used by the language servers.
+        """
+        return self._diagnostics
+
+    def _store_diagnostic_report(
+        self,
+        client: Client,
+        uri: str,
+        version: Optional[int],
+        report: Union[FullDocumentDiagnosticReport, UnchangedDocumentDiagnosticReport],
+    ) -> Optional[DocumentDiagnostics]:
+        """
+        Stores a pulled diagnostic report. Returns the new entry if the diagnostics changed.
+        """
+        if isinstance(report, UnchangedDocumentDiagnosticReport):
+            if self._diagnostics.update_version(uri, client, version, report.resultId) is None:
+                self.logger.warning(
+                    f"Language server {client.server_info} reported unchanged diagnostics for unknown document {uri}."
+                )
+            return None
+        entry = DocumentDiagnostics(client, uri, version, report.items, report.resultId)
+        self._diagnostics.replace(entry)
+        self._notify_diagnostics_updated()
+        return entry
+
+    def _notify_diagnostics_updated(self) -> None:
+        if self._diagnostics_updated is not None:
+            self._diagnostics_updated.set()
+            self._diagnostics_updated = None
+
+    def _has_current_diagnostics(self, text_document: "td.TextDocument", client: Client) -> bool:
+        if text_document.is_closed():
+            return True
+        entries = self._diagnostics.get(text_document.uri, client)
+        return len(entries) > 0 and entries[0].version == text_document.version
+
+    @operation(
+        start_message="Waiting for diagnostics...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def wait_for_diagnostics(
+        self,
+        text_documents: Sequence["td.TextDocument"],
+        *,
+        client: Optional[Client] = None,
+        quiet_period: float = 0.5,
+    ) -> None:
+        """
+        Waits until a language server has published diagnostics for the current versions of ``text_documents``,
+        e.g. after opening or editing them. The diagnostics can then be retrieved from :attr:`diagnostics`.
+
+        This returns as soon as there are diagnostics for the current :attr:`~TextDocument.version` of every document.
+        Not every language server sends the version with its diagnostics, and some do not publish anything for documents
+        without problems. So this also returns once the server has not published any diagnostics for ``quiet_period`` seconds,
+        while no work done progress (see :meth:`Client.wait_for_work_done_progress()`) is active.
+
+        To give up after some time, wrap the call in :func:`asyncio.wait_for()`.
+
+        :param text_documents: The :class:`TextDocuments <TextDocument>` to wait for.
+        :param client: The :class:`Client` whose diagnostics to wait for. If only one ``Client`` is open
+            in the ``Workspace``, this parameter is optional.
+        :param quiet_period: The number of seconds without new diagnostics after which the server is assumed to be done.
+        """
+        client = self._resolve_client_parameter(client)
+        for text_document in text_documents:
+            if not text_document.is_closed():
+                self._residency.ensure_open(text_document)
+        while True:
+            if self._diagnostics_updated is None:
+                self._diagnostics_updated = asyncio.Event()
+            updated = self._diagnostics_updated
+            pending = [d for d in text_documents if not self._has_current_diagnostics(d, client)]
+            if not pending:
+                self.logger.info("Diagnostics are up to date.")
+                return
+
+            if client.has_work_done_progress:
+                # The server might still be busy indexing, so the quiet period only starts afterwards.
+                waiters = [
+                    asyncio.ensure_future(updated.wait()),
+                    asyncio.ensure_future(client.wait_for_work_done_progress()),
+                ]
+                try:
+                    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for waiter in waiters:
+                        waiter.cancel()
+                continue
+
+            try:
+                await asyncio.wait_for(updated.wait(), quiet_period)
+            except asyncio.TimeoutError:
+                self.logger.info(
+                    f"No diagnostics for the current version of {len(pending)} documents "
+                    f"after {quiet_period}s without updates."
+                )
+                return
+
+    @operation(
+        start_message="Pulling diagnostics for {path}...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def pull_diagnostics(
+        self, path: Union[Path, str], *, client: Optional[Client] = None
+    ) -> List[Diagnostic]:
+        """
+        Requests the diagnostics for a single document with a *textDocument/diagnostic* request and stores them in
+        :attr:`diagnostics`. If diagnostics were pulled for the document before, the language server can answer
+        that they are unchanged instead of sending them again.
+
+        :param path: The path or URI of the document.
+        :param client: The :class:`Client` to request the diagnostics from. If only one ``Client`` is open
+            in the ``Workspace``, this parameter is optional.
+        :returns: The current diagnostics for the document.
+        """
+        _, uri = self._normalize_path_parameter(path)
+        client = self._resolve_client_parameter(client)
+        text_document = self._opened_text_documents.get(uri)
+        text_documents = [text_document] if text_document is not None else []
+        if text_document is not None and not text_document.is_closed():
+            self._residency.ensure_open(text_document)
+        if not client.check_feature("textDocument/diagnostic", text_documents=text_documents):
+            raise ChangeLSError(
+                f"Language server {client.server_info} does not support pulling diagnostics."
+            )
+
+        previous = self._diagnostics.get(uri, client)
+        version = text_document.version if text_document is not None else None
+        report = await client.send_text_document_diagnostic(
+            DocumentDiagnosticParams(
+                textDocument=TextDocumentIdentifier(uri=uri),
+                previousResultId=previous[0].result_id if previous else None,
+            )
+        )
+        self._store_diagnostic_report(client, uri, version, report)
+        for related_uri, related_report in (report.relatedDocuments or {}).items():
+            self._store_diagnostic_report(client, related_uri, None, related_report)
+
+        entries = self._diagnostics.get(uri, client)
+        return list(entries[0].diagnostics) if entries else []
+
+    @operation(
+        start_message="Pulling diagnostics for the workspace...",
+        get_logger_from_context=_get_logger_from_context,
+    )
+    async def pull_workspace_diagnostics(
+        self, *, client: Optional[Client] = None
+    ) -> List[DocumentDiagnostics]:
+        """
+        Requests the diagnostics for the whole workspace with a *workspace/diagnostic* request and stores them in
+        :attr:`diagnostics`. The result ids of all previously pulled reports are sent along, so that the
+        language server only needs to send the diagnostics which changed.
+
+        :param client: The :class:`Client` to request the diagnostics from. If only one ``Client`` is open
+            in the ``Workspace``, this parameter is optional.
+        :returns: The documents whose diagnostics changed.
+        """
+        client = self._resolve_client_parameter(client)
+        if not client.check_feature("textDocument/diagnostic", workspace_diagnostic=True):
+            raise ChangeLSError(
+                f"Language server {client.server_info} does not support pulling workspace diagnostics."
+            )
+
+        previous_result_ids = [
+            PreviousResultId(uri=entry.uri, value=entry.result_id)
+            for entry in self._diagnostics
+            if entry.client == client and entry.result_id is not None
+        ]
+        report = await client.send_workspace_diagnostic(
+            WorkspaceDiagnosticParams(previousResultIds=previous_result_ids)
+        )
+        changed: List[DocumentDiagnostics] = []
+        for item in report.items:
+            if (
+                entry := self._store_diagnostic_report(client, item.uri, item.version, item)
+            ) is not None:
+                changed.append(entry)
+        self.logger.info(
+            f"Received {len(report.items)} diagnostic reports, {len(changed)} of them changed."
+        )
+        return changed
+
+    async def _refresh_diagnostics(self, client: Client) -> None:
+        # Only diagnostics which were pulled before are pulled again.
+        uris = {
+            entry.uri for entry in self._diagnostics if entry.client == client and entry.result_id
+        }
+        for uri in uris:
+            try:
+                await self.pull_diagnostics(uri, client=client)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.logger.warning(f"Failed to refresh diagnostics for {uri}: {e}")
+
     def on_workspace_folders(self) -> List[WorkspaceFolder]:
         return self._get_workspace_folders()
 
@@ -883,20 +2181,83 @@ class Workspace(WorkspaceRequestHandler):
         return None
 
     def on_diagnostic_refresh(self) -> None:
-        # TODO
-        return None
+        self.on_client_diagnostic_refresh(self._resolve_client_parameter(None))
+
+    def on_client_diagnostic_refresh(self, client: Client) -> None:
+        task = asyncio.ensure_future(self._refresh_diagnostics(client))
+        self._diagnostic_refreshes.add(task)
+        task.add_done_callback(self._diagnostic_refreshes.discard)
 
     def on_code_lens_refresh(self) -> None:
         # TODO
         return None
 
-    def on_apply_edit(self, params: ApplyWorkspaceEditParams) -> ApplyWorkspaceEditResult:
-        # TODO
-        return ApplyWorkspaceEditResult(applied=False, failureReason="Not Implemented")
+    def _get_affected_paths(self, edit: WorkspaceEdit) -> Set[Path]:
+        paths: Set[Path] = set()
+        if edit.documentChanges:
+            for action in edit.documentChanges:
+                if isinstance(action, TextDocumentEdit):
+                    paths.add(self._normalize_path_parameter(action.textDocument.uri)[0])
+                elif isinstance(action, RenameFile):
+                    paths.add(self._normalize_path_parameter(action.oldUri)[0])
+                    paths.add(self._normalize_path_parameter(action.newUri)[0])
+                else:
+                    paths.add(self._normalize_path_parameter(action.uri)[0])
+        elif edit.changes:
+            paths.update(self._normalize_path_parameter(uri)[0] for uri in edit.changes)
+        return paths
+
+    async def on_apply_edit(  # pylint: disable=invalid-overridden-method
+        self, params: ApplyWorkspaceEditParams
+    ) -> ApplyWorkspaceEditResult:
+        """
+        Performs the :class:`WorkspaceEdit` from a *workspace/applyEdit* request transactionally,
+        see :meth:`perform_edit_and_save()`.
+
+        Requests which affect different files are performed concurrently, even if they come from different
+        clients. Requests which affect the same files, or files inside of a directory affected by the other request,
+        are performed one after another in the order in which they were received.
+        """
+        try:
+            paths = self._get_affected_paths(params.edit)
+        except (ChangeLSError, OSError, ValueError) as e:
+            return ApplyWorkspaceEditResult(applied=False, failureReason=str(e))
+
+        predecessors = [
+            done
+            for other_paths, done in self._apply_edit_queue
+            if any(
+                _path_is_relative_to(a, b) or _path_is_relative_to(b, a)
+                for a in paths
+                for b in other_paths
+            )
+        ]
+        entry = (paths, asyncio.Event())
+        self._apply_edit_queue.append(entry)
+        try:
+            for done in predecessors:
+                await done.wait()
+            self.logger.info(f"Applying WorkspaceEdit '{params.label or ''}' from language server.")
+            await self.perform_edit_and_save(params.edit, transactional=True)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.logger.warning(f"Failed to apply WorkspaceEdit: {e}")
+            return ApplyWorkspaceEditResult(applied=False, failureReason=str(e))
+        finally:
+            self._apply_edit_queue.remove(entry)
+            entry[1].set()
+        return ApplyWorkspaceEditResult(applied=True)
 
     def on_publish_diagnostics(self, params: PublishDiagnosticsParams) -> None:
-        # TODO
-        return None
+        self.on_client_publish_diagnostics(self._resolve_client_parameter(None), params)
+
+    def on_client_publish_diagnostics(
+        self, client: Client, params: PublishDiagnosticsParams
+    ) -> None:
+        # Empty diagnostics are stored as well, to record the version they belong to.
+        self._diagnostics.replace(
+            DocumentDiagnostics(client, params.uri, params.version, params.diagnostics)
+        )
+        self._notify_diagnostics_updated()
 
     def __str__(self) -> str:
         return ", ".join(f"'{n}': {r}" for n, r in zip(self._root_names, self._roots))
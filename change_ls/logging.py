@@ -159,9 +159,9 @@ class Operation:
     def __enter__(self) -> "Operation":
         assert self._info is None
         self._info = OperationInfo(self._name)
-        stack = _operation_stack.get()
-        stack.append(self._info)
-        _operation_stack.set(stack)
+        # The stack is never modified in place, because tasks started inside an Operation
+        # share the list with their parent task, e.g. when running Operations with asyncio.gather().
+        _operation_stack.set(_operation_stack.get() + [self._info])
 
         if self._start_message is not None:
             assert self._logger
@@ -179,8 +179,7 @@ class Operation:
         assert self._info is not None
         stack = _operation_stack.get()
         assert stack[-1] == self._info
-        stack.pop()
-        _operation_stack.set(stack)
+        _operation_stack.set(stack[:-1])
 
         return False
 
@@ -1,6 +1,7 @@
 from abc import abstractmethod
+from array import array
 from logging import DEBUG, Logger, LoggerAdapter, getLogger
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
 
 from change_ls._change_ls_error import ChangeLSError
 from change_ls._client import Client
@@ -8,7 +9,6 @@ from change_ls._util import TextDocumentInfo
 from change_ls.logging import OperationLoggerAdapter, operation
 from change_ls.tokens._token_list import SemanticToken, SyntacticToken, TokenList
 from change_ls.types import (
-    Position,
     SemanticTokens,
     SemanticTokensDelta,
     SemanticTokensDeltaParams,
@@ -141,19 +141,25 @@ def _get_semantic_tokens_legend(client: Client) -> SemanticTokensLegend:
 
 
 class SemanticTokensMixin:
-    _cached_results: Dict[Client, SemanticTokens]
-    _loaded_semantic_tokens: Dict[Client, TokenList[SemanticToken]]
+    # The attributes are declared as slots by the classes using this mixin.
+    __slots__ = ()
+
+    # Both are None until semantic tokens are loaded for the first time.
+    _cached_results: Optional[Dict[Client, SemanticTokens]]
+    _loaded_semantic_tokens: Optional[Dict[Client, TokenList[SemanticToken]]]
 
     def __init__(self) -> None:
-        self._cached_results = {}
-        self._loaded_semantic_tokens = {}
+        self._cached_results = None
+        self._loaded_semantic_tokens = None
 
     @abstractmethod
     def _resolve_client_parameter(self, client: Optional[Client]) -> Client:
         ...
 
     @abstractmethod
-    def position_to_offset(self, position: Position, client: Optional[Client] = None) -> int:
+    def positions_to_offsets(
+        self, positions: Sequence[int], client: Optional[Client] = None
+    ) -> "array[int]":
         ...
 
     @abstractmethod
@@ -192,21 +198,26 @@ class SemanticTokensMixin:
         data_length = len(data)
         text = self.text
 
+        # Resolve the relative positions first, so they can be converted in one go.
+        # Tokens are sorted by line, which makes the batched conversion cheap.
         current_line = 0
         current_start = 0
-        tokens: List[SemanticToken] = []
+        positions = array("i")
         for i in range(0, data_length, 5):
-            delta_line, delta_start, length, token_type_idx, token_modifiers_bits = data[i : i + 5]
-
+            delta_line = data[i]
+            delta_start = data[i + 1]
             if delta_line != 0:
                 current_line += delta_line
                 current_start = delta_start
             else:
                 current_start += delta_start
+            positions.append(current_line)
+            positions.append(current_start)
+        offsets = self.positions_to_offsets(positions, client)
 
-            offset = self.position_to_offset(
-                Position(line=current_line, character=current_start), client
-            )
+        tokens: List[SemanticToken] = []
+        for offset, i in zip(offsets, range(0, data_length, 5)):
+            length, token_type_idx, token_modifiers_bits = data[i + 2 : i + 5]
 
             try:
                 lexeme = text[offset : offset + length]
@@ -233,6 +244,8 @@ class SemanticTokensMixin:
 
     def _cache_result(self, result: SemanticTokens, client: Client) -> None:
         self.logger.info(f"Saving result '{result.resultId}' for Client '{client}'.")
+        if self._cached_results is None:
+            self._cached_results = {}
         self._cached_results[client] = result
 
     async def _load_semantic_tokens_full(self, client: Client) -> TokenList[SemanticToken]:
@@ -256,6 +269,7 @@ class SemanticTokensMixin:
 
     async def _load_semantic_tokens_delta(self, client: Client) -> TokenList[SemanticToken]:
         self.logger.info(f"Loading semantic token delta for Client '{client}'.")
+        assert self._cached_results is not None
         previous_result = self._cached_results[client]
         assert previous_result.resultId is not None
         params = SemanticTokensDeltaParams(
@@ -296,21 +310,29 @@ class SemanticTokensMixin:
     async def _load_semantic_tokens(self, client: Optional[Client] = None) -> None:
         client = self._resolve_client_parameter(client)
 
-        if client in self._cached_results and client.check_feature(
-            "textDocument/semanticTokens",
-            semantic_tokens=["full/delta"],
-            text_document=TextDocumentInfo(self.uri, self.language_id),
+        if (
+            self._cached_results is not None
+            and client in self._cached_results
+            and client.check_feature(
+                "textDocument/semanticTokens",
+                semantic_tokens=["full/delta"],
+                text_document=TextDocumentInfo(self.uri, self.language_id),
+            )
         ):
-            self._loaded_semantic_tokens[client] = await self._load_semantic_tokens_delta(client)
+            semantic_tokens = await self._load_semantic_tokens_delta(client)
         elif client.check_feature(
             "textDocument/semanticTokens",
             sematic_tokens=["full"],
             text_document=TextDocumentInfo(self.uri, self.language_id),
         ):
-            self._loaded_semantic_tokens[client] = await self._load_semantic_tokens_full(client)
+            semantic_tokens = await self._load_semantic_tokens_full(client)
         else:
             raise ChangeLSError(f"Client {client} does not support semantic tokens.")
 
+        if self._loaded_semantic_tokens is None:
+            self._loaded_semantic_tokens = {}
+        self._loaded_semantic_tokens[client] = semantic_tokens
+
     @property
     def sem_tokens(self) -> TokenList[SemanticToken]:
         """
@@ -330,7 +352,12 @@ class SemanticTokensMixin:
         :param client: The :class:`Client` which was used to load the semantic tokens.
             If only one client is running in the current :class:`Workspace` this parameter is optional.
         """
-        out = self._loaded_semantic_tokens.get(self._resolve_client_parameter(client))
+        client = self._resolve_client_parameter(client)
+        out = (
+            self._loaded_semantic_tokens.get(client)
+            if self._loaded_semantic_tokens is not None
+            else None
+        )
 
         if out is None:
             raise ChangeLSError(f"No semantic tokens are loaded for client {client}")
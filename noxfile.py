@@ -128,7 +128,7 @@ def reformat(session: nox.Session) -> None:
     """
     init(session)
     session.install(*DEP_BLACK)
-    session.run("black", "change_ls", "gen", "test")
+    session.run("black", "change_ls", "gen", "test", "benchmarks")
 
 
 @nox.session(python=MIN_PYTHON)
@@ -138,7 +138,7 @@ def check_formatting(session: nox.Session) -> None:
     """
     init(session)
     session.install(*DEP_BLACK)
-    session.run("black", "--check", "change_ls", "gen", "test")
+    session.run("black", "--check", "change_ls", "gen", "test", "benchmarks")
 
 
 @nox.session(python=MIN_PYTHON)
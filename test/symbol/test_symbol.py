@@ -1,5 +1,6 @@
+import asyncio
 from pathlib import Path
-from typing import AsyncGenerator, Tuple
+from typing import Any, AsyncGenerator, Tuple
 
 import pytest
 
@@ -13,9 +14,14 @@ from change_ls import (
     WorkspaceSymbol,
 )
 from change_ls.types import (
+    JSON_VALUE,
+    Location,
     OptionalVersionedTextDocumentIdentifier,
     Position,
+    PositionEncodingKind,
+    ProgressParams,
     Range,
+    SymbolInformation,
     SymbolKind,
     TextDocumentEdit,
     TextEdit,
@@ -235,3 +241,135 @@ async def test_load_outline(mock_ws_1: Tuple[Workspace, Client]) -> None:
         assert c.uri == doc.uri
         assert c.kind == SymbolKind.Variable
         assert c.children is None
+
+
+async def test_resolve_symbols(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "a.py").write_text("def foo(): ...\ndef bar(): ...\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("def baz(): ...\n", encoding="utf-8")
+
+    def symbol_information(name: str, path: Path, line: int) -> SymbolInformation:
+        return SymbolInformation(
+            name=name,
+            kind=SymbolKind.Function,
+            location=Location(
+                uri=path.as_uri(),
+                range=Range(
+                    start=Position(line=line, character=4), end=Position(line=line, character=7)
+                ),
+            ),
+        )
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        # The client is never launched, so it must not send any requests or notifications.
+        monkeypatch.setattr(client, "check_feature", lambda *_args, **_kwargs: False)
+        monkeypatch.setattr(
+            client, "get_position_encoding_kind", lambda: PositionEncodingKind.UTF16
+        )
+        unresolved_symbols = [
+            UnresolvedWorkspaceSymbol(client, ws, symbol_information("bar", tmp_path / "a.py", 1)),
+            UnresolvedWorkspaceSymbol(client, ws, symbol_information("baz", tmp_path / "b.py", 0)),
+            UnresolvedWorkspaceSymbol(client, ws, symbol_information("foo", tmp_path / "a.py", 0)),
+        ]
+
+        with pytest.raises(ValueError):
+            await ws.resolve_symbols(unresolved_symbols, window=0)
+
+        symbols = await ws.resolve_symbols(unresolved_symbols, window=2)
+        assert [(s.name, s.range) for s in symbols] == [
+            ("bar", (19, 22)),
+            ("baz", (4, 7)),
+            ("foo", (4, 7)),
+        ]
+        doc_a = symbols[0]._get_anchor().text_document
+        assert symbols[2]._get_anchor().text_document is doc_a
+        assert doc_a._reference_count == 2
+        for sym in symbols:
+            sym.close()
+        assert doc_a.is_closed()
+
+        lazy_symbols = await ws.resolve_symbols(unresolved_symbols, lazy=True)
+        assert ws._opened_text_documents == {}
+        assert all(s.is_valid() for s in lazy_symbols)
+        assert lazy_symbols[1].range == (4, 7)
+        assert list(ws._opened_text_documents) == [(tmp_path / "b.py").as_uri()]
+
+        lazy_symbols[0].close()
+        assert not lazy_symbols[0].is_valid()
+        with pytest.raises(ChangeLSError):
+            lazy_symbols[0].range
+        lazy_symbols[1].close()
+        assert ws._opened_text_documents == {}
+
+
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+async def test_symbol_range_after_edit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "a.py").write_text("def foo(): ...\n", encoding="utf-8")
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        monkeypatch.setattr(client, "check_feature", lambda *_args, **_kwargs: False)
+        monkeypatch.setattr(
+            client, "get_position_encoding_kind", lambda: PositionEncodingKind.UTF16
+        )
+        doc = ws.open_text_document(tmp_path / "a.py")
+        symbol = doc.create_symbol_at(4, 7, SymbolKind.Function)
+
+        # The range follows edits elsewhere in the document without calling is_valid() first.
+        doc.edit("# comment\n", 0, 0)
+        doc.commit_edits()
+        assert symbol.range == (14, 17)
+        assert symbol.snapshot.version == doc.version
+
+        # Edits of the symbol itself invalidate it, the range stays at the previous version.
+        doc.edit("bar", 14, 17)
+        doc.commit_edits()
+        assert symbol.range == (14, 17)
+        assert symbol.snapshot.version == doc.version - 1
+        assert not symbol.is_valid()
+
+
+async def test_iter_all_symbols(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def symbol_information(name: str) -> JSON_VALUE:
+        return SymbolInformation(
+            name=name,
+            kind=SymbolKind.Function,
+            location=Location(
+                uri=(tmp_path / "a.py").as_uri(),
+                range=Range(start=Position(line=0, character=0), end=Position(line=0, character=1)),
+            ),
+        ).to_json()
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        monkeypatch.setattr(client, "check_feature", lambda *_args, **_kwargs: True)
+        client._state = "running"
+
+        async def send_partial_results(method: str, params: Any, **_kwargs: Any) -> JSON_VALUE:
+            assert method == "workspace/symbol"
+            token = params["partialResultToken"]
+            client.on_s_progress(ProgressParams(token=token, value=[symbol_information("a")]))
+            await asyncio.sleep(0)
+            client.on_s_progress(
+                ProgressParams(
+                    token=token, value=[symbol_information("b"), symbol_information("c")]
+                )
+            )
+            return []
+
+        monkeypatch.setattr(client, "_send_request_internal", send_partial_results)
+        chunks = [chunk async for chunk in ws.iter_all_symbols(chunk_size=1)]
+        assert [[s.name for s in chunk] for chunk in chunks] == [["a"], ["b"], ["c"]]
+        assert client._partial_results == {}
+
+        async def send_whole_result(method: str, params: Any, **_kwargs: Any) -> JSON_VALUE:
+            return [symbol_information("a"), symbol_information("b"), symbol_information("c")]
+
+        monkeypatch.setattr(client, "_send_request_internal", send_whole_result)
+        chunks = [chunk async for chunk in ws.iter_all_symbols(chunk_size=2)]
+        assert [[s.name for s in chunk] for chunk in chunks] == [["a", "b"], ["c"]]
+
+        with pytest.raises(ValueError):
+            async for _ in ws.iter_all_symbols(chunk_size=0):
+                pass
+        client._state = "disconnected"
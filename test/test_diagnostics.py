@@ -0,0 +1,219 @@
+import asyncio
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+from change_ls import DiagnosticStore, DocumentDiagnostics, StdIOConnectionParams, Workspace
+from change_ls._client import Client
+from change_ls.types import (
+    Diagnostic,
+    DiagnosticSeverity,
+    DocumentDiagnosticParams,
+    FullDocumentDiagnosticReport,
+    Position,
+    PublishDiagnosticsParams,
+    Range,
+    RelatedFullDocumentDiagnosticReport,
+    RelatedUnchangedDocumentDiagnosticReport,
+    WorkspaceDiagnosticParams,
+    WorkspaceDiagnosticReport,
+    WorkspaceFullDocumentDiagnosticReport,
+    WorkspaceUnchangedDocumentDiagnosticReport,
+)
+
+
+def _diagnostic(
+    message: str, severity: DiagnosticSeverity, code: Any = None, source: Any = None
+) -> Diagnostic:
+    return Diagnostic(
+        range=Range(start=Position(line=0, character=0), end=Position(line=0, character=1)),
+        message=message,
+        severity=severity,
+        code=code,
+        source=source,
+    )
+
+
+def _client() -> Client:
+    return Client(StdIOConnectionParams(launch_command="server"))
+
+
+def test_diagnostic_store_query() -> None:
+    client_1 = _client()
+    client_2 = _client()
+    store = DiagnosticStore()
+    store.replace(
+        DocumentDiagnostics(
+            client_1,
+            "file:///a.py",
+            1,
+            [
+                _diagnostic("a1", DiagnosticSeverity.Error, "E1", "mypy"),
+                _diagnostic("a2", DiagnosticSeverity.Warning, "W1", "mypy"),
+            ],
+        )
+    )
+    store.replace(
+        DocumentDiagnostics(
+            client_2, "file:///a.py", 1, [_diagnostic("a3", DiagnosticSeverity.Error, 5, "lint")]
+        )
+    )
+    store.replace(
+        DocumentDiagnostics(
+            client_1, "file:///b.py", None, [_diagnostic("b1", DiagnosticSeverity.Error, "E1")]
+        )
+    )
+    assert len(store) == 3
+
+    def messages(entries: List[DocumentDiagnostics]) -> List[str]:
+        return sorted(d.message for e in entries for d in e.diagnostics)
+
+    assert messages(store.query(severity=DiagnosticSeverity.Error)) == ["a1", "a3", "b1"]
+    assert messages(store.query(severity=DiagnosticSeverity.Error, source="mypy")) == ["a1"]
+    assert messages(store.query(code="E1")) == ["a1", "b1"]
+    assert messages(store.query(client=client_2)) == ["a3"]
+    assert messages(store.query(severity=DiagnosticSeverity.Hint)) == []
+    assert messages(store.get("file:///a.py")) == ["a1", "a2", "a3"]
+
+    # Replacing the diagnostics of a document updates the indexes.
+    store.replace(
+        DocumentDiagnostics(
+            client_1, "file:///a.py", 2, [_diagnostic("a4", DiagnosticSeverity.Hint)]
+        )
+    )
+    assert messages(store.query(source="mypy")) == []
+    assert messages(store.query(severity=DiagnosticSeverity.Hint)) == ["a4"]
+    assert store.get("file:///a.py", client_1)[0].version == 2
+
+    store.remove_client(client_1)
+    assert messages(store.query()) == ["a3"]
+    store.remove("file:///a.py")
+    assert len(store) == 0
+    assert store.query(severity=DiagnosticSeverity.Error) == []
+
+
+async def test_workspace_diagnostics(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    uri_a = (tmp_path / "a.py").as_uri()
+    uri_b = (tmp_path / "b.py").as_uri()
+    (tmp_path / "a.py").write_text("", encoding="utf-8")
+
+    requests: List[Any] = []
+
+    async def send_text_document_diagnostic(
+        params: DocumentDiagnosticParams, **_kwargs: Any
+    ) -> Any:
+        requests.append(params.previousResultId)
+        if params.previousResultId is None:
+            return RelatedFullDocumentDiagnosticReport(
+                kind="full",
+                resultId="1",
+                items=[_diagnostic("a1", DiagnosticSeverity.Error)],
+                relatedDocuments={
+                    uri_b: FullDocumentDiagnosticReport(
+                        kind="full",
+                        resultId="2",
+                        items=[_diagnostic("b1", DiagnosticSeverity.Hint)],
+                    )
+                },
+            )
+        return RelatedUnchangedDocumentDiagnosticReport(kind="unchanged", resultId="3")
+
+    async def send_workspace_diagnostic(
+        params: WorkspaceDiagnosticParams, **_kwargs: Any
+    ) -> WorkspaceDiagnosticReport:
+        requests.append(sorted((p.uri, p.value) for p in params.previousResultIds))
+        return WorkspaceDiagnosticReport(
+            items=[
+                WorkspaceUnchangedDocumentDiagnosticReport(
+                    kind="unchanged", resultId="4", uri=uri_a, version=None
+                ),
+                WorkspaceFullDocumentDiagnosticReport(
+                    kind="full", resultId="5", items=[], uri=uri_b, version=None
+                ),
+            ]
+        )
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        monkeypatch.setattr(client, "check_feature", lambda *_args, **_kwargs: True)
+        monkeypatch.setattr(client, "send_text_document_diagnostic", send_text_document_diagnostic)
+        monkeypatch.setattr(client, "send_workspace_diagnostic", send_workspace_diagnostic)
+
+        assert [d.message for d in await ws.pull_diagnostics(tmp_path / "a.py")] == ["a1"]
+        assert [d.message for d in await ws.pull_diagnostics(tmp_path / "a.py")] == ["a1"]
+        assert [e.uri for e in ws.diagnostics.query(severity=DiagnosticSeverity.Hint)] == [uri_b]
+
+        changed = await ws.pull_workspace_diagnostics()
+        assert [e.uri for e in changed] == [uri_b]
+        assert ws.diagnostics.get(uri_a)[0].result_id == "4"
+        assert ws.diagnostics.query(severity=DiagnosticSeverity.Hint) == []
+        assert requests == [None, "1", [(uri_a, "3"), (uri_b, "2")]]
+
+        ws.on_client_publish_diagnostics(
+            client,
+            PublishDiagnosticsParams(
+                uri=uri_a, version=3, diagnostics=[_diagnostic("a2", DiagnosticSeverity.Warning)]
+            ),
+        )
+        entry = ws.diagnostics.get(uri_a)[0]
+        assert entry.version == 3 and [d.message for d in entry.diagnostics] == ["a2"]
+        ws.on_client_publish_diagnostics(
+            client, PublishDiagnosticsParams(uri=uri_a, diagnostics=[])
+        )
+        assert ws.diagnostics.get(uri_a)[0].diagnostics == []
+
+
+async def test_workspace_wait_for_diagnostics(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("", encoding="utf-8")
+    (tmp_path / "b.py").write_text("", encoding="utf-8")
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        doc_a = ws.open_text_document(tmp_path / "a.py")
+        doc_b = ws.open_text_document(tmp_path / "b.py")
+
+        def publish(uri: str, version: int) -> None:
+            ws.on_client_publish_diagnostics(
+                client, PublishDiagnosticsParams(uri=uri, version=version, diagnostics=[])
+            )
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, publish, doc_a.uri, 0)
+        loop.call_later(0.02, publish, doc_b.uri, 0)
+        start = loop.time()
+        await ws.wait_for_diagnostics([doc_a, doc_b], quiet_period=5.0)
+        assert loop.time() - start < 1.0
+
+        # Without diagnostics for the current version, the quiet period ends the wait.
+        doc_a.edit("x", 0, 0)
+        doc_a.commit_edits()
+        loop.call_later(0.01, publish, doc_a.uri, 0)
+        start = loop.time()
+        await ws.wait_for_diagnostics([doc_a, doc_b], quiet_period=0.1)
+        assert loop.time() - start >= 0.1
+
+        await doc_a.save()
+        doc_a.close()
+        doc_b.close()
+
+
+def test_workspace_wait_for_diagnostics_outside_loop(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("", encoding="utf-8")
+    # The Workspace is constructed before the event loop which uses it.
+    ws = Workspace(tmp_path)
+
+    async def run() -> None:
+        async with ws:
+            client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+            doc = ws.open_text_document(tmp_path / "a.py")
+            asyncio.get_running_loop().call_later(
+                0.01,
+                ws.on_client_publish_diagnostics,
+                client,
+                PublishDiagnosticsParams(uri=doc.uri, version=0, diagnostics=[]),
+            )
+            await ws.wait_for_diagnostics([doc], quiet_period=5.0)
+            doc.close()
+
+    asyncio.run(run())
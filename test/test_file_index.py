@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from change_ls._file_index import _FileIndex, _IgnoreRules
+from change_ls.types import FileChangeType
+
+
+def test_ignore_rules() -> None:
+    rules = _IgnoreRules(
+        ["# comment\n", "*.pyc\n", "/build\n", "logs/\n", "!important.log\n", "*.log\n", "a/**/z\n"]
+    )
+    assert rules.match("x.pyc", False)
+    assert rules.match("src/x.pyc", False)
+    assert rules.match("build", True)
+    assert rules.match("src/build", True) is None
+    assert rules.match("logs", True)
+    assert rules.match("logs", False) is None
+    assert rules.match("a/z", False)
+    assert rules.match("a/b/c/z", False)
+    assert rules.match("x.py", False) is None
+
+    # The last matching pattern decides.
+    assert rules.match("important.log", False)
+    assert not _IgnoreRules(["*.log", "!important.log"]).match("important.log", False)
+
+
+def _write(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def test_file_index(tmp_path: Path) -> None:
+    _write(tmp_path / ".gitignore", "*.pyc\nbuild/\n")
+    _write(tmp_path / "a.py", "a")
+    _write(tmp_path / "a.pyc", "a")
+    _write(tmp_path / "build" / "b.py", "b")
+    _write(tmp_path / "src" / "c.py", "c")
+    _write(tmp_path / "src" / ".gitignore", "!*.pyc\n")
+    _write(tmp_path / "src" / "c.pyc", "c")
+    _write(tmp_path / ".git" / "HEAD", "")
+
+    index = _FileIndex(tmp_path)
+    assert len(index.refresh()) == 5
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in index) == [
+        ".gitignore",
+        "a.py",
+        "src/.gitignore",
+        "src/c.py",
+        "src/c.pyc",
+    ]
+    assert index.is_ignored("a.pyc")
+    assert index.is_ignored("build/b.py")
+    assert not index.is_ignored("src/c.pyc")
+    assert index.refresh() == []
+
+    _write(tmp_path / "a.py", "changed")
+    (tmp_path / "src" / "c.py").unlink()
+    _write(tmp_path / "src" / "d" / "d.py", "d")
+    assert sorted(index.refresh()) == [
+        (tmp_path / "a.py", FileChangeType.Changed),
+        (tmp_path / "src" / "c.py", FileChangeType.Deleted),
+        (tmp_path / "src" / "d" / "d.py", FileChangeType.Created),
+    ]
+
+    # Files which are no longer ignored are reported as created
+    _write(tmp_path / ".gitignore", "*.pyc\n")
+    assert sorted(index.refresh()) == [
+        (tmp_path / ".gitignore", FileChangeType.Changed),
+        (tmp_path / "build" / "b.py", FileChangeType.Created),
+    ]
+
+    # Changed ignore rules also apply to nested directories
+    _write(tmp_path / "a" / "b" / "x.log", "x")
+    assert index.refresh() == [(tmp_path / "a" / "b" / "x.log", FileChangeType.Created)]
+    _write(tmp_path / ".gitignore", "*.pyc\n*.log\n")
+    assert sorted(index.refresh()) == [
+        (tmp_path / ".gitignore", FileChangeType.Changed),
+        (tmp_path / "a" / "b" / "x.log", FileChangeType.Deleted),
+    ]
+    assert index.is_ignored("a/b/x.log")
@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import pytest
+
+from change_ls._line_index import _LineIndex
+from change_ls._rope import Rope
+from change_ls.types import PositionEncodingKind
+
+
+@pytest.fixture
+def line_index() -> _LineIndex:
+    with Path("test/mock-ws-1/test-2.py").open(encoding="utf-8") as file:
+        return _LineIndex(Rope(file.read()))
+
+
+def test_line_index_position_to_offset(line_index: _LineIndex) -> None:
+    assert line_index.position_to_offset(1, 11, PositionEncodingKind.UTF8) == 23
+    assert line_index.position_to_offset(1, 14, PositionEncodingKind.UTF8) == 24
+    assert line_index.position_to_offset(2, 15, PositionEncodingKind.UTF8) == 40
+    assert line_index.position_to_offset(1, 12, PositionEncodingKind.UTF16) == 24
+    assert line_index.position_to_offset(2, 13, PositionEncodingKind.UTF16) == 40
+    assert line_index.position_to_offset(2, 12, PositionEncodingKind.UTF32) == 40
+
+    # ASCII-only line
+    assert line_index.position_to_offset(6, 4, PositionEncodingKind.UTF16) == 77
+
+    with pytest.raises(IndexError):
+        line_index.position_to_offset(1, 13, PositionEncodingKind.UTF8)
+    with pytest.raises(IndexError):
+        line_index.position_to_offset(2, 12, PositionEncodingKind.UTF16)
+    with pytest.raises(IndexError):
+        line_index.position_to_offset(0, 12, PositionEncodingKind.UTF16)
+    with pytest.raises(IndexError):
+        line_index.position_to_offset(100, 0, PositionEncodingKind.UTF16)
+
+
+def test_line_index_offset_to_position(line_index: _LineIndex) -> None:
+    assert line_index.offset_to_position(23, PositionEncodingKind.UTF8) == (1, 11)
+    assert line_index.offset_to_position(24, PositionEncodingKind.UTF8) == (1, 14)
+    assert line_index.offset_to_position(40, PositionEncodingKind.UTF16) == (2, 13)
+    assert line_index.offset_to_position(40, PositionEncodingKind.UTF32) == (2, 12)
+
+    # The end of the text is a valid position
+    assert line_index.offset_to_position(84, PositionEncodingKind.UTF16) == (7, 0)
+
+    with pytest.raises(IndexError):
+        line_index.offset_to_position(85, PositionEncodingKind.UTF16)
+
+
+def test_line_index_line_breaks() -> None:
+    line_index = _LineIndex(Rope("a\r\nb\rc\nd"))
+    assert line_index.line_count == 4
+    assert line_index.position_to_offset(1, 0, PositionEncodingKind.UTF16) == 3
+    assert line_index.position_to_offset(2, 0, PositionEncodingKind.UTF16) == 5
+    assert line_index.position_to_offset(3, 1, PositionEncodingKind.UTF16) == 8
+    assert line_index.offset_to_position(7, PositionEncodingKind.UTF16) == (3, 0)
+
+    # The line break is not part of the line
+    with pytest.raises(IndexError):
+        line_index.position_to_offset(0, 2, PositionEncodingKind.UTF16)
+
+
+def test_line_index_byte_offsets(line_index: _LineIndex) -> None:
+    assert line_index.offset_to_byte_offset(23) == 23
+    assert line_index.offset_to_byte_offset(24) == 26
+    assert line_index.offset_to_byte_offset(40) == 46
+    assert line_index.offset_to_byte_offset(84) == 93
+
+    assert line_index.byte_offset_to_offset(26) == 24
+    assert line_index.byte_offset_to_offset(46) == 40
+    assert line_index.byte_offset_to_offset(93) == 84
+
+    with pytest.raises(IndexError):
+        line_index.byte_offset_to_offset(24)
+    with pytest.raises(IndexError):
+        line_index.byte_offset_to_offset(94)
+
+
+def test_line_index_positions_to_offsets(line_index: _LineIndex) -> None:
+    positions = [1, 11, 1, 14, 2, 15, 6, 4, 1, 0]
+    assert list(line_index.positions_to_offsets(positions, PositionEncodingKind.UTF8)) == [
+        23,
+        24,
+        40,
+        77,
+        12,
+    ]
+
+    with pytest.raises(ValueError):
+        line_index.positions_to_offsets([1, 11, 1], PositionEncodingKind.UTF8)
+    with pytest.raises(IndexError):
+        line_index.positions_to_offsets([1, 11, 1, 13], PositionEncodingKind.UTF8)
+
+
+def test_line_index_offsets_to_positions(line_index: _LineIndex) -> None:
+    # Sorted offsets, including the end of the text
+    offsets = [23, 24, 40, 77, 84]
+    assert list(line_index.offsets_to_positions(offsets, PositionEncodingKind.UTF16)) == [
+        1,
+        11,
+        1,
+        12,
+        2,
+        13,
+        6,
+        4,
+        7,
+        0,
+    ]
+
+    # Unsorted offsets
+    offsets = [40, 23, 84, 0]
+    assert list(line_index.offsets_to_positions(offsets, PositionEncodingKind.UTF32)) == [
+        2,
+        12,
+        1,
+        11,
+        7,
+        0,
+        0,
+        0,
+    ]
+
+    with pytest.raises(IndexError):
+        line_index.offsets_to_positions([23, 85], PositionEncodingKind.UTF16)
@@ -69,6 +69,48 @@ if __name__ == "__main__":
         )
 
 
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+async def test_location_list_remapped_ranges() -> None:
+    async with Workspace(Path("./test/mock-ws-1")) as ws:
+        doc = ws.open_text_document(Path("test-2.py"), encoding="utf-8")
+        location_list = LocationList([doc], [[(4, 8), (20, 25)]])
+
+        doc.insert("# comment\n", 0)
+        doc.edit("def", 9, 10)
+        doc.commit_edits()
+
+        assert location_list[doc] == [(14, 18), (32, 37)]
+        snapshot, locations = location_list.get_with_snapshot(doc)
+        assert snapshot.version == doc.version
+        assert locations == [(14, 18), (32, 37)]
+
+        doc.edit("", 16, 20)
+        doc.commit_edits()
+        with pytest.raises(KeyError):
+            location_list[doc]
+        snapshot, locations = location_list.get_with_snapshot(doc)
+        assert snapshot.version == 1
+        assert locations == [(14, 18), (32, 37)]
+
+
+async def test_location_list_after_reload(tmp_path: Path) -> None:
+    path = tmp_path / "file.py"
+    path.write_text("x = 1\ny = 2\n", encoding="utf-8")
+    async with Workspace(tmp_path) as ws:
+        doc = ws.open_text_document(path, release_text=True)
+        location_list = LocationList([doc], [[(0, 1)]])
+        doc.close()
+        with location_list:
+            await doc.save()
+            path.write_text("z = 3\n", encoding="utf-8")
+            assert await doc.reload()
+
+            # The edits since the version of the locations are unknown, so they are stale.
+            assert len(location_list) == 0
+            with pytest.raises(KeyError):
+                location_list[doc]
+
+
 async def test_location_list_from_lsp_locations() -> None:
     workspace_path = Path("./test/mock-ws-1").resolve()
     workspace_uri = workspace_path.as_uri()
@@ -1,3 +1,4 @@
+import asyncio
 from logging import DEBUG, INFO, Handler, Logger, LogRecord, getLogger
 from typing import Any, Generator, List
 from uuid import UUID, uuid3
@@ -85,6 +86,30 @@ async def test_operation_decorator(test_handler: OperationRecorder) -> None:
     assert records[5].cls_current_operation_name == "test_fn1"  # type: ignore
 
 
+async def test_operation_concurrent_tasks(test_handler: OperationRecorder) -> None:
+    logger = OperationLoggerAdapter(getLogger("change-ls.test"))
+
+    @operation
+    async def test_fn(delay: float) -> None:
+        await asyncio.sleep(delay)
+        logger.info("Test")
+
+    @operation
+    async def test_parent() -> None:
+        # The first task finishes last, so the Operations do not end in the order they started.
+        await asyncio.gather(test_fn(0.02), test_fn(0.01))
+        logger.info("Done")
+
+    await test_parent()
+
+    records = test_handler.records
+    assert [r.cls_operation_stack_names for r in records] == [  # type: ignore
+        "test_parent.test_fn",
+        "test_parent.test_fn",
+        "test_parent",
+    ]
+
+
 def test_operation_context_manager(test_handler: OperationRecorder) -> None:
     logger = OperationLoggerAdapter(getLogger("change-ls.test"))
     logger.info("No Operation")
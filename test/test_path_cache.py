@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from change_ls._path_cache import _PathCache
+
+
+def test_path_cache() -> None:
+    root = Path("/root").absolute()
+    cache = _PathCache(3)
+    cache.put("a.py", root / "a.py", (root / "a.py").as_uri(), False, 0)
+    cache.put(
+        root / "dir" / "b.py", root / "dir" / "b.py", (root / "dir" / "b.py").as_uri(), False, 0
+    )
+    cache.put("c.py", root / "c.py", (root / "c.py").as_uri(), True, 0)
+    assert cache.get("a.py") == (root / "a.py", (root / "a.py").as_uri())
+
+    # The least recently used entry is evicted
+    cache.put("d.py", root / "d.py", (root / "d.py").as_uri(), False, 0)
+    assert cache.get(root / "dir" / "b.py") is None
+    assert len(cache) == 3
+
+    # Entries which searched multiple roots are always invalidated
+    cache.invalidate(root / "dir")
+    assert cache.get("c.py") is None
+    assert cache.get("a.py") is not None
+
+    cache.invalidate(root / "a.py")
+    assert cache.get("a.py") is None
+    assert cache.get("d.py") is not None
+
+    # Entries computed before an invalidation are not stored
+    cache.put("e.py", root / "e.py", (root / "e.py").as_uri(), False, 0)
+    assert cache.get("e.py") is None
+    cache.put("e.py", root / "e.py", (root / "e.py").as_uri(), False, cache.generation)
+    assert cache.get("e.py") is not None
+
+
+def test_path_cache_threads() -> None:
+    root = Path("/root").absolute()
+    cache = _PathCache(8)
+
+    def work(thread: int) -> None:
+        for i in range(2000):
+            path = root / f"{(thread + i) % 16}.py"
+            cache.put(path, path, path.as_uri(), False, cache.generation)
+            cache.get(path)
+            if i % 50 == 0:
+                cache.invalidate(root / f"{i % 16}.py")
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(work, range(8)))
+    assert len(cache) <= 8
@@ -1,5 +1,5 @@
-from asyncio import get_running_loop
-from typing import Callable, Mapping, Sequence, Union
+from asyncio import Event, get_running_loop, sleep
+from typing import Awaitable, Callable, List, Mapping, Sequence, Union
 
 from pytest import raises
 
@@ -7,7 +7,7 @@ from change_ls._protocol import LSPException, LSProtocol
 from change_ls.types import JSON_VALUE, ErrorCodes
 
 _ParamType = Union[Sequence[JSON_VALUE], Mapping[str, JSON_VALUE], None]
-_RequestHandler = Callable[[str, _ParamType], JSON_VALUE]
+_RequestHandler = Callable[[str, _ParamType], Union[JSON_VALUE, Awaitable[JSON_VALUE]]]
 _NotificationHandler = Callable[[str, _ParamType], None]
 
 
@@ -93,6 +93,26 @@ async def test_send_notification() -> None:
     assert await future
 
 
+async def test_batch_writes() -> None:
+    received: List[str] = []
+
+    def server_notification_handler(method: str, params: _ParamType) -> None:
+        received.append(method)
+
+    client = MockLSProtocol(_empty_request_handler, _empty_notification_handler)
+    server = MockLSProtocol(_empty_request_handler, server_notification_handler)
+
+    with client.batch_writes():
+        client.send_notification("test-1", None)
+        with client.batch_writes():
+            client.send_notification("test-2", None)
+        assert client.pull_output() == b""
+        client.send_notification("test-3", None)
+
+    server.push_input(client.pull_output())
+    assert received == ["test-1", "test-2", "test-3"]
+
+
 async def test_send_invalid_json() -> None:
     client = MockLSProtocol(_empty_request_handler, _empty_notification_handler)
     server = MockLSProtocol(_empty_request_handler, _empty_notification_handler)
@@ -145,3 +165,37 @@ async def test_send_request_non_ascii() -> None:
 
     res = await future
     assert res == "🙂"
+
+
+async def test_deferred_response() -> None:
+    release = Event()
+
+    async def wait_for_release() -> JSON_VALUE:
+        await release.wait()
+        return "deferred"
+
+    def server_request_handler(
+        method: str, params: _ParamType
+    ) -> Union[JSON_VALUE, Awaitable[JSON_VALUE]]:
+        if method == "deferred":
+            return wait_for_release()
+        return "immediate"
+
+    client = MockLSProtocol(_empty_request_handler, _empty_notification_handler)
+    server = MockLSProtocol(server_request_handler, _empty_notification_handler)
+
+    deferred = get_running_loop().create_future()
+    immediate = get_running_loop().create_future()
+    client.send_request("deferred", None, deferred)
+    client.send_request("immediate", None, immediate)
+
+    # The deferred request does not block the following one.
+    server.push_input(client.pull_output())
+    client.push_input(server.pull_output())
+    assert await immediate == "immediate"
+    assert not deferred.done()
+
+    release.set()
+    await sleep(0)
+    client.push_input(server.pull_output())
+    assert await deferred == "deferred"
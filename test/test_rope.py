@@ -0,0 +1,75 @@
+import bisect
+import random
+import re
+
+import pytest
+
+from change_ls._rope import _LEAF_SIZE, Rope
+
+
+def test_rope_replace() -> None:
+    rope = Rope("Hello World")
+    edited = rope.replace(6, 11, "Rope").replace(5, 5, ",")
+    assert str(edited) == "Hello, Rope"
+    assert len(edited) == 11
+
+    # The original rope is not modified
+    assert str(rope) == "Hello World"
+
+    with pytest.raises(IndexError):
+        rope.replace(5, 12, "")
+    with pytest.raises(IndexError):
+        rope.replace(5, 4, "")
+
+
+def test_rope_large_text() -> None:
+    rng = random.Random(0)
+    text = "".join(rng.choice("ab\n") for _ in range(_LEAF_SIZE * 20))
+    rope = Rope(text)
+
+    for _ in range(200):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(start + _LEAF_SIZE * 3, len(text)))
+        new_text = "x" * rng.choice([0, 1, 10, _LEAF_SIZE * 2])
+        text = text[:start] + new_text + text[end:]
+        rope = rope.replace(start, end, new_text)
+
+        slice_start = rng.randint(0, len(text))
+        slice_end = rng.randint(slice_start, len(text))
+        assert rope.slice(slice_start, slice_end) == text[slice_start:slice_end]
+
+    assert len(rope) == len(text)
+    assert str(rope) == text
+
+
+def test_rope_lines() -> None:
+    rng = random.Random(0)
+    text = "".join(rng.choice(["a", "ä", "\U0001f600", "\r", "\n", "\r\n"]) for _ in range(5000))
+    rope = Rope(text)
+    for _ in range(50):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(start + 100, len(text)))
+        new_text = rng.choice(["", "\r", "\n", "\r\n", "x\r", "\ny", "ä\n"])
+        text = text[:start] + new_text + text[end:]
+        rope = rope.replace(start, end, new_text)
+
+    # Split a \r\n between two leaves
+    split = text.index("\r\n", len(text) // 2) + 1
+    rope = Rope(text[:split]).replace(split, split, text[split:])
+
+    line_starts = [0, *(m.end() for m in re.finditer(r"\r\n|\r|\n", text))]
+    assert rope.line_count == len(line_starts)
+    assert [rope.line_start(line) for line in range(len(line_starts))] == line_starts
+    for offset in range(len(text) + 1):
+        assert rope.line_of_offset(offset) == bisect.bisect_right(line_starts, offset) - 1
+        byte_offset = len(text[:offset].encode("utf-8"))
+        assert rope.utf_8_offset(offset) == byte_offset
+        assert rope.offset_of_utf_8(byte_offset) == offset
+
+    assert rope.utf_8_length == len(text.encode("utf-8"))
+    with pytest.raises(IndexError):
+        rope.line_start(len(line_starts))
+    with pytest.raises(IndexError):
+        rope.line_of_offset(len(text) + 1)
+    with pytest.raises(IndexError):
+        rope.offset_of_utf_8(len(text[: text.index("ä")].encode("utf-8")) + 1)
@@ -0,0 +1,169 @@
+import os
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+from change_ls import StdIOConnectionParams, SymbolIndex, Workspace
+from change_ls._client import Client
+from change_ls.types import (
+    DocumentSymbol,
+    DocumentSymbolParams,
+    Location,
+    Position,
+    PositionEncodingKind,
+    Range,
+    SymbolInformation,
+    SymbolKind,
+)
+
+_RANGE = Range(start=Position(line=0, character=0), end=Position(line=0, character=1))
+
+
+def _symbol_information(name: str, uri: str) -> SymbolInformation:
+    return SymbolInformation(
+        name=name, kind=SymbolKind.Function, location=Location(uri=uri, range=_RANGE)
+    )
+
+
+def _patch_client(
+    client: Client, monkeypatch: pytest.MonkeyPatch, requests: List[str], encoding: str = "utf-16"
+) -> None:
+    async def send_request_iter(method: str, params: Any, **_kwargs: Any) -> Any:
+        requests.append(method)
+        root = Path(os.getcwd())
+        yield [
+            _symbol_information("foo_bar", (root / "a.py").as_uri()).to_json(),
+            _symbol_information("FooBaz", (root / "a.py").as_uri()).to_json(),
+        ]
+        yield [
+            _symbol_information("baz", (root / "b.py").as_uri()).to_json(),
+            _symbol_information("outside", "file:///outside/c.py").to_json(),
+        ]
+
+    async def send_text_document_document_symbol(params: DocumentSymbolParams) -> Any:
+        requests.append(params.textDocument.uri.rsplit("/", 1)[-1])
+        return [
+            DocumentSymbol(
+                name="Outer",
+                kind=SymbolKind.Class,
+                range=_RANGE,
+                selectionRange=_RANGE,
+                children=[
+                    DocumentSymbol(
+                        name="inner", kind=SymbolKind.Method, range=_RANGE, selectionRange=_RANGE
+                    )
+                ],
+            )
+        ]
+
+    # The client is never launched, so it must not send notifications for the opened documents.
+    monkeypatch.setattr(
+        client,
+        "check_feature",
+        lambda method, *_args, **_kwargs: method
+        in ["workspace/symbol", "textDocument/documentSymbol"],
+    )
+    monkeypatch.setattr(
+        client, "get_position_encoding_kind", lambda: PositionEncodingKind(encoding)
+    )
+    monkeypatch.setattr(client, "send_request_iter", send_request_iter)
+    monkeypatch.setattr(
+        client, "send_text_document_document_symbol", send_text_document_document_symbol
+    )
+
+
+async def test_symbol_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "a.py").write_text("def foo_bar(): ...\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("def baz(): ...\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    requests: List[str] = []
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        _patch_client(client, monkeypatch, requests)
+
+        with SymbolIndex(ws, tmp_path / "index.db") as index:
+            send_request_iter = client.send_request_iter
+
+            async def checked_send_request_iter(*args: Any, **kwargs: Any) -> Any:
+                async for chunk in send_request_iter(*args, **kwargs):
+                    # The database is not locked while waiting for the language server.
+                    assert not index._connection.in_transaction  # type: ignore
+                    yield chunk
+
+            monkeypatch.setattr(client, "send_request_iter", checked_send_request_iter)
+            await index.rebuild()
+            assert len(index) == 3
+            assert [s.name for s in await index.query("foo")] == ["FooBaz", "foo_bar"]
+            assert [s.name for s in await index.query("BA", mode="substring")] == [
+                "baz",
+                "FooBaz",
+                "foo_bar",
+            ]
+            assert [s.name for s in await index.query("fbr", mode="fuzzy")] == ["foo_bar"]
+            assert len(await index.query("", limit=2)) == 2
+            with pytest.raises(ValueError):
+                await index.query("foo", mode="regex")  # type: ignore
+        assert requests == ["workspace/symbol"]
+
+        # Touching a file without changing it does not make it stale.
+        os.utime(tmp_path / "a.py", ns=(0, 0))
+        (tmp_path / "b.py").write_text("class Outer:\n    def inner(self): ...\n", encoding="utf-8")
+        with SymbolIndex(ws, tmp_path / "index.db") as index:
+            assert [s.name for s in await index.query("foo")] == ["FooBaz", "foo_bar"]
+            assert requests == ["workspace/symbol"]
+
+            # Stale files which contain matches are refreshed before the query is answered.
+            assert await index.query("baz") == []
+            assert requests == ["workspace/symbol", "b.py"]
+            (inner,) = await index.query("inner")
+            assert inner.container_name == "Outer"
+
+            (tmp_path / "a.py").unlink()
+            assert await index.refresh() == [(tmp_path / "a.py").as_uri()]
+            assert [s.name for s in await index.query("")] == ["inner", "Outer"]
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        _patch_client(client, monkeypatch, requests, encoding="utf-8")
+        with SymbolIndex(ws, tmp_path / "index.db") as index:
+            # Positions in the index are only valid for the same position encoding.
+            assert await index.query("") == []
+
+
+async def test_symbol_index_refresh_deleted_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+        _patch_client(client, monkeypatch, [])
+
+        async def send_text_document_document_symbol(params: DocumentSymbolParams) -> Any:
+            name = params.textDocument.uri.rsplit("/", 1)[-1]
+            if name == "a.py":
+                # The file is deleted while its request is in flight.
+                (tmp_path / "a.py").unlink()
+            return [_symbol_information(f"sym_from_{name}", params.textDocument.uri)]
+
+        monkeypatch.setattr(
+            client, "send_text_document_document_symbol", send_text_document_document_symbol
+        )
+        with SymbolIndex(ws, tmp_path / "index.db") as index:
+            await index.refresh(["a.py", "b.py"])
+            # Querying would refresh b.py again if it was stored with the wrong stamp,
+            # so the stored symbols are checked directly.
+            connection = index._connection  # type: ignore
+            rows = connection.execute("SELECT uri, name FROM symbols").fetchall()
+            assert ((tmp_path / "b.py").as_uri(), "sym_from_b.py") in rows
+            assert ((tmp_path / "b.py").as_uri(), "sym_from_a.py") not in rows
+
+            # The deleted file is removed on the next refresh.
+            await index.refresh()
+            assert [(s.uri, s.name) for s in await index.query("sym")] == [
+                ((tmp_path / "b.py").as_uri(), "sym_from_b.py")
+            ]
@@ -7,15 +7,21 @@ from change_ls import (
     Workspace,
     install_language,
     matches_file_operation_filter,
+    matches_file_system_watcher,
     matches_text_document_filter,
 )
 from change_ls.tokens import Grammar, GrammarFormat
 from change_ls.types import (
+    FileChangeType,
+    FileEvent,
     FileOperationFilter,
     FileOperationPattern,
     FileOperationPatternKind,
     FileOperationPatternOptions,
+    FileSystemWatcher,
+    RelativePattern,
     TextDocumentFilter,
+    WatchKind,
 )
 
 
@@ -79,6 +85,32 @@ def test_matches_file_operation_filter() -> None:
     assert matches_file_operation_filter(path6.as_uri(), filter4)
 
 
+def test_matches_file_system_watcher() -> None:
+    base = Path(".").absolute()
+    created = FileEvent(uri=(base / "test.py").as_uri(), type=FileChangeType.Created)
+    changed = FileEvent(uri=(base / "test/test.json").as_uri(), type=FileChangeType.Changed)
+    deleted = FileEvent(uri=(base / "test/test.py").as_uri(), type=FileChangeType.Deleted)
+
+    watcher1 = FileSystemWatcher(globPattern="**/*.py")
+    assert matches_file_system_watcher(created, watcher1)
+    assert matches_file_system_watcher(deleted, watcher1)
+    assert not matches_file_system_watcher(changed, watcher1)
+
+    watcher2 = FileSystemWatcher(
+        globPattern=RelativePattern(baseUri=(base / "test").as_uri(), pattern="**/*.{py,json}"),
+        kind=WatchKind.Change,
+    )
+    assert not matches_file_system_watcher(created, watcher2)
+    assert matches_file_system_watcher(changed, watcher2)
+    assert not matches_file_system_watcher(deleted, watcher2)
+
+    # Relative patterns also match files directly inside the base
+    watcher3 = FileSystemWatcher(
+        globPattern=RelativePattern(baseUri=base.as_uri(), pattern="**/*.py")
+    )
+    assert matches_file_system_watcher(created, watcher3)
+
+
 class MockGrammar(Grammar):
     content: str
 
@@ -1,24 +1,36 @@
+import asyncio
 import shutil
 from pathlib import Path
-from typing import Any, Generator, Optional
+from typing import Any, Generator, List, Optional
 
 import pytest
 
-from change_ls import StdIOConnectionParams, Workspace
+from change_ls import ChangeLSError, StdIOConnectionParams, Workspace
+from change_ls._workspace import _merge_workspace_edits
 from change_ls.types import (
+    ApplyWorkspaceEditParams,
+    ApplyWorkspaceEditResult,
     CreateFile,
     DeleteFile,
+    DeleteFileOptions,
+    FileChangeType,
     LSPAny,
     OptionalVersionedTextDocumentIdentifier,
     Position,
+    PositionEncodingKind,
     Range,
     RenameFile,
+    RenameFileOptions,
     TextDocumentEdit,
     TextEdit,
     WorkspaceEdit,
 )
 
 
+async def _async_none(*_args: Any) -> None:
+    return None
+
+
 async def test_workspace_launch_clients() -> None:
     workspace = Workspace(
         Path("test/mock-ws-1"), Path("test/mock-ws-2"), names=["mock-ws-1", "mock-ws-2"]
@@ -156,3 +168,464 @@ async def test_workspace_edit_document_changes(scratch_workspace_path: Path) ->
 
         doc = ws.open_text_document(doc1_path)
         assert doc.text == 'print("Good morning, World!")\n'
+
+
+async def test_workspace_open_text_documents() -> None:
+    async with Workspace(Path("test/mock-ws-1")) as workspace:
+        existing = workspace.open_text_document(Path("test-2.py"), encoding="utf-8")
+        docs = await workspace.open_text_documents(
+            [Path("test-1.py"), "test-2.py", Path("test-1.py")], encoding="utf-8", window=2
+        )
+        assert docs[0] is docs[2]
+        assert docs[1] is existing
+        assert docs[0].text == 'print("Hello, World!")\n'
+        assert docs[0].encoding == "utf-8"
+
+        for doc in docs:
+            doc.close()
+        existing.close()
+        assert existing.is_closed()
+        assert docs[0].is_closed()
+
+        with pytest.raises(FileNotFoundError):
+            await workspace.open_text_documents([Path("test-1.py"), Path("missing.py")])
+        assert docs[0].is_closed()
+
+
+async def test_workspace_refresh_files(tmp_path: Path) -> None:
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+
+    async with Workspace(tmp_path) as workspace:
+        assert sorted(p.name for p in workspace.list_files()) == [".gitignore", "a.py", "b.py"]
+
+        doc = workspace.open_text_document(Path("a.py"), encoding="utf-8")
+        (tmp_path / "a.py").write_text("a = 2\n", encoding="utf-8")
+        (tmp_path / "b.py").unlink()
+        (tmp_path / "c.py").write_text("c = 1\n", encoding="utf-8")
+        (tmp_path / "c.log").write_text("", encoding="utf-8")
+
+        events = await workspace.refresh_files()
+        assert sorted((e.uri.rsplit("/", 1)[-1], e.type) for e in events) == [
+            ("a.py", FileChangeType.Changed),
+            ("b.py", FileChangeType.Deleted),
+            ("c.py", FileChangeType.Created),
+        ]
+        assert doc.text == "a = 2\n"
+        assert doc.version == 1
+        assert await workspace.refresh_files() == []
+        doc.close()
+
+
+async def test_workspace_path_cache(tmp_path: Path) -> None:
+    (tmp_path / "root-1").mkdir()
+    (tmp_path / "root-2").mkdir()
+    (tmp_path / "root-1" / "a.py").write_text("", encoding="utf-8")
+
+    async with Workspace(tmp_path / "root-1", tmp_path / "root-2") as workspace:
+        full_path, uri = workspace._normalize_path_parameter("a.py")
+        assert full_path == tmp_path / "root-1" / "a.py"
+        assert workspace._normalize_path_parameter("a.py") == (full_path, uri)
+        assert workspace._normalize_path_parameter(uri) == (full_path, uri)
+
+        # The relative path becomes ambiguous, which is only noticed if the cache is invalidated.
+        doc = await workspace.create_text_document(tmp_path / "root-2" / "a.py")
+        doc.close()
+        with pytest.raises(FileNotFoundError):
+            workspace._normalize_path_parameter("a.py")
+
+        await workspace.rename_text_document(
+            tmp_path / "root-2" / "a.py", tmp_path / "root-2" / "b.py"
+        )
+        assert workspace._normalize_path_parameter("a.py") == (full_path, uri)
+
+
+async def test_workspace_edit_concurrent_documents(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    paths = [tmp_path / f"file-{i}.py" for i in range(10)]
+    for path in paths:
+        path.write_text("x = 0\n", encoding="utf-8")
+    renamed_uri = (tmp_path / "renamed.py").as_uri()
+
+    def text_document_edit(uri: str, text: str) -> TextDocumentEdit:
+        return TextDocumentEdit(
+            textDocument=OptionalVersionedTextDocumentIdentifier(uri=uri, version=None),
+            edits=[
+                TextEdit(
+                    range=Range(
+                        start=Position(line=0, character=0), end=Position(line=0, character=1)
+                    ),
+                    newText=text,
+                )
+            ],
+        )
+
+    edit = WorkspaceEdit(
+        documentChanges=[
+            *(text_document_edit(path.as_uri(), "y") for path in paths),
+            text_document_edit(paths[0].as_uri(), "z"),
+            RenameFile(kind="rename", oldUri=paths[0].as_uri(), newUri=renamed_uri),
+            text_document_edit(renamed_uri, "w"),
+        ]
+    )
+
+    log: List[str] = []
+    running = 0
+    max_running = 0
+
+    async def perform_text_document_edits(
+        uri: str, edits: List[TextEdit], version: Optional[int] = None
+    ) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        log.append(f"{uri.rsplit('/', 1)[-1]}:{edits[0].newText}:exists={Path(uri[7:]).exists()}")
+        running -= 1
+
+    async with Workspace(tmp_path) as ws:
+        monkeypatch.setattr(ws, "_perform_text_document_edits", perform_text_document_edits)
+        await ws.perform_edit_and_save(edit, window=3)
+
+    assert max_running == 3
+    assert len(log) == 12
+    assert log.index("file-0.py:y:exists=True") < log.index("file-0.py:z:exists=True")
+    assert log[-1] == "renamed.py:w:exists=True"
+
+
+async def test_workspace_edit_transactional_rollback(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "c.py").write_text("c = 1\n", encoding="utf-8")
+
+    edit = WorkspaceEdit(
+        documentChanges=[
+            CreateFile(kind="create", uri=(tmp_path / "new" / "d.py").as_uri()),
+            RenameFile(
+                kind="rename",
+                oldUri=(tmp_path / "a.py").as_uri(),
+                newUri=(tmp_path / "b.py").as_uri(),
+                options=RenameFileOptions(overwrite=True),
+            ),
+            DeleteFile(
+                kind="delete",
+                uri=(tmp_path / "dir").as_uri(),
+                options=DeleteFileOptions(recursive=True),
+            ),
+            DeleteFile(kind="delete", uri=(tmp_path / "missing.py").as_uri()),
+        ]
+    )
+
+    async with Workspace(tmp_path) as ws:
+        doc = ws.open_text_document(tmp_path / "a.py", encoding="utf-8")
+        with pytest.raises(FileNotFoundError):
+            await ws.perform_edit_and_save(edit, transactional=True)
+        assert doc.path == tmp_path / "a.py"
+        doc.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "b.py", "dir"]
+    assert (tmp_path / "a.py").read_text(encoding="utf-8") == "a = 1\n"
+    assert (tmp_path / "b.py").read_text(encoding="utf-8") == "b = 1\n"
+    assert (tmp_path / "dir" / "c.py").read_text(encoding="utf-8") == "c = 1\n"
+
+
+async def test_workspace_edit_transactional_validation(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+
+    def edit_for_version(version: int) -> WorkspaceEdit:
+        return WorkspaceEdit(
+            documentChanges=[
+                CreateFile(kind="create", uri=(tmp_path / "b.py").as_uri()),
+                TextDocumentEdit(
+                    textDocument=OptionalVersionedTextDocumentIdentifier(
+                        uri=(tmp_path / "a.py").as_uri(), version=version
+                    ),
+                    edits=[],
+                ),
+            ]
+        )
+
+    async with Workspace(tmp_path) as ws:
+        with pytest.raises(ChangeLSError):
+            await ws.perform_edit_and_save(edit_for_version(1), transactional=True)
+        assert not (tmp_path / "b.py").exists()
+
+        doc = ws.open_text_document(tmp_path / "a.py", encoding="utf-8")
+        doc.edit("x", 0, 1)
+        doc.commit_edits()
+        with pytest.raises(ChangeLSError):
+            await ws.perform_edit_and_save(edit_for_version(1), transactional=True)
+        assert not (tmp_path / "b.py").exists()
+        await doc.save()
+        doc.close()
+
+
+async def test_workspace_apply_edit_ordering(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def apply_edit_params(label: str, *names: str) -> ApplyWorkspaceEditParams:
+        return ApplyWorkspaceEditParams(
+            label=label,
+            edit=WorkspaceEdit(changes={(tmp_path / name).as_uri(): [] for name in names}),
+        )
+
+    log: List[str] = []
+
+    async def perform_edit_and_save(edit: WorkspaceEdit, **_kwargs: Any) -> None:
+        assert edit.changes is not None
+        names = ",".join(sorted(uri.rsplit("/", 1)[-1] for uri in edit.changes))
+        log.append(f"start {names}")
+        await asyncio.sleep(0.01)
+        log.append(f"end {names}")
+
+    async with Workspace(tmp_path) as ws:
+        monkeypatch.setattr(ws, "perform_edit_and_save", perform_edit_and_save)
+        results = await asyncio.gather(
+            ws.on_apply_edit(apply_edit_params("1", "a.py", "b.py")),
+            ws.on_apply_edit(apply_edit_params("2", "c.py")),
+            ws.on_apply_edit(apply_edit_params("3", "b.py")),
+        )
+
+    assert all(r.applied for r in results)
+    # Edits of different files run concurrently, edits of the same file one after another.
+    assert log[:2] == ["start a.py,b.py", "start c.py"]
+    assert log.index("end a.py,b.py") < log.index("start b.py")
+
+
+async def test_workspace_dispatch_apply_edit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    params = ApplyWorkspaceEditParams(edit=WorkspaceEdit(changes={})).to_json()
+    async with Workspace(tmp_path) as ws:
+        client = ws.create_client(StdIOConnectionParams(launch_command="server"))
+
+        # The public dispatch_request() cannot wait for asynchronous handlers.
+        result = client.dispatch_request("workspace/applyEdit", params)
+        assert ApplyWorkspaceEditResult.from_json(result).applied is False  # type: ignore
+
+        monkeypatch.setattr(
+            ws, "on_apply_edit", lambda _params: ApplyWorkspaceEditResult(applied=True)
+        )
+        result = client.dispatch_request("workspace/applyEdit", params)
+        assert ApplyWorkspaceEditResult.from_json(result).applied is True  # type: ignore
+
+
+async def test_workspace_residency_grace_period(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+
+    async with Workspace(tmp_path) as workspace:
+        with pytest.raises(ValueError):
+            workspace.set_residency_limits(grace_period=-1.0)
+        workspace.set_residency_limits(grace_period=0.1)
+
+        doc = workspace.open_text_document(Path("a.py"))
+        doc.close()
+        assert doc.is_closed()
+        assert doc._server_open
+
+        # Opening the document during the grace period reuses it.
+        assert workspace.open_text_document(Path("a.py")) is doc
+        assert not doc.is_closed()
+        doc.close()
+
+        await asyncio.sleep(0.2)
+        assert not doc._server_open
+        assert doc.uri not in workspace._opened_text_documents
+        assert workspace.open_text_document(Path("a.py")) is not doc
+
+
+async def test_workspace_residency_eviction(tmp_path: Path) -> None:
+    for name in ["a.py", "b.py", "c.py"]:
+        (tmp_path / name).write_text(f"{name[0]} = 1\n", encoding="utf-8")
+
+    async with Workspace(tmp_path) as workspace:
+        doc_a = workspace.open_text_document(Path("a.py"))
+        doc_b = workspace.open_text_document(Path("b.py"))
+        workspace.set_residency_limits(max_documents=2)
+        assert doc_a._server_open and doc_b._server_open
+
+        doc_c = workspace.open_text_document(Path("c.py"))
+        assert not doc_a._server_open
+        assert not doc_a.is_closed()
+
+        # Edits to evicted documents are only sent when they are opened again.
+        doc_a.edit("b", 0, 1)
+        doc_a.commit_edits()
+        doc_a._ensure_open()
+        assert doc_a._server_open
+        assert not doc_b._server_open
+        assert doc_c._server_open
+        assert workspace._residency.resident_documents == 2
+
+        workspace.set_residency_limits(max_bytes=len("c = 1\n"))
+        assert doc_a._server_open
+        assert not doc_c._server_open
+        await doc_a.save()
+        assert (tmp_path / "a.py").read_text(encoding="utf-8") == "b = 1\n"
+
+
+async def test_workspace_directory_operations(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "outside" / "keep.txt").write_text("", encoding="utf-8")
+    nested = tmp_path / "ws" / "src" / "a" / "b"
+    nested.mkdir(parents=True)
+    (nested / "deep.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "ws" / "src" / "top.py").write_text("y = 1\n", encoding="utf-8")
+    (tmp_path / "ws" / "src" / "link").symlink_to(tmp_path / "outside")
+
+    async with Workspace(tmp_path / "ws") as workspace:
+        client = workspace.create_client(StdIOConnectionParams(launch_command="server"))
+        notifications: List[Any] = []
+        monkeypatch.setattr(
+            client,
+            "check_feature",
+            lambda method, file_operations=(), **_kwargs: method
+            in ["workspace/didRenameFiles", "workspace/didDeleteFiles"],
+        )
+        monkeypatch.setattr(client, "send_workspace_did_rename_files", notifications.append)
+        monkeypatch.setattr(client, "send_workspace_did_delete_files", notifications.append)
+
+        doc = workspace.open_text_document(nested / "deep.py")
+        await workspace.rename_directory(Path("src"), Path("lib"))
+        assert doc.path == tmp_path / "ws" / "lib" / "a" / "b" / "deep.py"
+        assert doc.text == "x = 1\n"
+        assert [(f.oldUri, f.newUri) for f in notifications[0].files] == [
+            ((tmp_path / "ws" / "src").as_uri(), (tmp_path / "ws" / "lib").as_uri())
+        ]
+
+        await workspace.delete_directory(Path("lib"), recursive=True)
+        assert doc.is_closed()
+        assert not (tmp_path / "ws" / "lib").exists()
+        # Symbolic links are deleted without touching their targets.
+        assert (tmp_path / "outside" / "keep.txt").exists()
+        assert [f.uri for f in notifications[1].files] == [(tmp_path / "ws" / "lib").as_uri()]
+
+
+async def test_workspace_bulk_file_operations(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for name in ["a.py", "b.py", "c.py"]:
+        (tmp_path / name).write_text(name[0] + "\n", encoding="utf-8")
+
+    async with Workspace(tmp_path) as workspace:
+        client = workspace.create_client(StdIOConnectionParams(launch_command="server"))
+        messages: List[Any] = []
+
+        async def will_rename_files(params: Any) -> WorkspaceEdit:
+            messages.append(("willRename", params))
+            edit = TextEdit(
+                range=Range(start=Position(line=0, character=0), end=Position(line=0, character=0)),
+                newText="# ",
+            )
+            return WorkspaceEdit(changes={(tmp_path / "c.py").as_uri(): [edit]})
+
+        monkeypatch.setattr(
+            client,
+            "check_feature",
+            lambda method, file_operations=(), **_kwargs: method.startswith("workspace/")
+            and method.endswith("Files"),
+        )
+        monkeypatch.setattr(
+            client, "get_position_encoding_kind", lambda: PositionEncodingKind.UTF16
+        )
+        monkeypatch.setattr(client, "send_workspace_will_rename_files", will_rename_files)
+        monkeypatch.setattr(client, "send_workspace_will_create_files", _async_none)
+        monkeypatch.setattr(client, "send_workspace_will_delete_files", _async_none)
+        for method in ["create", "rename", "delete"]:
+            monkeypatch.setattr(
+                client,
+                f"send_workspace_did_{method}_files",
+                lambda params, method=method: messages.append((method, params)),
+            )
+
+        await workspace.rename_files([("a.py", "x.py"), (Path("b.py"), tmp_path / "y.py")])
+        assert not (tmp_path / "a.py").exists()
+        assert (tmp_path / "y.py").read_text(encoding="utf-8") == "b\n"
+        assert (tmp_path / "c.py").read_text(encoding="utf-8") == "# c\n"
+        # The server receives a single request and a single notification for all files.
+        assert [m[0] for m in messages] == ["willRename", "rename"]
+        assert [f.newUri for f in messages[1][1].files] == [
+            (tmp_path / "x.py").as_uri(),
+            (tmp_path / "y.py").as_uri(),
+        ]
+        messages.clear()
+
+        # Invalid renames are detected before anything is changed.
+        with pytest.raises(ValueError):
+            await workspace.rename_files([("x.py", "z.py"), ("y.py", "z.py")])
+        with pytest.raises(FileNotFoundError):
+            await workspace.rename_files([("x.py", "z.py"), ("missing.py", "w.py")])
+        assert (tmp_path / "x.py").exists()
+        assert messages == []
+
+        await workspace.create_files(["new/d.py", Path("e.py"), "e.py"])
+        assert (tmp_path / "new" / "d.py").exists()
+        assert [(m[0], len(m[1].files)) for m in messages] == [("create", 2)]
+        with pytest.raises(FileExistsError):
+            await workspace.create_files(["f.py", "e.py"])
+        assert not (tmp_path / "f.py").exists()
+        messages.clear()
+
+        doc = workspace.open_text_document("new/d.py")
+        await workspace.delete_files(["new/d.py", "new", "e.py"], recursive=True)
+        assert doc.is_closed()
+        assert not (tmp_path / "new").exists()
+        assert not (tmp_path / "e.py").exists()
+        # Paths below a deleted directory are not reported separately.
+        assert [f.uri for f in messages[0][1].files] == [
+            (tmp_path / "new").as_uri(),
+            (tmp_path / "e.py").as_uri(),
+        ]
+        await workspace.delete_files(["e.py"], ignore_if_not_exists=True)
+        assert len(messages) == 1
+
+
+async def test_workspace_merge_will_edits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (tmp_path / "a.py").write_text("a\n", encoding="utf-8")
+    (tmp_path / "c.py").write_text("c = 1\n", encoding="utf-8")
+    uri = (tmp_path / "c.py").as_uri()
+
+    def text_edit(start: int, end: int, new_text: str) -> TextEdit:
+        return TextEdit(
+            range=Range(
+                start=Position(line=0, character=start), end=Position(line=0, character=end)
+            ),
+            newText=new_text,
+        )
+
+    # Both servers compute their edits against the current contents of c.py.
+    edits = [
+        WorkspaceEdit(changes={uri: [text_edit(0, 0, "# ")]}),
+        WorkspaceEdit(
+            documentChanges=[
+                RenameFile(
+                    kind="rename",
+                    oldUri=(tmp_path / "a.py").as_uri(),
+                    newUri=(tmp_path / "b.py").as_uri(),
+                ),
+                TextDocumentEdit(
+                    textDocument=OptionalVersionedTextDocumentIdentifier(uri=uri, version=0),
+                    edits=[text_edit(4, 5, "2")],
+                ),
+            ]
+        ),
+    ]
+    merged = _merge_workspace_edits(edits)
+    assert merged.documentChanges is not None
+    assert [type(c) for c in merged.documentChanges] == [TextDocumentEdit, RenameFile]
+    assert merged.documentChanges[0].textDocument.version == 0  # type: ignore
+
+    async with Workspace(tmp_path) as workspace:
+        client = workspace.create_client(StdIOConnectionParams(launch_command="server"))
+        monkeypatch.setattr(client, "check_feature", lambda *_args, **_kwargs: False)
+        monkeypatch.setattr(
+            client, "get_position_encoding_kind", lambda: PositionEncodingKind.UTF16
+        )
+        await workspace.perform_edit_and_save(merged)
+    assert (tmp_path / "c.py").read_text(encoding="utf-8") == "# c = 2\n"
+    assert (tmp_path / "b.py").read_text(encoding="utf-8") == "a\n"
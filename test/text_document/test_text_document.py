@@ -1,11 +1,26 @@
+import asyncio
+import os
+import stat
+import sys
+import time
 import warnings
+import weakref
 from pathlib import Path
-from typing import AsyncGenerator, Generator
+from typing import Any, AsyncGenerator, Generator
 
 import pytest
 
-from change_ls import ChangeLSError, StdIOConnectionParams, TextDocument, Workspace
-from change_ls.types import Position
+import change_ls._edit_log as edit_log
+import change_ls._text_document as td
+from change_ls import (
+    ChangeLSError,
+    DroppedChangesWarning,
+    StdIOConnectionParams,
+    TextDocument,
+    Workspace,
+)
+from change_ls._text_document import _diff_texts, _Edit, _merge_adjacent_edits
+from change_ls.types import Position, Range, TextEdit
 
 
 @pytest.fixture
@@ -81,6 +96,42 @@ def test_text_documents_disallowed_edits(mock_document_1: TextDocument) -> None:
         mock_document_1.edit("Error", 12, length=100)
 
 
+@pytest.mark.test_sequence("test/text_document/test_text_document_edit_incremental.json")
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+def test_text_document_edit_many(mock_document_1: TextDocument) -> None:
+    mock_document_1.edit("Hi", 7, 12)
+    mock_document_1.edit_many(
+        [
+            TextEdit(
+                range=Range(start=Position(line=0, character=0), end=Position(line=0, character=5)),
+                newText="logging.info",
+            )
+        ]
+    )
+    mock_document_1.commit_edits()
+    assert mock_document_1.text == 'logging.info("Hi, World!")\n'
+    assert mock_document_1.version == 1
+
+
+@pytest.mark.test_sequence("test/text_document/test_text_document_open_close.json")
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+def test_text_document_edit_many_disallowed_edits(mock_document_1: TextDocument) -> None:
+    mock_document_1.edit("Good morning", 7, 12)
+
+    # overlapping edits
+    with pytest.raises(ValueError):
+        mock_document_1.edit_many([("Error", 0, 5), ("Error", 8, 15)])
+    with pytest.raises(ValueError):
+        mock_document_1.edit_many([("Error", 0, 5), ("Error", 3, 4)])
+
+    # Out of bounds edit
+    with pytest.raises(IndexError):
+        mock_document_1.edit_many([("Error", 0, 5), ("Error", 12, 100)])
+
+    # Insertions at the same position are allowed
+    mock_document_1.edit_many([("Hi", 0, 0), ("Hi", 0, 0)])
+
+
 @pytest.mark.test_sequence("test/text_document/test_text_document_edit_tokens.json")
 @pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
 async def test_text_document_edit_tokens(mock_document_1: TextDocument) -> None:
@@ -207,3 +258,254 @@ async def test_text_document_offset_to_token_index(mock_document_1: TextDocument
     assert mock_document_1.offset_to_token_index(0) == 0
     assert mock_document_1.offset_to_token_index(4) == 0
     assert mock_document_1.offset_to_token_index(21) == 5
+
+
+def test_merge_adjacent_edits() -> None:
+    edits = [
+        _Edit(0, 2, "a"),
+        _Edit(2, 3, "b"),
+        _Edit(3, 3, "c"),
+        _Edit(5, 6, "d"),
+        _Edit(6, 6, "e"),
+        _Edit(6, 6, "f"),
+        _Edit(10, 12, ""),
+    ]
+    assert _merge_adjacent_edits(edits) == [
+        _Edit(0, 3, "abc"),
+        _Edit(5, 6, "def"),
+        _Edit(10, 12, ""),
+    ]
+    assert [e.new_text for e in _merge_adjacent_edits(edits)] == ["abc", "def", ""]
+
+
+@pytest.mark.parametrize(
+    "old_text,new_text",
+    [
+        ("a\nb\nc\n", "a\nb\nc\n"),
+        ("a\nb\nc\n", "a\nx\nc\n"),
+        ("a\nb\nc\n", "a\nc\nd\n"),
+        ("one\ntwo\nthree\nfour\n", "zero\none\nthree\nfour and more\n"),
+        ("", "new\n"),
+        ("old\n", ""),
+    ],
+)
+def test_diff_texts(old_text: str, new_text: str) -> None:
+    edits = _diff_texts(old_text, new_text)
+    assert edits == sorted(edits)
+    result = old_text
+    for edit in reversed(edits):
+        result = result[: edit.from_offset] + edit.new_text + result[edit.to_offset :]
+    assert result == new_text
+    if old_text == new_text:
+        assert edits == []
+
+
+async def test_text_document_reload(tmp_path: Path) -> None:
+    path = tmp_path / "file.py"
+    path.write_text("a = 1\nb = 2\nc = 3\n", encoding="utf-8")
+    workspace = Workspace(tmp_path)
+    with workspace.open_text_document(path, encoding="utf-8") as doc:
+        assert not await doc.reload()
+        assert doc.version == 0
+
+        path.write_text("a = 1\nb = 20\nc = 3\n", encoding="utf-8")
+        assert await doc.reload()
+        assert doc.version == 1
+        assert doc.text == "a = 1\nb = 20\nc = 3\n"
+        assert doc.map_offset(0, 14) == 15
+
+        doc.insert("#", 0)
+        with pytest.raises(ChangeLSError):
+            await doc.reload()
+        doc.discard_edits()
+
+    with workspace.open_text_document(path, encoding="utf-8", release_text=True) as doc:
+        path.write_text("d = 4\n", encoding="utf-8")
+        assert await doc.reload()
+        assert doc.text == "d = 4\n"
+
+
+def test_text_document_lazy_loading() -> None:
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-1.py"), lazy=True, release_text=True) as doc:
+        # Nothing is read until the contents are needed.
+        assert doc._rope is None  # type: ignore
+        assert doc.text == 'print("Hello, World!")\n'
+        assert doc._rope is not None  # type: ignore
+        assert doc.offset_to_byte_offset(6) == 6
+
+        # Releasing the contents keeps the snapshot of the version while it is referenced.
+        snapshot = doc.snapshot()
+        doc._maybe_release_text()  # type: ignore
+        assert doc._rope is None  # type: ignore
+        assert doc.snapshot() is snapshot
+        del snapshot
+        doc._maybe_release_text()  # type: ignore
+        assert doc.text == 'print("Hello, World!")\n'
+
+
+def test_text_document_weakref() -> None:
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-1.py")) as doc:
+        assert weakref.ref(doc)() is doc
+
+
+def test_text_document_memory_mapped_loading(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(td, "_MMAP_THRESHOLD", 0)
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-2.py"), encoding="utf-8") as doc:
+        with Path("test/mock-ws-1/test-2.py").open(encoding="utf-8") as file:
+            assert doc.text == file.read()
+
+
+def test_write_text_file(tmp_path: Path) -> None:
+    path = tmp_path / "file.py"
+    assert td._write_text_file(path, "print('Hi!')\n", "utf-8", b"", False)
+    assert path.read_bytes() == b"print('Hi!')\n"
+
+    # Unchanged content is not written again
+    assert not td._write_text_file(path, "print('Hi!')\n", "utf-8", b"", True)
+
+    assert td._write_text_file(path, "print('Bye!')\r\n", "utf-8", b"", True)
+    assert path.read_bytes() == b"print('Bye!')\r\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["file.py"]
+
+    if os.name != "nt":
+        # New files honor the umask.
+        umask = os.umask(0o027)
+        try:
+            assert td._write_text_file(tmp_path / "new.py", "", "utf-8", b"", False)
+        finally:
+            os.umask(umask)
+        assert stat.S_IMODE((tmp_path / "new.py").stat().st_mode) == 0o640
+
+
+async def test_text_document_edit_while_saving(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "file.py"
+    path.write_text("a", encoding="utf-8")
+    write_text_file = td._write_text_file
+
+    def slow_write_text_file(*args: Any) -> bool:
+        time.sleep(0.1)
+        return write_text_file(*args)
+
+    monkeypatch.setattr(td, "_write_text_file", slow_write_text_file)
+    workspace = Workspace(tmp_path)
+    doc = workspace.open_text_document(path)
+    doc.edit("b", 0, 1)
+    doc.commit_edits()
+    save = asyncio.ensure_future(doc.save())
+    await asyncio.sleep(0.05)
+    doc.edit("c", 0, 1)
+    doc.commit_edits()
+    await save
+    assert path.read_text(encoding="utf-8") == "b"
+
+    # The edit made during the save is still unsaved.
+    with pytest.warns(DroppedChangesWarning):
+        doc.close()
+
+
+# Without a byte order mark, UTF-16 and UTF-32 are decoded in native byte order.
+_NATIVE = "le" if sys.byteorder == "little" else "be"
+
+
+@pytest.mark.parametrize(
+    "content,encoding,expected_encoding,expected_newline",
+    [
+        (b"a = 1\r\nb = 2\r\n", "utf-8", "utf-8", "\r\n"),
+        (b"\xef\xbb\xbfa = 1\nb = 2\n", "utf-8", "utf-8", "\n"),
+        (b"\xef\xbb\xbfa = 1\rb = 2\r", "latin-1", "utf-8", "\r"),
+        ("\ufeffa = 1\r\nb = 2\r\n".encode("utf-16-be"), "utf-8", "utf-16-be", "\r\n"),
+        (b"a = 1", "utf-8-sig", "utf-8", "\n"),
+        ("a = 1\n".encode(f"utf-16-{_NATIVE}"), "utf-16", f"utf-16-{_NATIVE}", "\n"),
+        ("a = 1\n".encode(f"utf-32-{_NATIVE}"), "utf-32", f"utf-32-{_NATIVE}", "\n"),
+    ],
+)
+async def test_text_document_preserves_file_format(
+    tmp_path: Path, content: bytes, encoding: str, expected_encoding: str, expected_newline: str
+) -> None:
+    path = tmp_path / "file.py"
+    path.write_bytes(content)
+    workspace = Workspace(tmp_path)
+    with workspace.open_text_document(path, encoding=encoding) as doc:
+        assert doc.encoding == expected_encoding
+        assert doc.newline == expected_newline
+        assert doc.text.startswith("a = 1")
+
+        doc.edit("c", 0, 1)
+        doc.commit_edits()
+        doc.edit("a", 0, 1)
+        doc.commit_edits()
+        await doc.save()
+        assert path.read_bytes() == content
+        assert workspace.metrics.get("save.skipped_writes") == 1
+
+
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+def test_text_document_snapshot() -> None:
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-2.py"), encoding="utf-8") as doc:
+        original_text = doc.text
+        snapshot = doc.snapshot()
+        assert doc.snapshot() is snapshot
+        assert snapshot.version == 0
+
+        doc.edit("", 0, 24)
+        doc.commit_edits()
+        assert doc.snapshot() is not snapshot
+        assert doc.snapshot().version == 1
+
+        assert snapshot.text == original_text
+        assert snapshot.offset_to_byte_offset(40) == 46
+        assert doc.offset_to_byte_offset(16) == 20
+
+
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+def test_text_document_map_offset() -> None:
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-2.py"), encoding="utf-8") as doc:
+        doc.insert("abc", 4)
+        doc.edit("xy", 10, 15)
+        doc.commit_edits()
+        doc.delete(0, 2)
+        doc.commit_edits()
+
+        assert doc.map_offset(0, 2) == 0
+        assert doc.map_offset(0, 4) == 2
+        assert doc.map_offset(0, 4, bias="right") == 5
+        assert doc.map_offset(0, 4, 1, bias="right") == 7
+        assert doc.map_offset(0, 12, 1) == 13
+        assert doc.map_offset(0, 12, 1, bias="right") == 15
+        assert doc.map_offset(0, 20) == 18
+        assert doc.map_offset(0, 1) == 0
+        assert doc.map_offset(1, 5, 1) == 5
+
+        assert doc.map_range(0, (4, 8)) == (5, 9)
+        assert doc.map_range(0, (4, 4)) == (2, 2)
+        assert doc.map_range(0, (16, 20)) == (14, 18)
+        assert doc.map_range(0, (8, 11)) is None
+        assert doc.map_range(0, (1, 3)) is None
+        assert doc.map_range(1, (3, 7), 1) == (3, 7)
+
+        with pytest.raises(ValueError):
+            doc.map_offset(2, 0, 1)
+        with pytest.raises(ValueError):
+            doc.map_offset(0, 0, 3)
+
+
+@pytest.mark.filterwarnings("ignore::change_ls.DroppedChangesWarning")
+def test_text_document_edit_log_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(edit_log, "_MAX_VERSIONS", 2)
+    workspace = Workspace(Path("test/mock-ws-1"))
+    with workspace.open_text_document(Path("test-2.py"), encoding="utf-8") as doc:
+        for _ in range(3):
+            doc.insert("a", 0)
+            doc.commit_edits()
+
+        assert doc.map_offset(1, 5) == 7
+        # The edits of the oldest version were dropped.
+        with pytest.raises(ValueError):
+            doc.map_offset(0, 5)